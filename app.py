@@ -5,6 +5,11 @@ import streamlit as st
 # Ensure src is in python path
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
+from src.models.utils import load_env
+
+# Before the controller import: module-level singletons read their settings then
+load_env()
+
 from src.controllers import home_controller
 
 if __name__ == "__main__":
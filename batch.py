@@ -0,0 +1,64 @@
+import sys
+import os
+import argparse
+import time
+
+# Ensure src is in python path
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from src.models.utils import load_env
+
+load_env()
+
+from src.models.async_runtime import run_sync
+from src.models.batch_runner import BatchRunner, load_questions, write_results
+from src.models.db_executor import DatabaseExecutor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate and run SQL for a CSV/JSONL file of questions.")
+    parser.add_argument("questions", help="CSV (with a 'question' column) or JSONL file of questions")
+    parser.add_argument("--db-url", default=os.getenv("DATABASE_URL"), help="Database URL (defaults to $DATABASE_URL)")
+    parser.add_argument("--replica-url", action="append", dest="replica_urls", default=None,
+                        help="Read replica URL (repeatable); defaults to $ASKDB_REPLICA_URLS")
+    parser.add_argument("--output", default="batch_results.jsonl", help="Results file (.jsonl or .csv)")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--persona", default="elite_analyst")
+    parser.add_argument("--concurrency", type=int, default=None, help="Concurrent generation requests")
+    parser.add_argument("--db-concurrency", type=int, default=None, help="Concurrent query executions")
+    parser.add_argument("--rpm", type=int, default=None, help="Requests-per-minute limit (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens-per-minute limit (0 = unlimited)")
+    parser.add_argument("--no-execute", action="store_true", help="Only generate SQL, do not run it")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    args = parser.parse_args(argv)
+
+    if not args.db_url:
+        parser.error("a database URL is required (--db-url or $DATABASE_URL)")
+
+    questions = load_questions(args.questions)
+    db = DatabaseExecutor(db_url=args.db_url, replica_urls=args.replica_urls)
+    runner = BatchRunner(
+        db,
+        db.get_schema(),
+        model_name=args.model,
+        persona=args.persona,
+        concurrency=args.concurrency,
+        db_concurrency=args.db_concurrency,
+        rpm=args.rpm,
+        tpm=args.tpm,
+        execute=not args.no_execute,
+        use_cache=not args.no_cache,
+    )
+
+    started = time.perf_counter()
+    results = run_sync(runner.run(questions))
+    write_results(results, args.output)
+
+    failed = sum(1 for result in results if result["status"] != "ok")
+    print(f"{len(results)} questions in {time.perf_counter() - started:.1f}s, "
+          f"{failed} failed. Results written to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+import sys
+import os
+import argparse
+import time
+
+# Ensure src is in python path
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from benchmarks.report import build_report, compare_reports, format_comparison, load_report, write_report
+from benchmarks.suite import BenchmarkSuite
+
+
+def _int_list(value: str) -> list:
+    return [int(item.replace("_", "")) for item in value.split(",") if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Offline benchmark of reflection, prompt building, generation, execution and render prep.")
+    parser.add_argument("--tables", type=_int_list, default=[10, 100, 1000, 5000],
+                        help="Comma-separated schema sizes (table counts)")
+    parser.add_argument("--rows", type=_int_list, default=[1000, 100000],
+                        help="Comma-separated result sizes (rows), e.g. 1000,100000,10000000")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--stage", action="append", dest="stages",
+                        help="Only run stages with this prefix (repeatable), e.g. --stage prompt")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--persona", default="elite_analyst")
+    parser.add_argument("--llm-ttft", type=float, default=0.05, help="Simulated time-to-first-token (s)")
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.002, help="Simulated delay per streamed chunk (s)")
+    parser.add_argument("--workdir", default=".askdb_bench", help="Where synthetic databases are built and reused")
+    parser.add_argument("--output", default=None, help="Report path (defaults to bench_results/<timestamp>.json)")
+    parser.add_argument("--compare", default=None, help="Baseline report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Median slowdown (fraction) counted as a regression in --compare")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore slowdowns smaller than this in --compare")
+    args = parser.parse_args(argv)
+
+    suite = BenchmarkSuite(
+        workdir=args.workdir,
+        table_counts=args.tables,
+        row_counts=args.rows,
+        repeats=args.repeats,
+        warmup=args.warmup,
+        model_name=args.model,
+        persona=args.persona,
+        llm_ttft=args.llm_ttft,
+        llm_chunk_delay=args.llm_chunk_delay,
+        stages=args.stages,
+    )
+    started = time.perf_counter()
+    results = suite.run()
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    report = build_report(results, settings)
+    output = args.output or os.path.join("bench_results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    write_report(report, output)
+    print(f"{len(results)} measurements in {time.perf_counter() - started:.1f}s. Report written to {output}")
+
+    if args.compare:
+        rows = compare_reports(load_report(args.compare), report, args.threshold, args.min_delta_ms)
+        print(format_comparison(rows))
+        if any(row["regression"] for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+REPORT_VERSION = 1
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def build_report(results: list, settings: dict) -> dict:
+    """
+    Wraps benchmark results with enough context to compare runs across commits.
+    """
+    return {
+        "version": REPORT_VERSION,
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_commit": _git("rev-parse", "HEAD") or None,
+            "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "settings": settings,
+        },
+        "results": results,
+    }
+
+
+def write_report(report: dict, path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+def load_report(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _key(result: dict) -> tuple:
+    return (result["stage"], tuple(sorted(result["scale"].items())))
+
+
+def compare_reports(baseline: dict, current: dict, threshold: float = 0.2, min_delta_ms: float = 1.0) -> list:
+    """
+    Matches results by (stage, scale) and returns one row per pair with the
+    median change. `regression` is set when the median grew by more than
+    `threshold` (a fraction) and by at least `min_delta_ms`, so timer noise
+    on sub-millisecond stages is not flagged.
+    """
+    previous = {_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = previous.get(_key(result))
+        if before is None:
+            continue
+        old, new = before["timing"]["median_ms"], result["timing"]["median_ms"]
+        change = (new - old) / old if old else 0.0
+        rows.append({
+            "stage": result["stage"],
+            "scale": result["scale"],
+            "baseline_ms": old,
+            "current_ms": new,
+            "change": round(change, 4),
+            "regression": change > threshold and new - old >= min_delta_ms,
+        })
+    return rows
+
+
+def format_comparison(rows: list) -> str:
+    lines = [f"{'stage':<28} {'scale':<16} {'baseline ms':>12} {'current ms':>12} {'change':>9}"]
+    for row in rows:
+        scale = ",".join(f"{k}={v}" for k, v in row["scale"].items())
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['stage']:<28} {scale:<16} {row['baseline_ms']:>12.2f} "
+                     f"{row['current_ms']:>12.2f} {row['change']:>+8.1%}{flag}")
+    return "\n".join(lines)
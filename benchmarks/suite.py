@@ -0,0 +1,289 @@
+import io
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import pyarrow as pa
+
+from benchmarks.synthetic import rows_database, schema_database
+from src.models.db_executor import DatabaseExecutor
+from src.models.fake_llm import FakeAsyncOpenAI
+from src.models.llm_cache import LLMResponseCache
+from src.models.prompts import builder as prompt_builder
+from src.models.prompts import schema_index
+from src.models.prompts.builder import SystemPromptBuilder
+from src.models.schema_cache import SchemaCache
+from src.models.schema_reflection import catalog_fingerprint, reflect_schema
+from src.models.sql_generator import SQLQueryGenerator
+from src.models.utils import estimate_tokens, schema_fingerprint
+
+QUESTION = "What is the total sales amount per product category?"
+CANNED_SQL = {
+    "per product category": (
+        "SELECT category, SUM(amount) AS total_amount, COUNT(*) AS orders "
+        "FROM sales GROUP BY category ORDER BY total_amount DESC;"
+    ),
+}
+SELECT_ALL_SQL = "SELECT * FROM sales"
+
+# What each entry point imports before it can serve its first request
+STARTUP_IMPORTS = {
+    "app": ["streamlit", "src.controllers.home_controller"],
+    "api": ["src.controllers.api_controller", "src.models.query_service"],
+}
+# Heavy packages the app should only load once a query or model call needs them
+HEAVY_PACKAGES = ("openai", "pandas", "sqlalchemy", "sqlglot", "pyarrow")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(samples: list) -> dict:
+    """
+    Timing statistics in milliseconds.
+    """
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+    return {
+        "samples": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def measure(fn, repeats: int, warmup: int = 0, setup=None):
+    """
+    Times fn() `repeats` times (after `warmup` untimed runs); setup() runs
+    untimed before every call. Returns (timing, last result).
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+
+    samples = []
+    result = None
+    for _ in range(repeats):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples), result
+
+
+def arrow_payload(df) -> bytes:
+    """
+    Serializes a DataFrame the way st.dataframe ships it to the browser.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def import_profile(modules: list):
+    """
+    Imports modules in a fresh interpreter (without OPENAI_API_KEY) under
+    -X importtime. Returns (seconds, cumulative ms per top-level package).
+    """
+    code = (
+        "import sys, time\n"
+        "started = time.perf_counter()\n"
+        + "".join(f"import {name}\n" for name in modules)
+        + "print(time.perf_counter() - started)\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    packages = {}
+    for line in done.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        name = name.strip()
+        if "." not in name and cumulative.strip().isdigit():
+            packages[name] = max(packages.get(name, 0), int(cumulative) / 1000)
+    return float(done.stdout.strip().splitlines()[-1]), packages
+
+
+class BenchmarkSuite:
+    """
+    Runs every pipeline stage against synthetic SQLite databases and a fake
+    LLM client, with no network access.
+
+    Startup stages time the imports each entry point needs in a fresh
+    interpreter. Schema stages (reflection, schema cache, prompt building, generation)
+    run once per entry in `table_counts`; result stages (execution, render
+    prep) once per entry in `row_counts`. Databases are built once under
+    `workdir` and reused by later runs.
+    """
+
+    def __init__(self, workdir: str, table_counts: list, row_counts: list, repeats: int = 5,
+                 warmup: int = 1, model_name: str = "gpt-4o", persona: str = "elite_analyst",
+                 llm_ttft: float = 0.05, llm_chunk_delay: float = 0.002, stages: list = None,
+                 log=None):
+        self.workdir = workdir
+        self.table_counts = table_counts
+        self.row_counts = row_counts
+        self.repeats = repeats
+        self.warmup = warmup
+        self.model_name = model_name
+        self.persona = persona
+        self.llm_ttft = llm_ttft
+        self.llm_chunk_delay = llm_chunk_delay
+        self.stages = stages
+        self.log = log or (lambda message: print(message, file=sys.stderr))
+        self.results = []
+
+    def run(self) -> list:
+        os.makedirs(self.workdir, exist_ok=True)
+        self._run_startup_stages()
+        for tables in self.table_counts:
+            self._run_schema_stages(tables)
+        for rows in self.row_counts:
+            self._run_result_stages(rows)
+        return self.results
+
+    def _wanted(self, stage: str) -> bool:
+        return not self.stages or any(stage.startswith(prefix) for prefix in self.stages)
+
+    def _record(self, stage: str, scale: dict, timing: dict, **info):
+        self.results.append({"stage": stage, "scale": scale, "timing": timing, "info": info})
+        self.log(f"  {stage:<28} {timing['median_ms']:>10.2f} ms (p95 {timing['p95_ms']:.2f})")
+
+    def _run_startup_stages(self):
+        for entry, modules in STARTUP_IMPORTS.items():
+            stage = f"startup.import_{entry}"
+            if not self._wanted(stage):
+                continue
+            samples = []
+            for _ in range(self.warmup):
+                import_profile(modules)
+            for _ in range(self.repeats):
+                seconds, packages = import_profile(modules)
+                samples.append(seconds)
+            slowest = sorted(packages.items(), key=lambda item: -item[1])[:8]
+            self._record(
+                stage, {"entry": entry}, summarize(samples),
+                slowest_packages_ms={name: round(ms, 1) for name, ms in slowest},
+                heavy_packages_loaded=[name for name in HEAVY_PACKAGES if name in packages],
+            )
+
+    def _run_schema_stages(self, tables: int):
+        scale = {"tables": tables}
+        self.log(f"[tables={tables}] building database")
+        path = schema_database(os.path.join(self.workdir, f"schema_{tables}.db"), tables)
+        db = DatabaseExecutor(db_url=f"sqlite:///{os.path.abspath(path)}")
+        schema = reflect_schema(db.engine)
+        fingerprint = schema_fingerprint(schema)
+
+        if self._wanted("reflection.full"):
+            timing, _ = measure(lambda: reflect_schema(db.engine), self.repeats, self.warmup)
+            self._record("reflection.full", scale, timing, tables=len(schema))
+
+        if self._wanted("reflection.fingerprint"):
+            timing, _ = measure(lambda: catalog_fingerprint(db.engine), self.repeats, self.warmup)
+            self._record("reflection.fingerprint", scale, timing)
+
+        if self._wanted("schema_cache"):
+            cache_dir = os.path.join(self.workdir, "schema_cache")
+            loads = []
+
+            def cached_get(cache):
+                return cache.get(
+                    db.identity,
+                    fingerprint_fn=lambda: catalog_fingerprint(db.engine),
+                    loader=lambda: loads.append(1) or reflect_schema(db.engine),
+                )
+
+            warm_cache = SchemaCache(cache_dir, recheck_interval=3600)
+            cached_get(warm_cache)
+            loads.clear()
+            if self._wanted("schema_cache.disk"):
+                timing, _ = measure(lambda: cached_get(SchemaCache(cache_dir)), self.repeats, self.warmup)
+                self._record("schema_cache.disk", scale, timing, reloads=len(loads))
+            if self._wanted("schema_cache.memory"):
+                timing, _ = measure(lambda: cached_get(warm_cache), self.repeats, self.warmup)
+                self._record("schema_cache.memory", scale, timing, reloads=len(loads))
+
+        def build_prompt():
+            builder = SystemPromptBuilder(schema=schema, prompt_type=self.persona, model_name=self.model_name,
+                                          question=QUESTION, fingerprint=fingerprint)
+            return builder, builder.build()
+
+        def clear_prompt_memos():
+            prompt_builder._rendered_schemas.clear()
+            schema_index._index_cache.clear()
+
+        if self._wanted("prompt.build_cold"):
+            timing, (builder, prompt) = measure(build_prompt, self.repeats, setup=clear_prompt_memos)
+            self._record("prompt.build_cold", scale, timing, prompt_tokens=estimate_tokens(prompt), **builder.stats)
+
+        builder, system_prompt = build_prompt()
+        if self._wanted("prompt.build_warm"):
+            timing, _ = measure(build_prompt, self.repeats, self.warmup)
+            self._record("prompt.build_warm", scale, timing, prompt_tokens=estimate_tokens(system_prompt))
+
+        if self._wanted("generation"):
+            client = FakeAsyncOpenAI(responses=CANNED_SQL, ttft=self.llm_ttft, chunk_delay=self.llm_chunk_delay)
+            cache = LLMResponseCache(path=os.path.join(self.workdir, "llm_cache.sqlite3"), enabled=True)
+            generator = SQLQueryGenerator(cache=cache, client=client)
+            ttfts = []
+
+            def generate(use_cache):
+                sql = generator.generate_sql(QUESTION, system_prompt, self.model_name, use_cache=use_cache)
+                ttfts.append(generator.last_ttft)
+                return sql
+
+            if self._wanted("generation.llm"):
+                timing, _ = measure(lambda: generate(False), self.repeats, self.warmup)
+                self._record(
+                    "generation.llm", scale, timing,
+                    simulated_ttft_ms=self.llm_ttft * 1000,
+                    median_ttft_ms=round(statistics.median(ttfts) * 1000, 3),
+                    prompt_tokens=generator.last_usage.prompt_tokens,
+                    cached_tokens=generator.last_cached_tokens,
+                )
+            if self._wanted("generation.cache_hit"):
+                generate(True)
+                timing, _ = measure(lambda: generate(True), self.repeats, self.warmup)
+                self._record("generation.cache_hit", scale, timing, cache_hit=generator.last_cache_hit)
+            cache.clear()
+
+    def _run_result_stages(self, rows: int):
+        scale = {"rows": rows}
+        self.log(f"[rows={rows}] building database")
+        path = rows_database(os.path.join(self.workdir, f"rows_{rows}.db"), rows)
+        db = DatabaseExecutor(db_url=f"sqlite:///{os.path.abspath(path)}")
+
+        if self._wanted("execution.first_chunk"):
+            def first_chunk():
+                stream = db.stream_query(SELECT_ALL_SQL)
+                chunk = stream.fetch_next()
+                stream.close()
+                return chunk
+
+            timing, chunk = measure(first_chunk, self.repeats, self.warmup)
+            self._record("execution.first_chunk", scale, timing, rows=len(chunk))
+
+        df = None
+        if self._wanted("execution.select_all") or self._wanted("render"):
+            timing, df = measure(lambda: db.execute_query(SELECT_ALL_SQL), self.repeats, self.warmup)
+            if self._wanted("execution.select_all"):
+                self._record("execution.select_all", scale, timing, **df.attrs)
+
+        if self._wanted("execution.aggregate"):
+            timing, result = measure(lambda: db.execute_query(CANNED_SQL["per product category"]),
+                                     self.repeats, self.warmup)
+            self._record("execution.aggregate", scale, timing, rows=len(result))
+
+        if self._wanted("render.arrow"):
+            timing, payload = measure(lambda: arrow_payload(df), self.repeats, self.warmup)
+            self._record("render.arrow", scale, timing, rows=len(df), arrow_bytes=len(payload))
@@ -0,0 +1,150 @@
+import os
+import random
+import sqlite3
+
+# Core tables every synthetic database has, so canned questions resolve
+CORE_TABLES = {
+    "customers": [
+        "id INTEGER PRIMARY KEY",
+        "name TEXT NOT NULL",
+        "email TEXT",
+        "country TEXT",
+        "created_at TEXT",
+    ],
+    "products": [
+        "id INTEGER PRIMARY KEY",
+        "name TEXT NOT NULL",
+        "category TEXT",
+        "price REAL",
+    ],
+    "sales": [
+        "id INTEGER PRIMARY KEY",
+        "customer_id INTEGER REFERENCES customers(id)",
+        "product_id INTEGER REFERENCES products(id)",
+        "category TEXT",
+        "quantity INTEGER",
+        "amount REAL",
+        "created_at TEXT",
+    ],
+}
+
+_DOMAINS = ["billing", "inventory", "shipping", "marketing", "support", "hr", "finance", "analytics",
+            "catalog", "payments", "warehouse", "crm", "audit", "loyalty", "procurement"]
+_ENTITIES = ["accounts", "invoices", "items", "events", "tickets", "employees", "ledgers", "campaigns",
+             "shipments", "vendors", "refunds", "sessions", "contracts", "budgets", "locations"]
+_COLUMN_TYPES = ["INTEGER", "TEXT", "REAL", "TEXT", "INTEGER"]
+_CATEGORIES = ["books", "electronics", "garden", "toys", "grocery", "clothing", "sports", "beauty"]
+
+
+def filler_table_names(count: int) -> list:
+    """
+    Deterministic, realistic-looking table names: billing_invoices, crm_events_2, ...
+    """
+    names = []
+    i = 0
+    while len(names) < count:
+        domain = _DOMAINS[i % len(_DOMAINS)]
+        entity = _ENTITIES[(i // len(_DOMAINS)) % len(_ENTITIES)]
+        round_ = i // (len(_DOMAINS) * len(_ENTITIES))
+        names.append(f"{domain}_{entity}" + (f"_{round_ + 1}" if round_ else ""))
+        i += 1
+    return names
+
+
+def schema_database(path: str, tables: int, seed: int = 0) -> str:
+    """
+    Creates (once) a SQLite database with `tables` tables: the core tables
+    plus filler tables of 3-10 columns, some with foreign keys to earlier ones.
+    """
+    if _is_complete(path):
+        return path
+
+    rng = random.Random(seed)
+    conn = _fresh(path)
+    with conn:
+        _create_core(conn)
+        created = list(CORE_TABLES)
+        for name in filler_table_names(max(0, tables - len(CORE_TABLES))):
+            columns = ["id INTEGER PRIMARY KEY"]
+            for c in range(rng.randint(2, 9)):
+                columns.append(f"{name.split('_')[1].rstrip('s')}_attr_{c} {rng.choice(_COLUMN_TYPES)}")
+            if rng.random() < 0.4:
+                parent = rng.choice(created)
+                columns.append(f"{parent}_id INTEGER REFERENCES {parent}(id)")
+            conn.execute(f"CREATE TABLE {name} ({', '.join(columns)})")
+            created.append(name)
+        _mark_complete(conn)
+    conn.close()
+    return path
+
+
+def rows_database(path: str, rows: int, seed: int = 0) -> str:
+    """
+    Creates (once) a SQLite database with the core tables and `rows` rows in `sales`.
+    Rows are generated inside SQLite, so 10M rows take seconds rather than minutes.
+    """
+    if _is_complete(path):
+        return path
+
+    rng = random.Random(seed)
+    conn = _fresh(path)
+    with conn:
+        _create_core(conn)
+        conn.executemany(
+            "INSERT INTO customers VALUES (?, ?, ?, ?, ?)",
+            [(i, f"customer {i}", f"c{i}@example.com", rng.choice(["US", "DE", "IN", "BR", "JP"]),
+              f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}") for i in range(1, 1001)],
+        )
+        conn.executemany(
+            "INSERT INTO products VALUES (?, ?, ?, ?)",
+            [(i, f"product {i}", _CATEGORIES[i % len(_CATEGORIES)], round(rng.uniform(1, 500), 2))
+             for i in range(1, 201)],
+        )
+        categories = ", ".join(f"'{c}'" for c in _CATEGORIES)
+        conn.execute(
+            f"""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < ?)
+            INSERT INTO sales (id, customer_id, product_id, category, quantity, amount, created_at)
+            SELECT n,
+                   abs(random()) % 1000 + 1,
+                   abs(random()) % 200 + 1,
+                   json_extract(json_array({categories}), '$[' || (abs(random()) % {len(_CATEGORIES)}) || ']'),
+                   abs(random()) % 10 + 1,
+                   round((abs(random()) % 100000) / 100.0, 2),
+                   date('2024-01-01', '+' || (n % 365) || ' days')
+            FROM seq
+            """,
+            (rows,),
+        )
+        _mark_complete(conn)
+    conn.close()
+    return path
+
+
+def _create_core(conn):
+    for name, columns in CORE_TABLES.items():
+        conn.execute(f"CREATE TABLE {name} ({', '.join(columns)})")
+
+
+def _fresh(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    return conn
+
+
+def _mark_complete(conn):
+    # Written last, so an interrupted build is rebuilt next time
+    conn.execute("PRAGMA user_version = 1")
+
+
+def _is_complete(path: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    finally:
+        conn.close()
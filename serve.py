@@ -0,0 +1,123 @@
+import sys
+import os
+import argparse
+import json
+
+# Ensure src is in python path
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+
+def _build_service(args):
+    from src.models.db_executor import DatabaseExecutor
+    from src.models.fake_llm import FakeAsyncOpenAI
+    from src.models.query_service import QueryService
+
+    client = FakeAsyncOpenAI(default_sql=args.fake_sql, ttft=args.fake_ttft) if args.fake_llm else None
+    db = DatabaseExecutor(db_url=args.db_url, replica_urls=args.replica_urls)
+    return QueryService(
+        db,
+        model_name=args.model,
+        persona=args.persona,
+        client=client,
+        llm_concurrency=args.llm_concurrency,
+        db_concurrency=args.db_concurrency,
+    )
+
+
+def _serve(service, args) -> int:
+    import uvicorn
+
+    from src.controllers.api_controller import create_app
+    from src.models.async_runtime import submit, submit_blocking
+    from src.models.sql_generator import get_async_client
+
+    if service.client is None:
+        # Created on first use otherwise; warm it while the server starts
+        submit_blocking(get_async_client)
+    config = uvicorn.Config(create_app(service), host=args.host, port=args.port,
+                            log_level=args.log_level, access_log=args.access_log)
+    server = uvicorn.Server(config)
+    # Served from the shared background loop, the one the async OpenAI client's pool is bound to
+    future = submit(server.serve())
+    try:
+        future.result()
+    except KeyboardInterrupt:
+        server.should_exit = True
+        future.result(timeout=30)
+    return 0
+
+
+def _run_once(service, args) -> int:
+    from src.controllers.api_controller import frame_to_arrow, frame_to_json
+    from src.models.async_runtime import run_sync
+    from src.models.query_service import ServiceError
+
+    try:
+        if args.command == "generate":
+            print(json.dumps(run_sync(service.generate(args.text)), indent=2))
+            return 0
+        if args.command == "explain":
+            print(json.dumps(run_sync(service.explain(args.text)), indent=2))
+            return 0
+        if args.command == "ask":
+            meta, outcome = run_sync(service.ask(args.text))
+        else:
+            sql, outcome = run_sync(service.execute(args.text))
+            meta = {"sql": sql}
+    except ServiceError as e:
+        print(json.dumps({"status": e.status, "error": e.message, **e.details}, indent=2), file=sys.stderr)
+        return 1
+
+    if isinstance(outcome, str):
+        print(json.dumps({**meta, "message": outcome}, indent=2))
+        return 0
+    meta = {**meta, "row_count": len(outcome), "truncated": bool(outcome.attrs.get("truncated"))}
+    if args.output:
+        arrow = args.output.endswith((".arrow", ".arrows"))
+        with open(args.output, "wb") as f:
+            f.write(frame_to_arrow(outcome, meta) if arrow else frame_to_json(outcome, meta))
+        print(f"{meta['row_count']} rows written to {args.output}")
+    else:
+        sys.stdout.write(frame_to_json(outcome, meta).decode() + "\n")
+    return 0
+
+
+def main(argv=None):
+    from src.models.utils import load_env
+
+    load_env()
+    parser = argparse.ArgumentParser(description="Headless API server and one-shot CLI (no Streamlit).")
+    parser.add_argument("command", choices=["serve", "ask", "generate", "execute", "explain"],
+                        help="serve: run the HTTP API; the others answer one question or SQL statement and exit")
+    parser.add_argument("text", nargs="?", help="The question (ask/generate) or SQL (execute/explain)")
+    parser.add_argument("--db-url", default=os.getenv("DATABASE_URL"), help="Database URL (defaults to $DATABASE_URL)")
+    parser.add_argument("--replica-url", action="append", dest="replica_urls", default=None,
+                        help="Read replica URL (repeatable); defaults to $ASKDB_REPLICA_URLS")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--persona", default="elite_analyst")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")))
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--access-log", action="store_true", help="Log every request (off for throughput)")
+    parser.add_argument("--llm-concurrency", type=int, default=None, help="Concurrent model calls")
+    parser.add_argument("--db-concurrency", type=int, default=None, help="Concurrent database calls")
+    parser.add_argument("--output", default=None, help="Write rows to this file (.arrow for Arrow IPC, else JSON)")
+    parser.add_argument("--fake-llm", action="store_true",
+                        help="Answer with the offline fake model instead of OpenAI (local testing)")
+    parser.add_argument("--fake-sql", default="SELECT 1;", help="SQL the fake model returns")
+    parser.add_argument("--fake-ttft", type=float, default=0.05, help="Fake model time-to-first-token (s)")
+    args = parser.parse_args(argv)
+
+    if not args.db_url:
+        parser.error("a database URL is required (--db-url or $DATABASE_URL)")
+    if args.command != "serve" and not args.text:
+        parser.error(f"{args.command} needs a question or SQL statement")
+
+    service = _build_service(args)
+    if args.command == "serve":
+        return _serve(service, args)
+    return _run_once(service, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
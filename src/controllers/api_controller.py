@@ -0,0 +1,193 @@
+import asyncio
+import io
+import json
+import math
+
+import pyarrow as pa
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from src.models import telemetry
+from src.models.query_errors import QueryStatus
+from src.models.query_service import QueryService, ServiceError
+from src.models.utils import env_float
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# HTTP status for each ServiceError status; anything else is a bad request
+_ERROR_CODES = {
+    "invalid_query": 422,
+    "invalid_sql": 422,
+    QueryStatus.BLOCKED: 422,
+    QueryStatus.TIMEOUT: 504,
+    QueryStatus.CANCELLED: 503,
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def create_app(service: QueryService) -> Starlette:
+    """
+    The headless HTTP API. Every endpoint is a thin async wrapper around
+    the shared QueryService, so concurrent requests share its pools and
+    caches instead of paying for a Streamlit rerun each.
+
+    POST /generate {"question"}            -> SQL
+    POST /execute  {"sql"}                 -> rows
+    POST /ask      {"question"}            -> SQL and rows
+    POST /explain  {"sql"}                 -> plan and cost guard decision
+    GET  /schema, /health, /metrics
+
+    Rows come back as JSON, or as an Arrow IPC stream when the request
+    says "format": "arrow" or sends Accept: application/vnd.apache.arrow.stream.
+    """
+
+    async def generate(request):
+        body = await _body(request, "question")
+        return await service.generate(body["question"], body.get("model"), body.get("persona"),
+                                      use_cache=body.get("use_cache", True))
+
+    async def execute(request):
+        body = await _body(request, "sql")
+        sql, outcome = await service.execute(body["sql"], use_cache=body.get("use_cache", True),
+                                             timeout=body.get("timeout"))
+        return await _result_response(request, body, {"sql": sql}, outcome)
+
+    async def ask(request):
+        body = await _body(request, "question")
+        generated, outcome = await service.ask(body["question"], body.get("model"), body.get("persona"),
+                                               use_cache=body.get("use_cache", True), timeout=body.get("timeout"))
+        return await _result_response(request, body, generated, outcome)
+
+    async def explain(request):
+        body = await _body(request, "sql")
+        return await service.explain(body["sql"])
+
+    async def schema(request):
+        tables = await service.schema(refresh=request.query_params.get("refresh") == "1")
+        return {"dialect": service.dialect, "tables": tables}
+
+    async def health(request):
+        return JSONResponse({"status": "ok", "pool": service.db.pool_stats(),
+                             "endpoints": service.db.endpoint_stats()})
+
+    async def metrics(request):
+        return PlainTextResponse(telemetry.metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    return Starlette(routes=[
+        Route("/generate", _traced("generate", generate), methods=["POST"]),
+        Route("/execute", _traced("execute", execute), methods=["POST"]),
+        Route("/ask", _traced("ask", ask), methods=["POST"]),
+        Route("/explain", _traced("explain", explain), methods=["POST"]),
+        Route("/schema", _traced("schema", schema), methods=["GET"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ])
+
+
+def _traced(name: str, handler):
+    """
+    Runs handler inside a trace named api.<name> and turns its result or
+    error into a response carrying the trace id.
+    """
+    async def endpoint(request):
+        trace = telemetry.Trace(f"api.{name}")
+        with trace:
+            try:
+                result = await handler(request)
+                response = result if isinstance(result, Response) else JSONResponse(result)
+            except BadRequest as e:
+                response = _error(400, "bad_request", str(e))
+            except ServiceError as e:
+                response = _error(_ERROR_CODES.get(e.status, 400), e.status, e.message, **e.details)
+            except Exception as e:
+                response = _error(500, "error", str(e))
+        trace.attrs["status_code"] = response.status_code
+        trace.finish()
+        telemetry.metrics.inc("askdb_api_requests_total", help="HTTP API requests",
+                              endpoint=name, code=str(response.status_code))
+        response.headers["X-AskDB-Trace"] = trace.trace_id
+        response.headers["Server-Timing"] = f"total;dur={trace.duration * 1000:.1f}"
+        return response
+
+    return endpoint
+
+
+async def _body(request, required: str) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("Request body must be JSON.")
+    if not isinstance(body, dict) or not isinstance(body.get(required), str) or not body[required].strip():
+        raise BadRequest(f'"{required}" is required.')
+    if body.get("timeout") is not None:
+        body["timeout"] = _timeout(body["timeout"])
+    return body
+
+
+def _timeout(value) -> float:
+    """
+    A client's statement timeout in seconds: positive, and never longer
+    than the server's ASKDB_STATEMENT_TIMEOUT (0, "no timeout", is refused).
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        raise BadRequest('"timeout" must be a positive number of seconds.')
+    limit = env_float("ASKDB_STATEMENT_TIMEOUT", 60.0)
+    return min(value, limit) if limit > 0 else value
+
+
+def _error(code: int, status: str, message: str, **details) -> JSONResponse:
+    return JSONResponse({"status": status, "error": message, **details}, status_code=code)
+
+
+def wants_arrow(request, body: dict) -> bool:
+    fmt = body.get("format")
+    if fmt:
+        return fmt == "arrow"
+    return ARROW_STREAM in request.headers.get("accept", "")
+
+
+async def _result_response(request, body: dict, meta: dict, outcome) -> Response:
+    if isinstance(outcome, str):
+        # A write: there are no rows, just the status line
+        return JSONResponse({**meta, "message": outcome})
+    meta = {**meta, "row_count": len(outcome), "truncated": bool(outcome.attrs.get("truncated"))}
+    # Encoding 100k rows takes long enough to stall other requests, so it runs off the loop
+    if wants_arrow(request, body):
+        return Response(await asyncio.to_thread(frame_to_arrow, outcome, meta), media_type=ARROW_STREAM,
+                        headers={"X-AskDB-Rows": str(meta["row_count"])})
+    return Response(await asyncio.to_thread(frame_to_json, outcome, meta), media_type="application/json")
+
+
+def frame_to_json(frame, meta: dict) -> bytes:
+    """
+    {**meta, "columns": [...], "rows": [[...], ...]}. Rows are serialized by
+    pandas in one pass instead of building a Python object per cell.
+    """
+    head = json.dumps({**meta, "columns": [str(c) for c in frame.columns]}, default=str)
+    rows = frame.to_json(orient="values", date_format="iso", default_handler=str)
+    return f'{head[:-1]}, "rows": {rows}}}'.encode()
+
+
+def frame_to_arrow(frame, meta: dict) -> bytes:
+    """
+    The frame as an Arrow IPC stream; meta travels in the schema metadata
+    under "askdb" as JSON. Compacted columns keep their types (dictionary
+    strings, date32, narrow ints).
+    """
+    try:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Object columns mixing types (as in ParquetBatchWriter): send them as strings
+        mixed = {name: frame[name].map(lambda v: None if v is None else str(v))
+                 for name in frame.columns if frame[name].dtype == object}
+        table = pa.Table.from_pandas(frame.assign(**mixed), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           b"askdb": json.dumps(meta, default=str).encode()})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
@@ -1,88 +1,418 @@
 import streamlit as st
+import os
 import re
-from src.models.sql_generator import SQLQueryGenerator
-from src.models.db_executor import DatabaseExecutor
+import importlib
+from contextlib import nullcontext
+from src.models import telemetry
+from src.models.async_runtime import iterate_sync, submit_blocking
+from src.models.llm_cache import llm_cache
+from src.models.model_race import SINGLE, generation_strategy, race_stats
+from src.models.prompts.builder import SystemPromptBuilder
+from src.models.prompts.few_shot import few_shot_store
+from src.models.result_cache import result_cache
+from src.models.schema_browser import get_browser_index
 from src.models.utils import is_local_or_private
 from src.views import home_view, sidebar_view
 
+# pandas, SQLAlchemy, sqlglot and openai are imported inside the handlers that
+# use them, so a cold process renders the connection form without loading them
+# (and preloads them in the background while the form is filled in)
+_HEAVY_MODULES = (
+    "src.models.preflight",
+    "src.models.query_job",
+    "src.models.result_stream",
+    "src.models.sql_validator",
+    "src.models.ddl_parser",
+    "src.models.batch_runner",
+    "openai",
+)
+_preloading = None
+
 def run():
+    telemetry.start_metrics_server()
     home_view.render_header()
     model_name, persona = sidebar_view.render_ai_config()
+    st.session_state.bypass_llm_cache = sidebar_view.render_cache_controls(llm_cache.stats())
+    st.session_state.bypass_result_cache = sidebar_view.render_result_cache_controls(result_cache.stats())
+    sidebar_view.render_few_shot_stats(few_shot_store.stats())
+    if generation_strategy() != SINGLE:
+        sidebar_view.render_race_stats(race_stats.stats())
     
-    app_mode = st.radio("Select Input Source:", ["Live Database", "Manual Schema (Copy-Paste)"])
+    app_mode = st.radio("Select Input Source:", ["Live Database", "Manual Schema (Copy-Paste)", "Batch Questions (Upload)"])
 
     if app_mode == "Manual Schema (Copy-Paste)":
         _handle_manual_mode(model_name, persona)
     else:
         if "db_config" not in st.session_state:
+            _preload_modules()
             config = home_view.render_connection_form()
             if config:
+                from src.models.preflight import Preflight
+
                 st.session_state.db_config = config
+                # Warm-up starts now, while the page reruns
+                st.session_state.preflight = Preflight(config).start()
                 st.rerun()
+        elif app_mode == "Batch Questions (Upload)":
+            _handle_batch_mode(model_name, persona)
         else:
             _handle_connected_state(model_name, persona)
 
+    sidebar_view.render_metrics_panel(
+        st.session_state.get("last_trace"),
+        telemetry.metrics.snapshot(),
+        telemetry.metrics.render_prometheus(),
+    )
+
+def _preload_modules():
+    """Imports the heavy modules in a background thread, once per process."""
+    global _preloading
+    if _preloading is None:
+        _preloading = submit_blocking(lambda: [importlib.import_module(name) for name in _HEAVY_MODULES])
+
 def _handle_manual_mode(model_name, persona):
     schema_text = st.text_area("Paste your Table Schema", height=300)
     question, clicked = home_view.render_query_interface()
 
     if clicked and schema_text:
-        sql_gen = SQLQueryGenerator()
-        system_prompt = f"You are a Senior Data Analyst at Google. Use this schema context: {schema_text}. Persona: {persona}\\nOutput strictly raw SQL without markdown or conversational text."
-        
-        with st.spinner("Generating SQL..."):
-            sql = sql_gen.generate_sql(question, system_prompt, model_name)
-            home_view.display_sql_and_results(sql, None, None, persona)
+        from src.models.ddl_parser import parse_ddl
+        from src.models.sql_generator import SQLQueryGenerator
+
+        trace = telemetry.Trace("manual", model=model_name, persona=persona, question=question)
+        with trace:
+            sql_gen = SQLQueryGenerator()
+            with telemetry.span("schema.parse") as span:
+                # Cached by content hash, so reruns with the same paste don't reparse
+                schema, skipped = parse_ddl(schema_text)
+                span.set(tables=len(schema), skipped=len(skipped))
+
+            prompt_stats = None
+            if schema:
+                builder = SystemPromptBuilder(
+                    schema=schema,
+                    prompt_type=persona,
+                    model_name=model_name,
+                    question=question,
+                )
+                system_prompt = builder.build()
+                prompt_stats = builder.stats
+            else:
+                # Not DDL (e.g. a prose description of the tables): pass it through as is
+                system_prompt = f"You are a Senior Data Analyst at Google. Use this schema context: {schema_text}. Persona: {persona}\\nOutput strictly raw SQL without markdown or conversational text."
+            home_view.render_parsed_schema(len(schema), skipped)
+
+            home_view.render_sql_stream(
+                sql_gen.generate_sql_stream(question, system_prompt, model_name, use_cache=not st.session_state.bypass_llm_cache)
+            )
+            home_view.render_generation_stats(
+                sql_gen.last_ttft, sql_gen.last_latency, sql_gen.last_cache_hit,
+                sql_gen.last_usage, sql_gen.last_cached_tokens,
+                winner=sql_gen.last_model if sql_gen.strategy != SINGLE else None,
+            )
+            with telemetry.span("render"):
+                home_view.display_sql_and_results(sql_gen.last_sql, None, None, persona)
+            if prompt_stats:
+                home_view.render_prompt_stats(prompt_stats)
+        trace.finish()
+        st.session_state.last_trace = trace.to_dict()
             
+def _handle_batch_mode(model_name, persona):
+    from src.models.batch_runner import BatchRunner, format_results, load_questions
+    from src.models.db_executor import DatabaseExecutor
+
+    db_config = st.session_state.db_config
+    db = DatabaseExecutor(config=db_config, db_url=db_config.get("db_url", None))
+
+    uploaded, clicked = home_view.render_batch_interface()
+
+    if clicked and uploaded is not None:
+        questions = load_questions(uploaded)
+        if not questions:
+            st.warning("No questions found. Provide a 'question' column (CSV) or field (JSONL).")
+            return
+
+        try:
+            schema = db.get_schema()
+        except Exception as e:
+            st.error(f"Failed to connect to database: {e}")
+            return
+
+        runner = BatchRunner(
+            db,
+            schema,
+            model_name=model_name,
+            persona=persona,
+            use_cache=not st.session_state.bypass_llm_cache,
+        )
+        results = home_view.render_batch_progress(iterate_sync(runner.iter_results(questions)), len(questions))
+        order = {item["id"]: i for i, item in enumerate(questions)}
+        st.session_state.batch_results = sorted(results, key=lambda result: order.get(result["id"], 0))
+
+    if st.session_state.get("batch_results"):
+        results = st.session_state.batch_results
+        home_view.display_batch_results(results, format_results(results, "jsonl"))
+
+def _render_reset_connection():
+    if st.button("Reset Connection"):
+        del st.session_state.db_config
+        st.session_state.pop("preflight", None)
+        st.rerun()
+
 def _handle_connected_state(model_name, persona):
+    import pandas as pd
+    from src.models.db_executor import DatabaseExecutor
+    from src.models.preflight import Preflight
+    from src.models.query_job import QueryJob
+    from src.models.result_stream import QueryStream
+    from src.models.sql_generator import SQLQueryGenerator
+    from src.models.sql_validator import SQLValidator, repair_enabled, validation_enabled
+
     db_config = st.session_state.db_config
-    
-    sql_gen = SQLQueryGenerator()
+    preflight = st.session_state.get("preflight")
+    if preflight is None or preflight.config is not db_config:
+        preflight = st.session_state.preflight = Preflight(db_config).start()
+    # The question box only appears once the warm-up is done, so it is ready to use
+    if not home_view.render_preflight(preflight):
+        return
+    if preflight.error:
+        _render_reset_connection()
+        return
+
     db = DatabaseExecutor(config=db_config, db_url=db_config.get("db_url", None))
+    sql_gen = SQLQueryGenerator(dialect=db.engine.dialect.name if db.engine is not None else None)
     
+    refresh_schema = sidebar_view.render_schema_refresh()
+    # Only kept (and logged) if this run turns out to answer a question
+    trace = telemetry.Trace("question", model=model_name, persona=persona)
+    with trace:
+        # Schema loading runs in the background while the question box renders
+        schema_future = submit_blocking(db.get_schema, refresh=refresh_schema)
+    question, clicked = home_view.render_query_interface()
+
     try:
-        schema = db.get_schema()
-        sidebar_view.render_schema_viewer(schema)
-        
-        if isinstance(schema, str) and "please seed some data" in schema.lower():
-             system_prompt = ""
-        else:
-             from src.models.prompts.builder import SystemPromptBuilder
-             system_prompt = SystemPromptBuilder(
-                 schema=schema, 
-                 prompt_type=persona, 
-                 model_name=model_name
-             ).build()
+        schema = schema_future.result()
+        sidebar_view.render_schema_viewer(schema, get_browser_index(schema) if isinstance(schema, dict) else None)
+        sidebar_view.render_endpoint_stats(db.endpoint_stats())
     except Exception as e:
         st.error(f"Failed to connect to database: {e}")
-        if st.button("Reset Connection"):
-            del st.session_state.db_config
-            st.rerun()
+        _render_reset_connection()
         return
-
-    question, clicked = home_view.render_query_interface()
     
     if clicked:
         if not question.strip():
             st.warning("Please enter a question.")
             return
+        trace.attrs["question"] = question
+        few_shot_store.record_question()
+        with trace:
+            prompt_stats = None
+            fingerprint = None
+            if isinstance(schema, str) and "please seed some data" in schema.lower():
+                 system_prompt = ""
+            else:
+                 # Built per question so large schemas can be pruned to relevant tables
+                 builder = SystemPromptBuilder(
+                     schema=schema,
+                     prompt_type=persona,
+                     model_name=model_name,
+                     question=question,
+                 )
+                 system_prompt = builder.build()
+                 prompt_stats = builder.stats
+                 fingerprint = builder.fingerprint
 
-        with st.spinner(f"Generating SQL using {model_name}..."):
-            sql = sql_gen.generate_sql(question, system_prompt, model_name)
+            home_view.render_sql_stream(
+                sql_gen.generate_sql_stream(question, system_prompt, model_name, use_cache=not st.session_state.bypass_llm_cache)
+            )
+            sql = sql_gen.last_sql
+            home_view.render_generation_stats(
+                sql_gen.last_ttft, sql_gen.last_latency, sql_gen.last_cache_hit,
+                sql_gen.last_usage, sql_gen.last_cached_tokens,
+                winner=sql_gen.last_model if sql_gen.strategy != SINGLE else None,
+            )
         
-        result = None
-        error = None
-        should_execute = True
+            result = None
+            error = None
+            should_execute = True
+            repaired_errors = None
 
-        if sql.startswith("INVALID_QUERY"):
-            should_execute = False
+            if sql.startswith("INVALID_QUERY"):
+                should_execute = False
+            elif system_prompt != "" and validation_enabled():
+                # Hallucinated tables/columns are caught here, not by the database
+                validator = SQLValidator(schema, db.engine.dialect.name, fingerprint=fingerprint)
+                validation = _validate(validator, sql)
+                if not validation.ok and repair_enabled():
+                    repaired_errors = validation.errors
+                    home_view.render_repair_stream(
+                        validation.errors,
+                        sql_gen.repair_sql_stream(question, system_prompt, sql, validation.errors, model_name),
+                    )
+                    sql = sql_gen.last_sql
+                    if sql.startswith("INVALID_QUERY"):
+                        should_execute = False
+                    else:
+                        validation = _validate(validator, sql)
+                        if validation.ok:
+                            sql_gen.remember(question, system_prompt, model_name, sql)
+                if should_execute and not validation.ok:
+                    should_execute = False
+                    error = "Query rejected before execution:\n" + validation.message
+                    sql_gen.forget(question, system_prompt, model_name)
         
-        if should_execute and system_prompt != "":
-             with st.spinner("Executing query..."):
-                final_sql_for_exec = sql.replace("```sql", "").replace("```", "").strip()
-                result = db.execute_query(final_sql_for_exec)
-        elif system_prompt == "":
-             result = "Please seed some data"
-             error = "The database schema is empty."
-
-        home_view.display_sql_and_results(sql, result, error, persona)
+            _close_last_run()
+
+            job = None
+            decision = None
+            if should_execute and system_prompt != "":
+                 final_sql_for_exec = sql.replace("```sql", "").replace("```", "").strip()
+                 # Expensive plans are blocked, flagged or capped before they reach the server
+                 decision = db.guard_query(final_sql_for_exec, use_cache=not st.session_state.bypass_result_cache)
+                 final_sql_for_exec = sql = decision.sql
+                 if decision.blocked:
+                     should_execute = False
+                     error = "Query blocked by the cost guard:\n" + decision.message
+            if should_execute and system_prompt != "":
+                 # Runs off the script thread so the Cancel button stays responsive
+                 job = QueryJob(db, final_sql_for_exec, use_cache=not st.session_state.bypass_result_cache)
+            elif system_prompt == "":
+                 result = "Please seed some data"
+                 error = "The database schema is empty."
+
+            # Kept across reruns so streamed results can page in on demand
+            st.session_state.last_run = {
+                "sql": sql,
+                "result": result,
+                "error": error,
+                "persona": persona,
+                "prompt_stats": prompt_stats,
+                "repaired_errors": repaired_errors,
+                "plan": decision,
+                "job": job,
+                "trace": trace,
+                # For the few-shot store: which question this answers, after how many SQL attempts
+                "question": question,
+                "fingerprint": fingerprint,
+                "attempts": 2 if repaired_errors else 1,
+                "source": "generated",
+                "answered": False,
+            }
+
+    last_run = st.session_state.get("last_run")
+    if last_run:
+        run_trace = last_run.get("trace")
+        with run_trace or nullcontext():
+            if last_run["job"] is not None:
+                last_run["result"] = home_view.render_query_progress(last_run["job"])
+                last_run["job"] = None
+            with telemetry.span("render"):
+                home_view.display_sql_and_results(
+                    last_run["sql"], last_run["result"], last_run["error"], last_run["persona"], last_run.get("plan"),
+                )
+        if isinstance(last_run["result"], (pd.DataFrame, QueryStream)) and not last_run["error"]:
+            _learn(last_run)
+            _handle_export(db, last_run["sql"])
+        if last_run.get("fingerprint") and not str(last_run["sql"]).startswith("INVALID_QUERY"):
+            edited_sql, rerun = home_view.render_sql_editor(last_run["sql"])
+            if rerun and edited_sql.strip():
+                _rerun_edited(db, schema, last_run, edited_sql.strip())
+                st.rerun()
+        if last_run["prompt_stats"]:
+            home_view.render_prompt_stats(last_run["prompt_stats"])
+        if last_run.get("repaired_errors"):
+            home_view.render_repair_summary(last_run["repaired_errors"])
+        if run_trace is not None:
+            # Later reruns (paging, downloads) are not part of this request
+            run_trace.finish()
+            st.session_state.last_trace = run_trace.to_dict()
+            last_run["trace"] = None
+
+def _learn(last_run):
+    """
+    Stores a question's SQL once it has run successfully, as an example for
+    similar questions, and counts the attempts it took.
+    """
+    if last_run.get("learned") or not last_run.get("fingerprint"):
+        return
+    few_shot_store.add(last_run["fingerprint"], last_run["question"], last_run["sql"], source=last_run["source"])
+    if not last_run["answered"]:
+        few_shot_store.record_success(last_run["attempts"])
+    last_run["learned"] = last_run["answered"] = True
+
+def _rerun_edited(db, schema, last_run, sql):
+    """
+    Replaces the last run with a hand-corrected query for the same question,
+    going through the same validation and cost guard as generated SQL.
+    """
+    from src.models.query_job import QueryJob
+    from src.models.sql_validator import SQLValidator, validation_enabled
+
+    error = None
+    job = None
+    decision = None
+    if validation_enabled():
+        validation = _validate(SQLValidator(schema, db.engine.dialect.name), sql)
+        if not validation.ok:
+            error = "Query rejected before execution:\n" + validation.message
+    if error is None:
+        decision = db.guard_query(sql, use_cache=not st.session_state.bypass_result_cache)
+        sql = decision.sql
+        if decision.blocked:
+            error = "Query blocked by the cost guard:\n" + decision.message
+        else:
+            job = QueryJob(db, sql, use_cache=not st.session_state.bypass_result_cache)
+
+    _close_last_run()
+    st.session_state.last_run = {
+        **last_run,
+        "sql": sql,
+        "result": None,
+        "error": error,
+        "repaired_errors": None,
+        "plan": decision,
+        "job": job,
+        "trace": None,
+        "attempts": last_run["attempts"] + 1,
+        "source": "edited",
+        "learned": False,
+    }
+
+def _handle_export(db, sql):
+    export_format, clicked = home_view.render_export_controls()
+    if clicked:
+        _discard_export()
+        try:
+            st.session_state.last_export = home_view.render_export_progress(db.export_query(sql, export_format))
+        except Exception as e:
+            st.error(f"Export failed: {e}")
+    if st.session_state.get("last_export"):
+        home_view.render_export_download(st.session_state.last_export)
+
+def _discard_export():
+    """Deletes the previous export file, if any."""
+    export = st.session_state.pop("last_export", None)
+    if export:
+        try:
+            os.remove(export["path"])
+        except OSError:
+            pass
+
+def _validate(validator, sql):
+    with telemetry.span("sql.validate") as span:
+        validation = validator.validate(sql)
+        span.set(ok=validation.ok, errors=len(validation.errors))
+        return validation
+
+def _close_last_run():
+    """Releases the server-side cursor held by the previous result, if any."""
+    from src.models.result_stream import QueryStream
+
+    _discard_export()
+    st.session_state.pop("edited_sql", None)
+    last_run = st.session_state.pop("last_run", None)
+    if not last_run:
+        return
+    if last_run["job"] is not None:
+        last_run["job"].cancel()
+    if isinstance(last_run["result"], QueryStream):
+        last_run["result"].close()
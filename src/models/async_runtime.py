@@ -0,0 +1,83 @@
+import asyncio
+import contextvars
+import queue
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+_DONE = object()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the process-wide background event loop, starting it on first use.
+    Async clients keep their connection pools bound to this one loop, so
+    they can be shared across Streamlit reruns and sessions.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="askdb-async", daemon=True)
+            thread.start()
+        return _loop
+
+
+def submit(coro):
+    """
+    Schedules a coroutine on the background loop and returns a concurrent.futures.Future.
+    The caller's context variables (e.g. the active trace) carry over.
+    """
+    return asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), get_loop())
+
+
+async def _in_context(coro, context):
+    # Tasks start from the loop thread's context, so restore the submitter's
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def run_sync(coro, timeout: float = None):
+    """
+    Runs a coroutine on the background loop and blocks for its result.
+    """
+    return submit(coro).result(timeout)
+
+
+def iterate_sync(async_iterable):
+    """
+    Drives an async iterator on the background loop and yields its items
+    from the calling (synchronous) thread as they arrive.
+    """
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in async_iterable:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((_DONE, e))
+            return
+        items.put((_DONE, None))
+
+    future = submit(pump())
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # The consumer stopped early (e.g. a Streamlit rerun); stop the producer too
+        future.cancel()
+
+
+def submit_blocking(fn, *args, **kwargs):
+    """
+    Runs a blocking function in the background loop's thread pool and
+    returns a concurrent.futures.Future for its result.
+    """
+    return submit(asyncio.to_thread(fn, *args, **kwargs))
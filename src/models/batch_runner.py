@@ -0,0 +1,318 @@
+import asyncio
+import csv
+import io
+import json
+import random
+import time
+
+from src.models.db_executor import DatabaseExecutor
+from src.models.prompts.builder import SystemPromptBuilder
+from src.models.prompts.few_shot import few_shot_store
+from src.models.query_errors import QueryFailure, QueryStatus
+from src.models.sql_generator import SQLQueryGenerator
+from src.models.sql_validator import SQLValidator, repair_enabled, validation_enabled
+from src.models.utils import env_int, estimate_tokens
+
+# Rough allowance for the completion when reserving tokens-per-minute budget
+_COMPLETION_TOKEN_ESTIMATE = 256
+
+
+def load_questions(source, name: str = None) -> list:
+    """
+    Reads questions from a CSV (a `question` column, optional `id`) or JSONL
+    ({"question": ..., "id": ...} per line) file path or file-like object.
+    Returns [{"id": ..., "question": ...}].
+    """
+    if isinstance(source, str):
+        name = name or source
+        with open(source, "r", encoding="utf-8") as f:
+            content = f.read()
+    else:
+        name = name or getattr(source, "name", "")
+        content = source.read()
+        if isinstance(content, bytes):
+            content = content.decode("utf-8")
+
+    if name.lower().endswith((".jsonl", ".json", ".ndjson")):
+        records = [json.loads(line) for line in content.splitlines() if line.strip()]
+    else:
+        records = list(csv.DictReader(io.StringIO(content)))
+
+    questions = []
+    for i, record in enumerate(records, start=1):
+        question = (record.get("question") or "").strip()
+        if question:
+            questions.append({"id": record.get("id") or str(i), "question": question})
+    return questions
+
+
+def write_results(results: list, path: str):
+    """
+    Writes batch results as CSV (for *.csv paths) or JSONL.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(format_results(results, "csv" if path.lower().endswith(".csv") else "jsonl"))
+
+
+def format_results(results: list, fmt: str = "jsonl") -> str:
+    if fmt == "csv":
+        out = io.StringIO()
+        if results:
+            writer = csv.DictWriter(out, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        return out.getvalue()
+    return "".join(json.dumps(result, default=str) + "\n" for result in results)
+
+
+class RateLimiter:
+    """
+    Async token buckets for requests-per-minute and tokens-per-minute.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                tokens_needed = min(tokens, self.tpm) if self.tpm else 0
+                requests_ok = not self.rpm or self._requests >= 1
+                tokens_ok = not self.tpm or self._tokens >= tokens_needed
+                if requests_ok and tokens_ok:
+                    if self.rpm:
+                        self._requests -= 1
+                    if self.tpm:
+                        self._tokens -= tokens_needed
+                    return
+
+                wait = 0.0
+                if not requests_ok:
+                    wait = max(wait, (1 - self._requests) * 60.0 / self.rpm)
+                if not tokens_ok:
+                    wait = max(wait, (tokens_needed - self._tokens) * 60.0 / self.tpm)
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Holds back every worker, e.g. after the API answered 429.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60.0)
+
+
+class BatchRunner:
+    """
+    Generates and executes SQL for many questions concurrently.
+
+    Generation is bounded by `concurrency` workers and the RPM/TPM limiter,
+    with exponential backoff on 429s. Generated SQL is validated against the
+    schema (with one repair round trip) before it runs. Execution goes through
+    the shared engine pool with its own `db_concurrency` limit.
+    """
+
+    def __init__(self, db: DatabaseExecutor, schema: dict, model_name: str = "gpt-4o",
+                 persona: str = "default", client=None, cache=None, concurrency: int = None,
+                 db_concurrency: int = None, rpm: int = None, tpm: int = None,
+                 max_retries: int = None, execute: bool = True, use_cache: bool = True,
+                 validate: bool = None, repair: bool = None):
+        self.db = db
+        self.schema = schema
+        self.model_name = model_name
+        self.persona = persona
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency or env_int("ASKDB_BATCH_CONCURRENCY", 8)
+        self.db_concurrency = db_concurrency or env_int("ASKDB_BATCH_DB_CONCURRENCY", 4)
+        self.rpm = rpm if rpm is not None else env_int("ASKDB_BATCH_RPM", 500)
+        self.tpm = tpm if tpm is not None else env_int("ASKDB_BATCH_TPM", 200000)
+        self.max_retries = max_retries if max_retries is not None else env_int("ASKDB_BATCH_MAX_RETRIES", 5)
+        self.execute = execute
+        self.use_cache = use_cache
+        self.validate = validate if validate is not None else validation_enabled()
+        self.repair = repair if repair is not None else repair_enabled()
+        self.validator = None
+        if self.validate and isinstance(schema, dict) and db.engine is not None:
+            self.validator = SQLValidator(schema, db.engine.dialect.name)
+
+    async def iter_results(self, questions: list):
+        """
+        Async generator yielding one result dict per question as each completes.
+        """
+        limiter = RateLimiter(self.rpm, self.tpm)
+        llm_slots = asyncio.Semaphore(self.concurrency)
+        db_slots = asyncio.Semaphore(self.db_concurrency)
+
+        tasks = [
+            asyncio.create_task(self._process(item, limiter, llm_slots, db_slots))
+            for item in questions
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, questions: list) -> list:
+        """
+        Processes every question and returns results in input order.
+        """
+        results = [result async for result in self.iter_results(questions)]
+        order = {item["id"]: i for i, item in enumerate(questions)}
+        return sorted(results, key=lambda result: order.get(result["id"], 0))
+
+    async def _process(self, item, limiter, llm_slots, db_slots) -> dict:
+        started = time.perf_counter()
+        result = {
+            "id": item["id"],
+            "question": item["question"],
+            "sql": None,
+            "status": "ok",
+            "error": None,
+            "rows": None,
+            "truncated": None,
+            "attempts": 0,
+            "cache_hit": False,
+            "validation_errors": None,
+            "repaired": False,
+            "cost_guard": None,
+            "generation_seconds": None,
+            "execution_seconds": None,
+            "total_seconds": None,
+        }
+
+        builder = SystemPromptBuilder(
+            schema=self.schema,
+            prompt_type=self.persona,
+            model_name=self.model_name,
+            question=item["question"],
+        )
+        system_prompt = builder.build()
+        few_shot_store.record_question()
+        token_cost = estimate_tokens(system_prompt) + estimate_tokens(item["question"]) + _COMPLETION_TOKEN_ESTIMATE
+
+        # One generator per question: it keeps per-call state (last_sql, ...)
+        generator = SQLQueryGenerator(cache=self.cache, client=self.client,
+                                      dialect=self.db.engine.dialect.name if self.db.engine is not None else None)
+        gen_started = time.perf_counter()
+        sql = None
+        cache_key = generator.cache_key(item["question"], self.model_name, system_prompt)
+        cached = generator.cache.get(cache_key) if self.use_cache else None
+
+        if cached is not None:
+            # Cache hits cost no API budget, so they skip the limiter entirely
+            sql = cached
+            result["cache_hit"] = True
+        else:
+            sql = await self._call_model(
+                result, limiter, llm_slots, token_cost,
+                lambda: generator.agenerate_sql(item["question"], system_prompt, self.model_name, use_cache=False),
+            )
+
+        if sql and not sql.startswith("INVALID_QUERY") and self.validator is not None:
+            validation = self.validator.validate(sql)
+            if not validation.ok and self.repair:
+                result["validation_errors"] = validation.errors
+                repaired = await self._call_model(
+                    result, limiter, llm_slots, token_cost,
+                    lambda: generator.arepair_sql(item["question"], system_prompt, sql, validation.errors, self.model_name),
+                )
+                if repaired:
+                    sql, result["repaired"] = repaired, True
+                    if not sql.startswith("INVALID_QUERY"):
+                        validation = self.validator.validate(sql)
+                        if validation.ok:
+                            generator.remember(item["question"], system_prompt, self.model_name, sql)
+            if not validation.ok and result["status"] == "ok" and not sql.startswith("INVALID_QUERY"):
+                result["status"], result["error"] = "invalid_sql", validation.message
+                result["validation_errors"] = validation.errors
+                generator.forget(item["question"], system_prompt, self.model_name)
+        result["generation_seconds"] = round(time.perf_counter() - gen_started, 4)
+        result["sql"] = sql
+
+        if sql and sql.startswith("INVALID_QUERY"):
+            result["status"], result["error"] = "invalid_query", sql
+        elif sql and self.execute and result["status"] == "ok":
+            exec_started = time.perf_counter()
+            async with db_slots:
+                decision = await asyncio.to_thread(self.db.guard_query, sql)
+                result["cost_guard"] = decision.action
+                if decision.blocked:
+                    outcome = QueryFailure(QueryStatus.BLOCKED, "Query blocked by the cost guard:\n" + decision.message)
+                else:
+                    sql = result["sql"] = decision.sql
+                    outcome = await asyncio.to_thread(self.db.execute_query, sql)
+            result["execution_seconds"] = round(time.perf_counter() - exec_started, 4)
+
+            if isinstance(outcome, QueryFailure):
+                result["status"], result["error"] = outcome.status, outcome.message
+            elif isinstance(outcome, str):
+                if not outcome.startswith("Query executed successfully"):
+                    result["status"], result["error"] = "error", outcome
+            else:
+                result["rows"] = len(outcome)
+                result["truncated"] = bool(outcome.attrs.get("truncated"))
+                few_shot_store.add(builder.fingerprint, item["question"], sql)
+                few_shot_store.record_success(2 if result["repaired"] else 1)
+
+        result["total_seconds"] = round(time.perf_counter() - started, 4)
+        return result
+
+    async def _call_model(self, result, limiter, llm_slots, token_cost, call):
+        """
+        Runs one model call within the concurrency and rate limits, retrying
+        429s with backoff. Returns None (with the error on result) on failure.
+        """
+        from openai import RateLimitError
+
+        attempts = 0
+        async with llm_slots:
+            while True:
+                attempts += 1
+                result["attempts"] += 1
+                await limiter.acquire(token_cost)
+                try:
+                    return await call()
+                except RateLimitError as e:
+                    if attempts > self.max_retries:
+                        result["status"], result["error"] = "generation_error", f"Rate limited: {e}"
+                        return None
+                    delay = self._backoff_delay(e, attempts)
+                    limiter.pause(delay)
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    result["status"], result["error"] = "generation_error", str(e)
+                    return None
+
+    def _backoff_delay(self, error, attempt: int) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        if retry_after is not None:
+            return retry_after
+        return min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
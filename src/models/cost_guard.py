@@ -0,0 +1,266 @@
+import json
+import os
+import re
+
+import sqlglot
+from sqlalchemy import text
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+from src.models.sql_validator import sqlglot_dialect
+from src.models.utils import env_float, env_int
+
+# What happens to a query whose plan exceeds a threshold
+OFF, WARN, LIMIT, BLOCK = "off", "warn", "limit", "block"
+_MODES = (OFF, WARN, LIMIT, BLOCK)
+
+_PG_SCAN_NODES = {"Seq Scan", "Parallel Seq Scan"}
+
+
+class PlanSummary:
+    """
+    The parts of an EXPLAIN plan the guard cares about. Estimates are None
+    when the dialect does not report them; `full_scans` lists
+    (table, estimated rows or None) for every full table scan.
+    """
+
+    def __init__(self, dialect: str, estimated_rows: float = None, cost: float = None,
+                 full_scans: list = None, error: str = None):
+        self.dialect = dialect
+        self.estimated_rows = estimated_rows
+        self.cost = cost
+        self.full_scans = full_scans or []
+        self.error = error
+
+    @property
+    def largest_scan(self):
+        rows = [r for _, r in self.full_scans if r is not None]
+        return max(rows) if rows else None
+
+    def to_dict(self) -> dict:
+        return {
+            "dialect": self.dialect,
+            "estimated_rows": self.estimated_rows,
+            "cost": self.cost,
+            "full_scans": [{"table": t, "rows": r} for t, r in self.full_scans],
+            "error": self.error,
+        }
+
+    def __repr__(self):
+        return f"PlanSummary(rows={self.estimated_rows}, cost={self.cost}, full_scans={self.full_scans})"
+
+
+class GuardDecision:
+    """
+    Outcome of checking one query: `action` is "allow", "warn", "limit" or
+    "block"; `sql` is the statement to run (with a LIMIT added for "limit").
+    """
+
+    def __init__(self, action: str, sql: str, plan: PlanSummary = None, reasons: list = None):
+        self.action = action
+        self.sql = sql
+        self.plan = plan
+        self.reasons = reasons or []
+
+    @property
+    def blocked(self) -> bool:
+        return self.action == BLOCK
+
+    @property
+    def message(self) -> str:
+        return "\n".join(f"- {reason}" for reason in self.reasons)
+
+    def __repr__(self):
+        return f"GuardDecision(action={self.action!r}, reasons={self.reasons!r})"
+
+
+def guard_mode() -> str:
+    mode = (os.getenv("ASKDB_COST_GUARD") or OFF).strip().lower()
+    return mode if mode in _MODES else OFF
+
+
+def explain(conn, sql: str, dialect: str) -> PlanSummary:
+    """
+    Runs the dialect's EXPLAIN for sql on conn (the query itself is not executed).
+    """
+    sql = sql.strip().rstrip(";")
+    if dialect == "postgresql":
+        raw = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        plan = _summarize_postgres(raw if not isinstance(raw, str) else json.loads(raw))
+        return _size_postgres_scans(conn, plan)
+    if dialect in ("mysql", "mariadb"):
+        raw = conn.execute(text(f"EXPLAIN FORMAT=JSON {sql}")).scalar()
+        return _summarize_mysql(json.loads(raw), dialect)
+    if dialect == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return _summarize_sqlite(conn, rows, _table_aliases(sql, dialect))
+    return PlanSummary(dialect, error=f"EXPLAIN is not supported for {dialect}.")
+
+
+def _summarize_postgres(raw) -> PlanSummary:
+    root = raw[0]["Plan"]
+    scans = []
+
+    def walk(node):
+        if node.get("Node Type") in _PG_SCAN_NODES:
+            scans.append((node.get("Relation Name"), node.get("Plan Rows")))
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(root)
+    return PlanSummary("postgresql", root.get("Plan Rows"), root.get("Total Cost"), scans)
+
+
+def _size_postgres_scans(conn, plan: PlanSummary) -> PlanSummary:
+    """
+    Plan Rows on a Seq Scan is the estimate after its filter, but the scan
+    reads the whole relation, so scans are sized by pg_class.reltuples.
+    """
+    names = sorted({table for table, _ in plan.full_scans if table})
+    if not names:
+        return plan
+    sizes = dict(conn.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind IN ('r', 'm', 'p') AND relname = ANY(:names)"),
+        {"names": names},
+    ).fetchall())
+    plan.full_scans = [(table, max(rows or 0, sizes.get(table) or 0)) for table, rows in plan.full_scans]
+    return plan
+
+
+def _summarize_mysql(raw: dict, dialect: str) -> PlanSummary:
+    block = raw.get("query_block", {})
+    cost = block.get("cost_info", {}).get("query_cost")
+    scans = []
+    produced = None
+
+    def walk(node):
+        nonlocal produced
+        if isinstance(node, dict):
+            table = node.get("table")
+            if isinstance(table, dict):
+                rows = table.get("rows_examined_per_scan", table.get("rows"))
+                if table.get("access_type") == "ALL":
+                    scans.append((table.get("table_name"), _number(rows)))
+                produced = _number(table.get("rows_produced_per_join", rows))
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(block)
+    return PlanSummary(dialect, produced, _number(cost), scans)
+
+
+# "SCAN orders", "SCAN TABLE orders AS o", "SCAN o USING COVERING INDEX idx", ...
+_SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(?P<table>"[^"]+"|\S+)(?: AS (?P<alias>\S+))?(?P<using> USING .*)?$')
+
+
+def _table_aliases(sql: str, dialect: str) -> dict:
+    """
+    {lowercased alias: table} for sql; newer SQLite plans name a scan by its alias.
+    """
+    try:
+        tree = sqlglot.parse_one(sql, read=sqlglot_dialect(dialect))
+    except ParseError:
+        return {}
+    return {table.alias.lower(): table.name for table in tree.find_all(exp.Table) if table.alias}
+
+
+def _summarize_sqlite(conn, rows, aliases: dict = None) -> PlanSummary:
+    """
+    SQLite reports no cost or row estimates, so full scans are sized by
+    max(rowid), which is a B-tree lookup rather than a count.
+    """
+    aliases = aliases or {}
+    scans = []
+    for row in rows:
+        match = _SQLITE_SCAN_RE.match(row[-1])
+        if not match or "INDEX" in (match.group("using") or ""):
+            continue
+        table = match.group("table").strip('"')
+        if table in ("CONSTANT", "SUBQUERY") or table.startswith("("):
+            continue
+        table = aliases.get(table.lower(), table)
+        try:
+            size = conn.execute(text(f'SELECT MAX(rowid) FROM "{table}"')).scalar()
+        except Exception:
+            size = None
+        scans.append((table, size))
+    return PlanSummary("sqlite", full_scans=scans)
+
+
+def _number(value):
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class CostGuard:
+    """
+    Compares a plan against row, cost and full-scan thresholds (0 disables
+    a threshold) and decides whether to run the query as is, warn, cap it
+    with a LIMIT, or block it.
+    """
+
+    def __init__(self, mode: str = None, max_rows: int = None, max_cost: float = None,
+                 max_scan_rows: int = None, auto_limit: int = None):
+        self.mode = mode or guard_mode()
+        self.max_rows = max_rows if max_rows is not None else env_int("ASKDB_COST_MAX_ROWS", 1_000_000)
+        self.max_cost = max_cost if max_cost is not None else env_float("ASKDB_COST_MAX_COST", 0)
+        self.max_scan_rows = max_scan_rows if max_scan_rows is not None else env_int("ASKDB_COST_MAX_SCAN_ROWS", 1_000_000)
+        self.auto_limit = auto_limit or env_int("ASKDB_COST_AUTO_LIMIT", 1000)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != OFF
+
+    def violations(self, plan: PlanSummary) -> list:
+        reasons = []
+        if self.max_rows and plan.estimated_rows is not None and plan.estimated_rows > self.max_rows:
+            reasons.append(f"Estimated {plan.estimated_rows:,.0f} rows (limit {self.max_rows:,}).")
+        if self.max_cost and plan.cost is not None and plan.cost > self.max_cost:
+            reasons.append(f"Estimated cost {plan.cost:,.0f} (limit {self.max_cost:,.0f}).")
+        seen = set()
+        for table, rows in plan.full_scans:
+            if table in seen:
+                continue
+            seen.add(table)
+            if self.max_scan_rows and rows is not None and rows > self.max_scan_rows:
+                reasons.append(f"Full scan of `{table}` (~{rows:,.0f} rows, limit {self.max_scan_rows:,}).")
+        return reasons
+
+    def decide(self, sql: str, plan: PlanSummary, dialect: str = None) -> GuardDecision:
+        if plan.error:
+            # The query gets its own, clearer error when it runs
+            return GuardDecision("allow", sql, plan)
+        reasons = self.violations(plan)
+        if not reasons:
+            return GuardDecision("allow", sql, plan)
+        if self.mode == BLOCK:
+            return GuardDecision(BLOCK, sql, plan, reasons)
+        if self.mode == LIMIT:
+            limited = add_limit(sql, self.auto_limit, dialect)
+            if limited is not None:
+                reasons.append(f"Added LIMIT {self.auto_limit}.")
+                return GuardDecision(LIMIT, limited, plan, reasons)
+        return GuardDecision(WARN, sql, plan, reasons)
+
+
+def add_limit(sql: str, limit: int, dialect: str = None):
+    """
+    Returns sql capped at `limit` rows, or None when it already has a
+    LIMIT, is not a plain SELECT, or is an ungrouped aggregate (one row,
+    where a LIMIT would not reduce the work).
+    """
+    read = sqlglot_dialect(dialect)
+    try:
+        tree = sqlglot.parse_one(sql, read=read)
+    except ParseError:
+        return None
+    if not isinstance(tree, (exp.Select, exp.SetOperation)) or tree.args.get("limit") or tree.args.get("fetch"):
+        return None
+    if isinstance(tree, exp.Select) and not tree.args.get("group") and any(s.find(exp.AggFunc) for s in tree.selects):
+        return None
+    return tree.limit(limit).sql(dialect=read)
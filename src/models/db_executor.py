@@ -1,94 +1,434 @@
-import pandas as pd
-from sqlalchemy import create_engine, inspect, text
+import hashlib
+import time
+from sqlalchemy import event, text
+from src.models import telemetry
+from src.models.cost_guard import CostGuard, GuardDecision, PlanSummary, explain
+from src.models.engine_registry import engine_registry
+from src.models.replica_router import get_router, replica_urls_from_env
+from src.models.query_errors import StatementTimeout, classify_failure
+from src.models.result_cache import result_cache
+from src.models.result_export import batch_rows, export_batches, export_path
+from src.models.result_stream import QueryStream
+from src.models.schema_cache import schema_cache
+from src.models.schema_reflection import catalog_fingerprint, reflect_schema
+from src.models.utils import env_float, env_int
 
-class DatabaseExecutor:
-    def __init__(self, config: dict = None, db_url: str = None):
-        self.config = config
-        self.db_url = db_url
-        self.engine = None
-        
-        url = self.db_url
-        connect_args = {}
-        
-        if not url and self.config:
-            # handle legacy config
-            host = self.config.get("host")
-            user = self.config.get("user")
-            password = self.config.get("password")
-            database = self.config.get("database")
-            port = self.config.get("port", 3306)
-            url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
-            
-            if self.config.get("ssl_enabled", False):
+# SQLite VM instructions between deadline checks
+_SQLITE_PROGRESS_STEPS = 10000
+
+
+class _SqliteDeadline:
+    """
+    SQLite has no statement timeout, so a progress handler interrupts the
+    statement once `timeout` seconds have passed since start(). Streams
+    restart it before each fetch, like a per-FETCH timeout elsewhere.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self.expired = False
+        self.start()
+
+    def start(self):
+        self.at = time.monotonic() + self.timeout
+
+    def check(self) -> int:
+        # Any non-zero return makes SQLite abort with "interrupted"
+        if time.monotonic() > self.at:
+            self.expired = True
+            return 1
+        return 0
+
+
+def _end_sqlite_deadline(dbapi_connection, connection_record):
+    """Pool checkin hook: connections go back to the pool without a deadline."""
+    if connection_record.info.pop("askdb_deadline", None) is not None and dbapi_connection is not None:
+        dbapi_connection.set_progress_handler(None, 0)
+
+
+def _timed_out(conn) -> bool:
+    deadline = conn.info.get("askdb_deadline")
+    return deadline is not None and deadline.expired
+
+def build_connection_url(config: dict = None, db_url: str = None):
+    """
+    Normalizes a database URL (or legacy host/user/password config) into a
+    SQLAlchemy URL plus the connect_args needed for SSL.
+    Returns (url, connect_args); url is None when nothing is configured.
+    """
+    url = db_url
+    connect_args = {}
+
+    if not url and config:
+        # handle legacy config
+        host = config.get("host")
+        user = config.get("user")
+        password = config.get("password")
+        database = config.get("database")
+        port = config.get("port", 3306)
+        url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
+
+        if config.get("ssl_enabled", False):
+            import ssl
+            ctx = ssl.create_default_context()
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            connect_args["ssl"] = ctx
+
+    if url:
+        if url.startswith("mysql://"):
+            url = url.replace("mysql://", "mysql+pymysql://", 1)
+        elif url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+
+        from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+        parsed = urlparse(url)
+        qs = parse_qsl(parsed.query)
+
+        new_qs = []
+        ssl_requested = False
+        for k, v in qs:
+            k_lower = k.lower()
+            if k_lower in ['ssl-mode', 'ssl_mode', 'sslmode', 'ssl']:
+                if v.upper() in ['REQUIRED', 'REQUIRE', 'VERIFY_CA', 'VERIFY_IDENTITY', 'TRUE', '1']:
+                    ssl_requested = True
+            elif k_lower in ['pgbouncer', 'connection_limit', 'pool_timeout']:
+                pass # ignore these pooler specific kwargs for sqlalchemy
+            else:
+                new_qs.append((k, v))
+
+        # urlunparse collapses empty netlocs (sqlite:////path), so only rebuild when needed
+        if parsed.query:
+            parsed = parsed._replace(query=urlencode(new_qs))
+            url = urlunparse(parsed)
+
+        if ssl_requested:
+            if url.startswith("postgresql"):
+                connect_args["sslmode"] = "require"
+            else:
                 import ssl
                 ctx = ssl.create_default_context()
                 ctx.check_hostname = False
                 ctx.verify_mode = ssl.CERT_NONE
                 connect_args["ssl"] = ctx
 
-        if url:
-            if url.startswith("mysql://"):
-                url = url.replace("mysql://", "mysql+pymysql://", 1)
-            elif url.startswith("postgres://"):
-                url = url.replace("postgres://", "postgresql://", 1)
-            
-            from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
-            parsed = urlparse(url)
-            qs = parse_qsl(parsed.query)
-            
-            new_qs = []
-            ssl_requested = False
-            for k, v in qs:
-                k_lower = k.lower()
-                if k_lower in ['ssl-mode', 'ssl_mode', 'sslmode', 'ssl']:
-                    if v.upper() in ['REQUIRED', 'REQUIRE', 'VERIFY_CA', 'VERIFY_IDENTITY', 'TRUE', '1']:
-                        ssl_requested = True
-                elif k_lower in ['pgbouncer', 'connection_limit', 'pool_timeout']:
-                    pass # ignore these pooler specific kwargs for sqlalchemy
-                else:
-                    new_qs.append((k, v))
-            
-            parsed = parsed._replace(query=urlencode(new_qs))
-            url = urlunparse(parsed)
-            
-            if ssl_requested:
-                if url.startswith("postgresql"):
-                    connect_args["sslmode"] = "require"
-                else:
-                    import ssl
-                    ctx = ssl.create_default_context()
-                    ctx.check_hostname = False
-                    ctx.verify_mode = ssl.CERT_NONE
-                    connect_args["ssl"] = ctx
-            
-            self.engine = create_engine(url, connect_args=connect_args, pool_recycle=3600)
+    return url, connect_args
 
-    def execute_query(self, sql: str):
+
+def is_read_query(sql: str) -> bool:
+    """Returns True for statements that only read data (SELECT/WITH/SHOW/DESCRIBE)."""
+    return sql.strip().lower().startswith(("select", "with", "show", "describe"))
+
+
+class DatabaseExecutor:
+    """
+    Runs SQL against the configured database. With read replicas (the
+    config's "replica_urls" or ASKDB_REPLICA_URLS), read-only statements are
+    balanced across the replicas and everything else goes to the primary.
+    """
+
+    def __init__(self, config: dict = None, db_url: str = None, replica_urls: list = None):
+        self.config = config
+        self.db_url = db_url
+        self.engine = None
+        self.identity = None
+        self.router = None
+
+        self.url, self.connect_args = build_connection_url(config, db_url)
+        if self.url:
+            # Engines are shared process-wide so reruns reuse the same pool
+            self.engine = engine_registry.get_engine(self.url, self.connect_args)
+            safe_url = self.engine.url.render_as_string(hide_password=True)
+            self.identity = hashlib.sha256(safe_url.encode()).hexdigest()[:16]
+
+            if replica_urls is None:
+                replica_urls = (config or {}).get("replica_urls") or replica_urls_from_env()
+            if replica_urls:
+                self.router = get_router(self.engine, [build_connection_url(None, url) for url in replica_urls])
+
+    def pool_stats(self) -> dict:
+        """Returns checkout/overflow statistics for this executor's pool."""
+        if not self.engine:
+            return {}
+        return engine_registry.engine_stats(self.engine)
+
+    def endpoint_stats(self) -> list:
+        """
+        Per-endpoint health, request/error counts, outstanding connections and
+        latency; empty without replicas.
+        """
+        return self.router.stats() if self.router else []
+
+    def execute_query(self, sql: str, timeout: float = None, on_connect=None, use_cache: bool = True):
+        """
+        Runs sql and returns a DataFrame for reads, a status string for writes,
+        or a QueryFailure when the query errored, timed out, or was cancelled.
+        `on_connect` receives the backend handle that cancel() accepts.
+        Read results are served from and stored in the result cache unless
+        use_cache is False.
+        """
         if not self.engine:
             return "Error: No database connection configured for execution."
             
-        try:
-            with self.engine.connect() as conn:
-                sql_lower = sql.strip().lower()
-                if sql_lower.startswith(("select", "with", "show", "describe")):
-                    result = pd.read_sql(text(sql), conn)
+        with telemetry.span("db.execute") as span:
+            try:
+                if is_read_query(sql):
+                    cached = self.cached_result(sql) if use_cache else None
+                    if cached is not None:
+                        span.set(rows=len(cached), cache_hit=True)
+                        return cached
+                    # Streamed in bounded chunks so oversized results cannot exhaust memory
+                    stream = self.stream_query(sql, timeout=timeout, on_connect=on_connect, cache_result=use_cache)
+                    result = stream.fetch_all()
+                    span.set(rows=stream.rows_fetched, bytes=stream.bytes_fetched, truncated=stream.truncated)
+                    if stream.error:
+                        span.set(status=stream.error.status)
+                        return stream.error
                     return result
-                else:
-                    result_proxy = conn.execute(text(sql))
+                with self._connect(span) as conn:
+                    self._prepare_connection(conn, timeout, on_connect)
+                    try:
+                        result_proxy = conn.execute(text(sql))
+                    except Exception as e:
+                        if _timed_out(conn):
+                            raise StatementTimeout(str(e)) from e
+                        raise
                     conn.commit()
+                    result_cache.invalidate_for_write(self.identity, sql)
+                    span.set(rows_affected=result_proxy.rowcount)
                     return f"Query executed successfully. Rows affected: {result_proxy.rowcount}"
-        except Exception as e:
-            return f"SQL Error: {e}"
+            except Exception as e:
+                failure = classify_failure(e)
+                span.set(status=failure.status)
+                return failure
+
+    def stream_query(self, sql: str, chunk_size: int = None, max_rows: int = None, max_bytes: int = None,
+                     timeout: float = None, on_connect=None, cache_result: bool = False) -> QueryStream:
+        """
+        Opens a server-side cursor for a read-only query and returns a
+        QueryStream that fetches it chunk by chunk, stopping at the row/byte caps.
+        With cache_result, a fully fetched result is stored in the result cache.
+        """
+        if not self.engine:
+            raise Exception("No database connection configured for execution.")
+
+        with telemetry.span("db.open") as span:
+            conn = self._open_read(span, timeout, on_connect)
+            deadline = conn.info.get("askdb_deadline")
+            try:
+                return QueryStream(
+                    conn,
+                    sql,
+                    chunk_size=chunk_size or env_int("ASKDB_FETCH_CHUNK_ROWS", 1000),
+                    max_rows=max_rows or env_int("ASKDB_MAX_ROWS", 100000),
+                    max_bytes=max_bytes or env_int("ASKDB_MAX_RESULT_BYTES", 256 * 1024 * 1024),
+                    discard_unread=self.engine.dialect.name in ("mysql", "mariadb"),
+                    on_complete=(lambda frame: result_cache.put(self.identity, sql, frame)) if cache_result else None,
+                    deadline=deadline,
+                    reopen=lambda: self._open_read(None, timeout),
+                )
+            except Exception as e:
+                if deadline is not None and deadline.expired:
+                    raise StatementTimeout(str(e)) from e
+                raise
+
+    def export_query(self, sql: str, fmt: str = "csv", path: str = None, batch_size: int = None,
+                     timeout: float = None):
+        """
+        Streams the full result of a read query from a server-side cursor into
+        a CSV or Parquet file in fixed-size batches, yielding ExportProgress
+        after each one. Unlike execute_query there is no row cap, and memory
+        use is bounded by a single batch.
+        """
+        if not self.engine:
+            raise Exception("No database connection configured for execution.")
+        if not is_read_query(sql):
+            raise ValueError("Only read-only queries can be exported.")
+
+        batch_size = batch_size or batch_rows()
+        timeout = timeout if timeout is not None else env_float("ASKDB_EXPORT_TIMEOUT", 600.0)
+        path = path or export_path(fmt)
+        conn = self._connect(read=True)
+        exhausted = False
+        try:
+            self._prepare_connection(conn, timeout)
+            server_side = sql.lstrip().lower().startswith(("select", "with"))
+            result = conn.execution_options(stream_results=server_side, yield_per=batch_size).execute(text(sql))
+
+            def batches():
+                nonlocal exhausted
+                while True:
+                    rows = result.fetchmany(batch_size)
+                    if not rows:
+                        exhausted = True
+                        return
+                    telemetry.count_fetched(len(rows), 0)
+                    yield [tuple(row) for row in rows]
+
+            yield from export_batches(list(result.keys()), batches(), fmt, path)
+        finally:
+            # Same as QueryStream: don't drain an abandoned unbuffered MySQL cursor
+            if not exhausted and self.engine.dialect.name in ("mysql", "mariadb"):
+                conn.invalidate()
+            conn.close()
+
+    def cached_result(self, sql: str):
+        """
+        Returns the cached DataFrame for sql on this connection, or None.
+        """
+        if not self.engine:
+            return None
+        cached = result_cache.get(self.identity, sql)
+        telemetry.metrics.inc("askdb_result_cache_lookups_total", help="Result cache lookups",
+                              outcome="miss" if cached is None else "hit")
+        return cached
+
+    def explain(self, sql: str, timeout: float = None):
+        """
+        Returns a PlanSummary for sql from the dialect's EXPLAIN, without running it.
+        """
+        if not self.engine:
+            raise Exception("No database connection configured for execution.")
+        with self._connect(read=True) as conn:
+            self._prepare_connection(conn, timeout)
+            return explain(conn, sql, self.engine.dialect.name)
+
+    def guard_query(self, sql: str, guard: CostGuard = None, use_cache: bool = True) -> GuardDecision:
+        """
+        Checks a read query's plan against the cost guard before it runs.
+        Writes, cached results and a disabled guard are allowed without an EXPLAIN.
+        """
+        guard = guard or CostGuard()
+        if not self.engine or not guard.enabled or not is_read_query(sql):
+            return GuardDecision("allow", sql)
+        if use_cache and result_cache.contains(self.identity, sql):
+            return GuardDecision("allow", sql)
+
+        with telemetry.span("db.explain", mode=guard.mode) as span:
+            try:
+                plan = self.explain(sql, timeout=env_float("ASKDB_EXPLAIN_TIMEOUT", 10.0))
+            except Exception as e:
+                plan = PlanSummary(self.engine.dialect.name, error=str(e))
+            decision = guard.decide(sql, plan, self.engine.dialect.name)
+            span.set(action=decision.action, estimated_rows=plan.estimated_rows, cost=plan.cost,
+                     full_scans=len(plan.full_scans))
+        telemetry.metrics.inc("askdb_cost_guard_total", help="Cost guard decisions", action=decision.action)
+        return decision
+
+    def _open_read(self, span, timeout: float = None, on_connect=None):
+        """A read connection with the statement timeout applied."""
+        conn = self._connect(span, read=True)
+        try:
+            self._prepare_connection(conn, timeout, on_connect)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _connect(self, span=None, read: bool = False):
+        """
+        Checks a connection out of the pool, recording how long that took.
+        Reads go to a replica when the router has a healthy one.
+        """
+        started = time.perf_counter()
+        endpoint = None
+        if self.router is not None:
+            conn, endpoint = self.router.connect(read)
+        else:
+            conn = self.engine.connect()
+        waited = time.perf_counter() - started
+        telemetry.observe_pool_wait(waited)
+        if span is not None:
+            span.set(pool_wait_ms=round(waited * 1000, 3))
+            if endpoint is not None:
+                span.set(endpoint=endpoint.name)
+        return conn
+
+    def cancel(self, handle) -> bool:
+        """
+        Stops the statement running on the backend identified by handle
+        (KILL QUERY on MySQL, pg_cancel_backend on PostgreSQL, interrupt() on SQLite).
+        Handles from replicas carry their engine, so the cancel reaches the right server.
+        """
+        if not self.engine or handle is None:
+            return False
+
+        engine = self.engine
+        if isinstance(handle, tuple):
+            engine, handle = handle
+        dialect = engine.dialect.name
+        if dialect == "sqlite":
+            handle.interrupt()
+            return True
+        with engine.connect() as conn:
+            if dialect in ("mysql", "mariadb"):
+                conn.execute(text(f"KILL QUERY {int(handle)}"))
+            elif dialect == "postgresql":
+                conn.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": int(handle)})
+            else:
+                return False
+        return True
+
+    def _prepare_connection(self, conn, timeout: float = None, on_connect=None):
+        """
+        Applies the per-statement timeout and reports the backend handle
+        used for cancellation.
+        """
+        if timeout is None:
+            timeout = env_float("ASKDB_STATEMENT_TIMEOUT", 60.0)
+        timeout_ms = int(timeout * 1000) if timeout and timeout > 0 else 0
+
+        handle = None
+        dialect = self.engine.dialect.name
+        if dialect in ("mysql", "mariadb"):
+            # Session variables live as long as the pooled DBAPI connection,
+            # so only re-issue SET when the value changes
+            if conn.info.get("askdb_timeout_ms") != timeout_ms:
+                if getattr(self.engine.dialect, "is_mariadb", False):
+                    conn.execute(text(f"SET SESSION max_statement_time = {timeout_ms / 1000}"))
+                else:
+                    conn.execute(text(f"SET SESSION MAX_EXECUTION_TIME = {timeout_ms}"))
+                conn.info["askdb_timeout_ms"] = timeout_ms
+            if on_connect:
+                if "askdb_backend_id" not in conn.info:
+                    conn.info["askdb_backend_id"] = conn.execute(text("SELECT CONNECTION_ID()")).scalar()
+                handle = conn.info["askdb_backend_id"]
+        elif dialect == "postgresql":
+            # set_config(..., true) is SET LOCAL: it ends with the transaction
+            row = conn.execute(
+                text("SELECT pg_backend_pid(), set_config('statement_timeout', :ms, true)"),
+                {"ms": str(timeout_ms)},
+            ).first()
+            handle = row[0]
+        elif dialect == "sqlite":
+            handle = conn.connection.dbapi_connection
+            if timeout_ms:
+                deadline = conn.info["askdb_deadline"] = _SqliteDeadline(timeout_ms / 1000)
+                handle.set_progress_handler(deadline.check, _SQLITE_PROGRESS_STEPS)
+            elif conn.info.pop("askdb_deadline", None) is not None:
+                handle.set_progress_handler(None, 0)
+            if not event.contains(conn.engine, "checkin", _end_sqlite_deadline):
+                event.listen(conn.engine, "checkin", _end_sqlite_deadline)
+
+        if handle is not None and dialect != "sqlite" and conn.engine is not self.engine:
+            handle = (conn.engine, handle)
+        if on_connect:
+            on_connect(handle)
 
-    def get_schema(self):
-        """Fetches schema from live DB and returns it as a dictionary."""
+    def get_schema(self, refresh: bool = False):
+        """
+        Fetches schema from live DB and returns it as a dictionary.
+        Served from the schema cache unless the catalog changed or refresh is set.
+        """
         if not self.engine:
             raise Exception("No schema available (Not connected).")
 
-        inspector = inspect(self.engine)
-        schema = {}
-        for table_name in inspector.get_table_names():
-            columns = [f"{col['name']} ({col['type']})" for col in inspector.get_columns(table_name)]
-            schema[table_name] = columns
-        
-        return schema
\ No newline at end of file
+        with telemetry.span("schema.load", refresh=refresh) as span:
+            schema = schema_cache.get(
+                self.identity,
+                fingerprint_fn=lambda: catalog_fingerprint(self.engine),
+                loader=lambda: reflect_schema(self.engine),
+                refresh=refresh,
+            )
+            span.set(tables=len(schema))
+            return schema
@@ -0,0 +1,204 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+from src.models.utils import format_column
+
+# Strings, quoted identifiers, comments, dollar-quoted bodies and statement ends
+_SPLIT = re.compile(r"""
+    (?P<string>'(?:[^'\\]|\\.|'')*')
+  | (?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`)
+  | (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+  | (?P<dollar>\$(?P<tag>[A-Za-z_]*)\$.*?\$(?P=tag)\$)
+  | (?P<end>;)
+""", re.X | re.S)
+
+_TABLE_DDL = re.compile(
+    r"^\s*(?:CREATE\s+(?:OR\s+REPLACE\s+)?(?:(?:GLOBAL|LOCAL)\s+)?(?:TEMP(?:ORARY)?\s+|UNLOGGED\s+)?TABLE\b"
+    r"|ALTER\s+TABLE\b.*\bADD\s+(?:CONSTRAINT|PRIMARY|FOREIGN)\b)",
+    re.I | re.S,
+)
+_MYSQL_HINTS = re.compile(r"`|\bENGINE\s*=|\bAUTO_INCREMENT\b", re.I)
+
+_CACHE_SIZE = 8
+_parsed = OrderedDict()
+_parsed_lock = threading.Lock()
+
+
+def split_statements(text: str) -> list:
+    """
+    Splits a script on top-level semicolons, dropping comments (including
+    MySQL's /*!...*/ version comments). Semicolons inside strings, quoted
+    identifiers and $$-bodies do not split.
+    """
+    statements, parts, position = [], [], 0
+    for match in _SPLIT.finditer(text):
+        parts.append(text[position:match.start()])
+        position = match.end()
+        kind = match.lastgroup
+        if kind == "end":
+            statements.append("".join(parts).strip())
+            parts = []
+        elif kind == "comment":
+            parts.append(" ")
+        else:
+            parts.append(match.group())
+    parts.append(text[position:])
+    statements.append("".join(parts).strip())
+    return [statement for statement in statements if statement]
+
+
+def guess_dialect(text: str) -> str:
+    return "mysql" if _MYSQL_HINTS.search(text) else "postgres"
+
+
+def parse_ddl(text: str, dialect: str = None):
+    """
+    Turns pasted CREATE TABLE (and ALTER TABLE ... ADD CONSTRAINT) statements
+    into the {table: [column entries]} dict get_schema returns. Other
+    statements (INSERTs, SETs, views) are ignored without being parsed.
+    Returns (schema, skipped): skipped lists table statements that could
+    not be parsed.
+
+    Results are cached by content hash, so reruns with the same text are free.
+    """
+    key = hashlib.sha256(f"{dialect}\x00{text}".encode()).hexdigest()
+    with _parsed_lock:
+        cached = _parsed.get(key)
+        if cached is not None:
+            _parsed.move_to_end(key)
+            return cached
+
+    dialect = dialect or guess_dialect(text)
+    tables = OrderedDict()
+    skipped = []
+    for statement in split_statements(text):
+        if not _TABLE_DDL.match(statement):
+            continue
+        try:
+            tree = sqlglot.parse_one(statement, read=dialect)
+        except ParseError:
+            skipped.append(_first_line(statement))
+            continue
+        if isinstance(tree, exp.Create):
+            _read_create(tree, tables, dialect)
+        elif isinstance(tree, exp.Alter):
+            _read_alter(tree, tables)
+        else:
+            skipped.append(_first_line(statement))
+
+    _resolve_references(tables)
+    result = (_to_schema(tables), skipped)
+    with _parsed_lock:
+        _parsed[key] = result
+        while len(_parsed) > _CACHE_SIZE:
+            _parsed.popitem(last=False)
+    return result
+
+
+def _read_create(tree: exp.Create, tables: dict, dialect: str):
+    schema = tree.this
+    if not isinstance(schema, exp.Schema) or not isinstance(schema.this, exp.Table):
+        # CREATE TABLE ... AS SELECT / LIKE: no column list to read
+        return
+    columns = tables.setdefault(schema.this.name, OrderedDict())
+    for item in schema.expressions:
+        if isinstance(item, exp.ColumnDef):
+            column = columns.setdefault(item.name, {"type": "", "nullable": True, "primary_key": False, "ref": None})
+            column["type"] = item.args["kind"].sql(dialect=dialect) if item.args.get("kind") else ""
+            for constraint in item.args.get("constraints") or []:
+                kind = constraint.args.get("kind")
+                if isinstance(kind, exp.NotNullColumnConstraint) and not kind.args.get("allow_null"):
+                    column["nullable"] = False
+                elif isinstance(kind, exp.PrimaryKeyColumnConstraint):
+                    column["primary_key"], column["nullable"] = True, False
+                elif isinstance(kind, exp.Reference):
+                    column["ref"] = _reference(kind, 0)
+        else:
+            _read_constraint(item, columns)
+
+
+def _read_alter(tree: exp.Alter, tables: dict):
+    table = tree.this
+    if not isinstance(table, exp.Table) or table.name not in tables:
+        return
+    for action in tree.args.get("actions") or []:
+        for item in action.expressions if isinstance(action, exp.AddConstraint) else [action]:
+            _read_constraint(item, tables[table.name])
+
+
+def _read_constraint(item, columns: dict):
+    """
+    Applies a table-level PRIMARY KEY or FOREIGN KEY (named or not) to columns.
+    """
+    targets = item.expressions if isinstance(item, exp.Constraint) else [item]
+    for target in targets:
+        if isinstance(target, exp.PrimaryKey):
+            for name in _names(target.expressions):
+                if name in columns:
+                    columns[name]["primary_key"], columns[name]["nullable"] = True, False
+        elif isinstance(target, exp.ForeignKey) and target.args.get("reference") is not None:
+            for i, name in enumerate(_names(target.expressions)):
+                if name in columns and columns[name]["ref"] is None:
+                    columns[name]["ref"] = _reference(target.args["reference"], i)
+
+
+def _reference(reference: exp.Reference, position: int):
+    """
+    (table, column) for a REFERENCES clause. Without a column list the
+    column is left as None with its position, for _resolve_references.
+    """
+    target = reference.this
+    if isinstance(target, exp.Schema):
+        remote = _names(target.expressions)
+        column = remote[position] if position < len(remote) else (remote[0] if remote else None)
+        return target.this.name, column
+    if isinstance(target, exp.Table):
+        return target.name, None, position
+    return None
+
+
+def _resolve_references(tables: dict):
+    """
+    Points REFERENCES orgs (no column list) at orgs's primary key, which may
+    be declared after the referencing table; "id" when it is unknown.
+    """
+    for columns in tables.values():
+        for column in columns.values():
+            ref = column["ref"]
+            if ref is None or ref[1] is not None:
+                continue
+            table, _, position = ref
+            keys = [name for name, c in tables.get(table, {}).items() if c["primary_key"]]
+            column["ref"] = (table, keys[position] if position < len(keys) else (keys[0] if keys else "id"))
+
+
+def _names(expressions) -> list:
+    return [e.name for e in expressions if isinstance(e, (exp.Identifier, exp.Column, exp.Ordered)) and e.name]
+
+
+def _to_schema(tables: dict) -> dict:
+    schema = {}
+    for table in sorted(tables):
+        schema[table] = [
+            format_column(
+                name,
+                column["type"],
+                nullable=column["nullable"],
+                primary_key=column["primary_key"],
+                ref_table=column["ref"][0] if column["ref"] else None,
+                ref_column=column["ref"][1] if column["ref"] else None,
+            )
+            for name, column in tables[table].items()
+        ]
+    return schema
+
+
+def _first_line(statement: str) -> str:
+    line = statement.strip().splitlines()[0]
+    return line if len(line) <= 80 else line[:77] + "..."
@@ -0,0 +1,191 @@
+import ssl
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import create_engine, event
+
+from src.models.utils import env_bool, env_int
+
+
+def _freeze(value):
+    """
+    Turns connect_args into a hashable key. SSL contexts are rebuilt on every
+    rerun, so they are keyed by their verification settings, not identity.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, ssl.SSLContext):
+        return ("SSLContext", value.check_hostname, int(value.verify_mode))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class EngineRegistry:
+    """
+    Process-wide, thread-safe registry of SQLAlchemy engines.
+
+    Engines are keyed by the normalized URL plus connect_args so every
+    Streamlit rerun (and every session) pointing at the same database shares
+    one connection pool. The registry holds at most `max_engines` engines and
+    disposes the least recently used one when that bound is exceeded. Engines
+    with no connection checked out for `idle_timeout` seconds are disposed too.
+    """
+
+    def __init__(self, max_engines: int = None, pool_size: int = None, max_overflow: int = None,
+                 pool_pre_ping: bool = None, pool_recycle: int = None, pool_timeout: int = None,
+                 idle_timeout: int = None):
+        self.max_engines = max_engines or env_int("ASKDB_MAX_ENGINES", 8)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else env_int("ASKDB_ENGINE_IDLE_TIMEOUT", 1800)
+        self.pool_size = pool_size or env_int("ASKDB_POOL_SIZE", 5)
+        self.max_overflow = max_overflow if max_overflow is not None else env_int("ASKDB_POOL_MAX_OVERFLOW", 10)
+        self.pool_pre_ping = pool_pre_ping if pool_pre_ping is not None else env_bool("ASKDB_POOL_PRE_PING", True)
+        self.pool_recycle = pool_recycle or env_int("ASKDB_POOL_RECYCLE", 3600)
+        self.pool_timeout = pool_timeout or env_int("ASKDB_POOL_TIMEOUT", 30)
+
+        self._engines = OrderedDict()
+        self._checkouts = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.idle_evictions = 0
+
+    def get_engine(self, url: str, connect_args: dict = None):
+        """
+        Returns the shared engine for (url, connect_args), creating it on first use.
+        """
+        connect_args = connect_args or {}
+        key = (url, _freeze(connect_args))
+
+        with self._lock:
+            self._evict_idle(keep=key)
+            engine = self._engines.get(key)
+            if engine is not None:
+                self._engines.move_to_end(key)
+                self._checkouts[key]["last_used"] = time.monotonic()
+                self.hits += 1
+                return engine
+
+            self.misses += 1
+            engine = create_engine(url, connect_args=connect_args, **self._pool_kwargs(url))
+            self._track_checkouts(key, engine)
+            self._engines[key] = engine
+
+            while len(self._engines) > self.max_engines:
+                old_key, old_engine = self._engines.popitem(last=False)
+                self._checkouts.pop(old_key, None)
+                old_engine.dispose()
+                self.evictions += 1
+
+            return engine
+
+    def dispose_all(self):
+        """
+        Disposes every pooled engine and empties the registry.
+        """
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._checkouts.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns registry counters plus per-engine pool statistics.
+        """
+        with self._lock:
+            items = list(self._engines.items())
+            checkouts = dict(self._checkouts)
+
+        engines = [self._engine_entry(engine, checkouts.get(key, {})) for key, engine in items]
+
+        return {
+            "engines": engines,
+            "max_engines": self.max_engines,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "idle_evictions": self.idle_evictions,
+        }
+
+    def engine_stats(self, engine) -> dict:
+        """
+        Returns the pool statistics for a single engine, or {} if it is not registered.
+        """
+        with self._lock:
+            key = next((k for k, e in self._engines.items() if e is engine), None)
+            counter = dict(self._checkouts.get(key, {}))
+        if key is None:
+            return {}
+        return self._engine_entry(engine, counter)
+
+    @staticmethod
+    def _engine_entry(engine, counter: dict) -> dict:
+        pool = engine.pool
+        entry = {
+            "url": engine.url.render_as_string(hide_password=True),
+            "pool": type(pool).__name__,
+            "total_checkouts": counter.get("count", 0),
+            "status": pool.status(),
+        }
+        # Only QueuePool-style pools expose sizing counters
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            fn = getattr(pool, name, None)
+            if callable(fn):
+                entry[name] = fn()
+        return entry
+
+    def _evict_idle(self, keep=None):
+        """
+        Disposes engines that have had no connection checked out for
+        `idle_timeout` seconds. Caller holds the lock.
+        """
+        if self.idle_timeout <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        for key in list(self._engines):
+            counter = self._checkouts.get(key, {})
+            if key == keep or counter.get("outstanding", 0) > 0 or counter.get("last_used", 0) > cutoff:
+                continue
+            self._checkouts.pop(key, None)
+            self._engines.pop(key).dispose()
+            self.idle_evictions += 1
+
+    def _pool_kwargs(self, url: str) -> dict:
+        kwargs = {
+            "pool_pre_ping": self.pool_pre_ping,
+            "pool_recycle": self.pool_recycle,
+        }
+        # SQLite uses file/singleton pools that do not accept sizing arguments
+        if not url.startswith("sqlite"):
+            kwargs.update(
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+                pool_timeout=self.pool_timeout,
+            )
+        return kwargs
+
+    def _track_checkouts(self, key, engine):
+        counter = {"count": 0, "outstanding": 0, "last_used": time.monotonic()}
+        self._checkouts[key] = counter
+
+        def on_checkout(dbapi_conn, conn_record, conn_proxy):
+            counter["count"] += 1
+            counter["outstanding"] += 1
+            counter["last_used"] = time.monotonic()
+
+        def on_checkin(dbapi_conn, conn_record):
+            counter["outstanding"] = max(0, counter["outstanding"] - 1)
+            counter["last_used"] = time.monotonic()
+
+        event.listen(engine, "checkout", on_checkout)
+        event.listen(engine, "checkin", on_checkin)
+
+
+engine_registry = EngineRegistry()
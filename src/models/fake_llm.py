@@ -0,0 +1,83 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.models.utils import estimate_tokens
+
+
+class FakeAsyncOpenAI:
+    """
+    Offline stand-in for AsyncOpenAI's chat.completions API, used by the
+    benchmarks and for local testing.
+
+    Responses are canned: the first `responses` key found in the question
+    (case-insensitive) picks the SQL, otherwise `default_sql` is returned.
+    Latency is simulated with a time-to-first-token plus a per-chunk delay,
+    optionally per model, and `sql_by_model` overrides the answer for a
+    model (e.g. a fast model that gets it wrong). Usage mimics provider prefix caching by reporting
+    the shared prefix with the previous system prompt as cached tokens.
+    """
+
+    def __init__(self, default_sql: str = "SELECT 1;", responses: dict = None, ttft: float = 0.2,
+                 chunk_delay: float = 0.005, chunk_chars: int = 8, latency_by_model: dict = None,
+                 sql_by_model: dict = None):
+        self.default_sql = default_sql
+        self.responses = responses or {}
+        self.ttft = ttft
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = chunk_chars
+        self.latency_by_model = latency_by_model or {}
+        self.sql_by_model = sql_by_model or {}
+        self.calls = 0
+        self._last_system_prompt = ""
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def pick_sql(self, question: str) -> str:
+        lowered = question.lower()
+        for needle, sql in self.responses.items():
+            if needle.lower() in lowered:
+                return sql
+        return self.default_sql
+
+    async def _create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        self.calls += 1
+        system_prompt = next((m["content"] for m in messages if m["role"] == "system"), "")
+        question = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "")
+        sql = self.sql_by_model.get(model) or self.pick_sql(question)
+        usage = self._usage(system_prompt, question, sql)
+        ttft = self.latency_by_model.get(model, self.ttft)
+
+        if not stream:
+            await asyncio.sleep(ttft + self.chunk_delay * self._chunk_count(sql))
+            message = SimpleNamespace(content=sql, role="assistant")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")], usage=usage)
+        return self._stream(sql, usage, ttft)
+
+    async def _stream(self, sql: str, usage, ttft: float):
+        await asyncio.sleep(ttft)
+        for i in range(0, len(sql), self.chunk_chars):
+            if i:
+                await asyncio.sleep(self.chunk_delay)
+            delta = SimpleNamespace(content=sql[i:i + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], usage=None)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    def _chunk_count(self, sql: str) -> int:
+        return max(1, -(-len(sql) // self.chunk_chars))
+
+    def _usage(self, system_prompt: str, question: str, sql: str):
+        shared = 0
+        for a, b in zip(self._last_system_prompt, system_prompt):
+            if a != b:
+                break
+            shared += 1
+        self._last_system_prompt = system_prompt
+
+        # Providers cache in 128-token blocks once the prefix reaches 1024 tokens
+        cached = estimate_tokens(system_prompt[:shared]) if shared else 0
+        cached = (cached // 128) * 128 if cached >= 1024 else 0
+        return SimpleNamespace(
+            prompt_tokens=estimate_tokens(system_prompt) + estimate_tokens(question),
+            completion_tokens=estimate_tokens(sql),
+            total_tokens=estimate_tokens(system_prompt) + estimate_tokens(question) + estimate_tokens(sql),
+            prompt_tokens_details=SimpleNamespace(cached_tokens=cached),
+        )
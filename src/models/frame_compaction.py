@@ -0,0 +1,81 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.models.utils import env_bool, env_float, env_int
+
+# pandas' Arrow-backed string dtype (what "str" is in pandas 3 with pyarrow installed)
+_ARROW_STRING = pd.StringDtype("pyarrow")
+_ARROW_DATE = pd.ArrowDtype(pa.date32())
+
+
+def compaction_enabled() -> bool:
+    return env_bool("ASKDB_COMPACT_RESULTS", True)
+
+
+def compact_frame(df: pd.DataFrame, category_ratio: float = None, max_categories: int = None) -> pd.DataFrame:
+    """
+    Returns a smaller copy of df: integers downcast, floats narrowed to
+    float32 where that is lossless, low-cardinality strings made
+    categorical, other strings Arrow-backed, and date objects stored as
+    Arrow dates. Values are unchanged. attrs["memory_before"] and
+    attrs["memory_after"] record the deep memory usage in bytes.
+    """
+    category_ratio = category_ratio if category_ratio is not None else env_float("ASKDB_COMPACT_CATEGORY_RATIO", 0.5)
+    max_categories = max_categories or env_int("ASKDB_COMPACT_MAX_CATEGORIES", 10000)
+
+    before = int(df.memory_usage(deep=True).sum())
+    columns = {name: _compact_column(df[name], category_ratio, max_categories) for name in df.columns}
+    compact = pd.DataFrame(columns, index=df.index) if columns else df.copy()
+    compact.attrs.update(df.attrs)
+    compact.attrs["memory_before"] = before
+    compact.attrs["memory_after"] = int(compact.memory_usage(deep=True).sum())
+    return compact
+
+
+def _compact_column(series: pd.Series, category_ratio: float, max_categories: int) -> pd.Series:
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or isinstance(dtype, pd.ArrowDtype):
+        return series
+    if pd.api.types.is_bool_dtype(dtype):
+        return series
+    if pd.api.types.is_integer_dtype(dtype) and isinstance(dtype, np.dtype):
+        return pd.to_numeric(series, downcast="integer")
+    if pd.api.types.is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        return _narrow_float(series)
+    if pd.api.types.is_string_dtype(dtype) or dtype == object:
+        return _compact_objects(series, category_ratio, max_categories)
+    return series
+
+
+def _narrow_float(series: pd.Series) -> pd.Series:
+    if series.dtype == np.float32:
+        return series
+    narrowed = series.astype(np.float32)
+    # Only when every value survives the round trip (NaN compares unequal, so check it separately)
+    same = (narrowed.astype(np.float64) == series) | (series.isna() & narrowed.isna())
+    return narrowed if same.all() else series
+
+
+def _compact_objects(series: pd.Series, category_ratio: float, max_categories: int) -> pd.Series:
+    values = series.dropna()
+    if values.empty:
+        return series
+    kind = "string" if pd.api.types.is_string_dtype(series.dtype) and series.dtype != object else (
+        pd.api.types.infer_dtype(values, skipna=True))
+
+    if kind == "string":
+        unique = values.nunique()
+        if unique <= max_categories and unique <= len(series) * category_ratio:
+            return series.astype(pd.CategoricalDtype(pd.Index(values.unique(), dtype=_ARROW_STRING)))
+        return series.astype(_ARROW_STRING)
+
+    # infer_dtype also says "date" when datetimes are mixed in; those must keep their time
+    if kind == "date" and all(type(value) is datetime.date for value in values):
+        array = pa.array(series.tolist(), type=pa.date32())
+        return pd.Series(array, index=series.index, name=series.name, dtype=_ARROW_DATE)
+
+    # Mixed types, bytes, JSON documents, ...: leave as is
+    return series
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.models.utils import env_bool, env_int
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercases, collapses whitespace and drops trailing punctuation so
+    trivially different phrasings of the same question share a cache key.
+    """
+    return re.sub(r"\s+", " ", question.strip().lower()).rstrip(" ?.!;")
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for generated SQL: an in-process LRU in front of a
+    persistent SQLite table. Keys combine the normalized question, the model
+    name and a hash of the system prompt (which embeds the schema).
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, max_disk_entries: int = None,
+                 ttl: int = None, enabled: bool = None):
+        cache_dir = os.getenv("ASKDB_CACHE_DIR", ".askdb_cache")
+        self.path = path or os.path.join(cache_dir, "llm_cache.sqlite3")
+        self.max_entries = max_entries or env_int("ASKDB_LLM_CACHE_SIZE", 512)
+        self.max_disk_entries = max_disk_entries or env_int("ASKDB_LLM_CACHE_DISK_SIZE", 10000)
+        self.ttl = ttl or env_int("ASKDB_LLM_CACHE_TTL", 7 * 24 * 3600)
+        self.enabled = enabled if enabled is not None else env_bool("ASKDB_LLM_CACHE", True)
+
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @staticmethod
+    def make_key(question: str, model_name: str, system_prompt: str) -> str:
+        prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()
+        raw = f"{normalize_question(question)}\x00{model_name}\x00{prompt_hash}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str):
+        """
+        Returns the cached response for key, or None on a miss.
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            row = self._disk_get(key, now)
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                self.hits += 1
+                return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, response: str, model_name: str = None):
+        if not self.enabled or not response:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._remember(key, response, now)
+            self._disk_set(key, response, model_name, now)
+
+    def delete(self, key: str):
+        """
+        Drops one entry, e.g. a response that failed validation.
+        """
+        with self._lock:
+            self._memory.pop(key, None)
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                except sqlite3.Error:
+                    pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total) if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _remember(self, key, response, created_at):
+        self._memory[key] = (response, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connection(self):
+        if self._conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, response TEXT NOT NULL, model TEXT, "
+                    "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn = None
+        return self._conn
+
+    def _disk_get(self, key, now):
+        conn = self._connection()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return row
+        except sqlite3.Error:
+            return None
+
+    def _disk_set(self, key, response, model_name, now):
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, model, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, model_name, now, now),
+            )
+            # Evict expired rows, then the least recently used beyond the size cap
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+            conn.commit()
+        except sqlite3.Error:
+            pass  # the disk tier is best-effort
+
+
+llm_cache = LLMResponseCache()
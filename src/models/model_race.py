@@ -0,0 +1,132 @@
+import math
+import os
+import threading
+from collections import deque
+
+from src.models import telemetry
+from src.models.utils import env_float, env_int
+
+# How SQLQueryGenerator gets its answer
+SINGLE, RACE, HEDGE = "single", "race", "hedge"
+_STRATEGIES = (SINGLE, RACE, HEDGE)
+
+# Attempt outcomes recorded per model
+WON, LOST, REJECTED, CANCELLED, FAILED = "won", "lost", "rejected", "cancelled", "error"
+
+_FAST_MODEL = "gpt-4o-mini"
+
+
+def generation_strategy() -> str:
+    strategy = (os.getenv("ASKDB_GENERATION_STRATEGY") or SINGLE).strip().lower()
+    return strategy if strategy in _STRATEGIES else SINGLE
+
+
+def race_models(model_name: str) -> list:
+    """
+    Models raced against each other: ASKDB_RACE_MODELS, or a fast model
+    alongside the requested one.
+    """
+    configured = [m.strip() for m in os.getenv("ASKDB_RACE_MODELS", "").split(",") if m.strip()]
+    models = configured or [_FAST_MODEL, model_name]
+    return list(dict.fromkeys(models))
+
+
+def quick_check(sql: str, dialect: str = None):
+    """
+    The local check a response must pass to win: one statement that parses
+    and is not INVALID_QUERY. Returns the reason it failed, or None. Schema
+    binding is left to SQLValidator after the race.
+    """
+    import sqlglot
+    from sqlglot.errors import ParseError
+
+    from src.models.sql_validator import sqlglot_dialect
+
+    if not sql:
+        return "empty response"
+    if sql.startswith("INVALID_QUERY"):
+        return "declined"
+    try:
+        statements = [s for s in sqlglot.parse(sql, read=sqlglot_dialect(dialect)) if s is not None]
+    except ParseError:
+        return "does not parse"
+    if len(statements) != 1:
+        return f"{len(statements)} statements"
+    return None
+
+
+class ModelRaceStats:
+    """
+    Per-model attempt counts, win rates, latencies and tokens spent on
+    responses that were not used, across all races in the process. Recent
+    latencies also set the hedging delay.
+    """
+
+    def __init__(self, window: int = None):
+        self.window = window or env_int("ASKDB_RACE_LATENCY_WINDOW", 200)
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, outcome: str, latency: float = None, wasted_tokens: int = 0, strategy: str = RACE):
+        with self._lock:
+            entry = self._models.setdefault(model, {
+                "attempts": 0, WON: 0, LOST: 0, REJECTED: 0, CANCELLED: 0, FAILED: 0,
+                "wasted_tokens": 0, "latencies": deque(maxlen=self.window),
+            })
+            entry["attempts"] += 1
+            entry[outcome] += 1
+            entry["wasted_tokens"] += wasted_tokens
+            if latency is not None and outcome in (WON, LOST, REJECTED):
+                entry["latencies"].append(latency)
+        telemetry.metrics.inc("askdb_race_attempts_total", help="Generation attempts in races and hedges",
+                              model=model, outcome=outcome, strategy=strategy)
+        if wasted_tokens:
+            telemetry.metrics.inc("askdb_race_wasted_tokens_total", wasted_tokens,
+                                  help="Tokens spent on attempts whose answer was not used", model=model)
+        if latency is not None and outcome in (WON, LOST, REJECTED):
+            telemetry.metrics.observe("askdb_race_latency_seconds", latency,
+                                      help="Full-response latency per raced model", model=model)
+
+    def percentile(self, model: str, q: float):
+        with self._lock:
+            entry = self._models.get(model)
+            samples = sorted(entry["latencies"]) if entry else []
+        if len(samples) < env_int("ASKDB_HEDGE_MIN_SAMPLES", 20):
+            return None
+        return samples[min(len(samples) - 1, math.ceil(q * len(samples)) - 1)]
+
+    def stats(self) -> list:
+        with self._lock:
+            rows = []
+            for model, entry in sorted(self._models.items()):
+                latencies = sorted(entry["latencies"])
+                rows.append({
+                    "model": model,
+                    "attempts": entry["attempts"],
+                    "wins": entry[WON],
+                    "win_rate": entry[WON] / entry["attempts"] if entry["attempts"] else 0.0,
+                    "rejected": entry[REJECTED],
+                    "cancelled": entry[CANCELLED],
+                    "errors": entry[FAILED],
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+                    "p95_ms": round(latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)] * 1000, 1)
+                    if latencies else None,
+                    "wasted_tokens": entry["wasted_tokens"],
+                })
+            return rows
+
+    def reset(self):
+        with self._lock:
+            self._models.clear()
+
+
+race_stats = ModelRaceStats()
+
+
+def hedge_delay(model: str) -> float:
+    """
+    Seconds to wait before sending a duplicate request: the model's observed
+    p95 latency once there are enough samples, else ASKDB_HEDGE_DELAY.
+    """
+    p95 = race_stats.percentile(model, 0.95)
+    return p95 if p95 is not None else env_float("ASKDB_HEDGE_DELAY", 2.0)
@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from src.models import telemetry
+from src.models.async_runtime import submit_blocking
+from src.models.db_executor import DatabaseExecutor
+from src.models.prompts.builder import SystemPromptBuilder
+from src.models.prompts.schema_index import get_schema_index
+from src.models.schema_browser import get_browser_index
+from src.models.utils import env_int, resolve_host
+
+STAGES = ("dns", "connect", "schema", "index")
+PENDING, RUNNING, DONE, WARNING, FAILED = "pending", "running", "done", "warning", "failed"
+
+
+class Preflight:
+    """
+    Connection warm-up that starts as soon as a connection is submitted:
+    resolves the database hosts, opens and pings pooled connections, loads
+    the schema and builds the browser and prompt indexes, all in a worker
+    thread. `stages` reports progress; everything it warms is shared
+    process-wide, so the first question finds it ready.
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.stages = {name: {"status": PENDING, "ms": None, "detail": None} for name in STAGES}
+        self.error = None
+        self.schema = None
+        self.started = time.perf_counter()
+        self.seconds = None
+        self._done = threading.Event()
+        self._future = None
+
+    def start(self):
+        self._future = submit_blocking(self._run)
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def elapsed(self) -> float:
+        return self.seconds if self.seconds is not None else time.perf_counter() - self.started
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _run(self):
+        trace = telemetry.Trace("preflight")
+        with trace:
+            try:
+                db = DatabaseExecutor(config=self.config, db_url=self.config.get("db_url"))
+                if not db.engine:
+                    raise Exception("No database connection configured.")
+                with self._stage("dns") as stage:
+                    stage["detail"] = self._resolve(db, stage)
+                with self._stage("connect") as stage:
+                    stage["detail"] = self._connect(db)
+                with self._stage("schema") as stage:
+                    self.schema = db.get_schema()
+                    stage["detail"] = f"{len(self.schema):,} tables"
+                with self._stage("index") as stage:
+                    get_browser_index(self.schema)
+                    get_schema_index(self.schema)
+                    SystemPromptBuilder(self.schema).build()
+                    stage["detail"] = "search and prompt indexes ready"
+            except Exception as e:
+                self.error = str(e)
+            finally:
+                self.seconds = time.perf_counter() - self.started
+                self._done.set()
+        trace.attrs["error"] = self.error
+        trace.finish()
+
+    @contextmanager
+    def _stage(self, name: str):
+        stage = self.stages[name]
+        stage["status"] = RUNNING
+        started = time.perf_counter()
+        try:
+            with telemetry.span(f"preflight.{name}"):
+                yield stage
+        except Exception as e:
+            stage["status"] = FAILED
+            stage["detail"] = str(e).splitlines()[0] if str(e) else type(e).__name__
+            raise
+        finally:
+            stage["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if stage["status"] == RUNNING:
+            stage["status"] = DONE
+
+    def _resolve(self, db, stage: dict) -> str:
+        """
+        Warms the DNS cache. A host that does not resolve here is only a
+        warning: the driver does its own lookup, and the connect stage
+        decides whether the server can be reached.
+        """
+        engines = [db.engine] + ([endpoint.engine for endpoint in db.router.replicas] if db.router else [])
+        resolved = []
+        for engine in engines:
+            host = engine.url.host
+            if not host:
+                continue
+            ip = resolve_host(host)
+            if ip is None:
+                stage["status"] = WARNING
+                resolved.append(f"{host} not resolved yet, left to the driver")
+            else:
+                resolved.append(f"{host} → {ip}")
+        return ", ".join(resolved) or "local database"
+
+    def _connect(self, db) -> str:
+        """
+        Checks out ASKDB_PREFLIGHT_CONNECTIONS connections at once (each
+        pre-pinged by the pool), runs SELECT 1 on them and returns them to
+        the pool, so the first queries skip connection setup.
+        """
+        pool_size = db.engine.pool.size() if hasattr(db.engine.pool, "size") else 1
+        count = max(1, min(env_int("ASKDB_PREFLIGHT_CONNECTIONS", 2), pool_size))
+
+        def ping(_):
+            with db.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+
+        with ThreadPoolExecutor(max_workers=count, thread_name_prefix="askdb-preflight") as pool:
+            list(pool.map(ping, range(count)))
+        if db.router:
+            db.router.check_health()
+            healthy = sum(1 for endpoint in db.router.replicas if endpoint.healthy)
+            return f"{count} connection(s) ready, {healthy}/{len(db.router.replicas)} replicas healthy"
+        return f"{count} connection(s) ready"
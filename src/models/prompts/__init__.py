@@ -1 +1,2 @@
 from .builder import SystemPromptBuilder
+from .schema_index import SchemaIndex
@@ -1,60 +1,214 @@
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
 from .roles import get_role_prompt
 from .rules import get_rules_prompt
 from .outputs import get_output_format_prompt
+from .few_shot import few_shot_store
+from .schema_index import get_schema_index
+from src.models import telemetry
+from src.models.utils import env_int, estimate_tokens, schema_fingerprint
+
+SCHEMA_HEADER = """========================
+DATABASE SCHEMA (SOURCE OF TRUTH)
+========================
+The schema below is the ONLY source of truth.
+You MUST NOT assume anything beyond it.
+
+"""
+
+EXAMPLES_HEADER = """========================
+VERIFIED EXAMPLES
+========================
+These questions were answered correctly on this database before.
+Reuse their tables, joins and filters where they apply.
+
+"""
+
+# What precedes the examples in a built prompt; see cache_prompt()
+_EXAMPLES_SEPARATOR = "\n" + EXAMPLES_HEADER
+
+_RENDER_CACHE_SIZE = 8
+_rendered_schemas = OrderedDict()
+_render_lock = threading.Lock()
+
+
+@lru_cache(maxsize=64)
+def _static_sections(prompt_type: str, model_name: str) -> str:
+    """
+    Role, rules and output contract, rendered once per (prompt_type, model_name).
+    """
+    return "\n\n".join(
+        section.strip()
+        for section in (
+            get_role_prompt(prompt_type),
+            get_rules_prompt(prompt_type, model_name),
+            get_output_format_prompt(prompt_type),
+        )
+    )
+
+
+def _render_table(table: str, columns: list) -> str:
+    body = ",\n".join(f"  {col}" for col in columns)
+    return f"CREATE TABLE {table} (\n{body}\n);\n\n"
+
+
+def _rendered_schema(schema: dict, fingerprint: str) -> dict:
+    """
+    Per-table DDL, token estimates and the full DDL text, memoized per schema fingerprint.
+    """
+    with _render_lock:
+        rendered = _rendered_schemas.get(fingerprint)
+        if rendered is not None:
+            _rendered_schemas.move_to_end(fingerprint)
+            return rendered
+
+    table_ddl = {table: _render_table(table, columns) for table, columns in schema.items()}
+    table_tokens = {table: estimate_tokens(ddl) for table, ddl in table_ddl.items()}
+    rendered = {
+        "table_ddl": table_ddl,
+        "table_tokens": table_tokens,
+        "full_tokens": sum(table_tokens.values()),
+        "full_section": SCHEMA_HEADER + "".join(table_ddl.values()),
+    }
+    with _render_lock:
+        _rendered_schemas[fingerprint] = rendered
+        while len(_rendered_schemas) > _RENDER_CACHE_SIZE:
+            _rendered_schemas.popitem(last=False)
+    return rendered
+
+
+def cache_prompt(system_prompt: str) -> str:
+    """
+    The part of a system prompt that cached answers are keyed on: everything
+    before the verified examples, so storing a new example does not turn
+    answers that are already cached into misses.
+    """
+    return system_prompt.partition(_EXAMPLES_SEPARATOR)[0].rstrip()
+
 
 class SystemPromptBuilder:
     """
-    Builder class for constructing the system prompt dynamically based on 
+    Builder class for constructing the system prompt dynamically based on
     schema, persona, and model context.
+
+    When a question is given and the schema is larger than `max_tables` or
+    `token_budget`, only the most relevant tables (plus their foreign-key
+    neighbours) are included. `stats` reports what was kept after build().
+
+    Static sections come first and the schema next, so consecutive requests
+    share a byte-identical prefix that provider-side prompt caching can reuse.
+    Verified examples of similar questions (from the few-shot store, unless
+    `examples` is given) go last, within `example_budget` tokens.
     """
-    
-    def __init__(self, schema: dict, prompt_type: str = "default", model_name: str = "gpt-4o"):
+
+    def __init__(self, schema: dict, prompt_type: str = "default", model_name: str = "gpt-4o",
+                 question: str = None, max_tables: int = None, token_budget: int = None,
+                 fingerprint: str = None, examples: list = None, example_budget: int = None):
         self.schema = schema
         self.prompt_type = prompt_type
         self.model_name = model_name
+        self.question = question
+        self.max_tables = max_tables or env_int("ASKDB_PROMPT_MAX_TABLES", 20)
+        self.token_budget = token_budget or env_int("ASKDB_PROMPT_TOKEN_BUDGET", 8000)
+        self.fingerprint = fingerprint or schema_fingerprint(schema)
+        self.examples = examples
+        self.example_budget = example_budget or env_int("ASKDB_FEW_SHOT_TOKEN_BUDGET", 800)
+        self.stats = {}
 
     def build(self) -> str:
         """
         Constructs and returns the full system prompt string.
         """
-        # 1. Schema Component
-        schema_text = self._build_schema_section()
-        
-        # 2. Role Component
-        role_text = get_role_prompt(self.prompt_type)
-        
-        # 3. Rules Component (Model-Aware)
-        rules_text = get_rules_prompt(self.prompt_type, self.model_name)
-        
-        # 4. Output Contract
-        output_contract = get_output_format_prompt(self.prompt_type)
-        
-        # Assembly
-        full_prompt = f"""
-{role_text}
-
-{schema_text}
-
-{rules_text}
-
-{output_contract}
-"""
-        return full_prompt.strip()
+        with telemetry.span("prompt.build") as span:
+            # 1. Role, Rules (Model-Aware) and Output Contract: identical on every request
+            static_text = _static_sections(self.prompt_type, self.model_name)
+
+            # 2. Schema Component: stable per schema, so it extends the shared prefix
+            schema_text = self._build_schema_section()
+
+            # 3. Verified examples: specific to the question, so they come last
+            examples_text = self._build_examples_section()
+
+            prompt = f"{static_text}\n\n{schema_text}{examples_text}".strip()
+            span.set(selected_tables=self.stats["selected_tables"], total_tables=self.stats["total_tables"],
+                     examples=self.stats["examples"], prompt_tokens_est=estimate_tokens(prompt))
+            return prompt
 
     def _build_schema_section(self) -> str:
-        ddl_text = ""
-        for table, columns in self.schema.items():
-            ddl_text += f"CREATE TABLE {table} (\n"
-            for col in columns:
-                ddl_text += f"  {col},\n"
-            ddl_text = ddl_text.rstrip(",\n") + "\n);\n\n"
-
-        return f"""
-========================
-DATABASE SCHEMA (SOURCE OF TRUTH)
-========================
-The schema below is the ONLY source of truth.
-You MUST NOT assume anything beyond it.
+        rendered = _rendered_schema(self.schema, self.fingerprint)
+        selected = self._select_tables(rendered)
 
-{ddl_text}
-"""
+        if len(selected) == len(rendered["table_ddl"]):
+            section = rendered["full_section"]
+        else:
+            section = SCHEMA_HEADER + "".join(rendered["table_ddl"][table] for table in selected)
+
+        full_tokens = rendered["full_tokens"]
+        schema_tokens = sum(rendered["table_tokens"][table] for table in selected)
+        self.stats = {
+            "total_tables": len(rendered["table_ddl"]),
+            "selected_tables": len(selected),
+            "pruned_tables": len(rendered["table_ddl"]) - len(selected),
+            "schema_tokens": schema_tokens,
+            "full_schema_tokens": full_tokens,
+            "estimated_tokens_saved": full_tokens - schema_tokens,
+        }
+        return section
+
+    def _build_examples_section(self) -> str:
+        examples = self.examples
+        if examples is None:
+            examples = few_shot_store.search(self.fingerprint, self.question) if self.question else []
+
+        blocks = []
+        used_tokens = estimate_tokens(EXAMPLES_HEADER)
+        for example in examples:
+            block = f"Q: {example[0]}\nSQL: {example[1]}\n\n"
+            cost = estimate_tokens(block)
+            if used_tokens + cost > self.example_budget:
+                continue
+            blocks.append(block)
+            used_tokens += cost
+
+        self.stats["examples"] = len(blocks)
+        self.stats["example_tokens"] = used_tokens if blocks else 0
+        return "\n" + EXAMPLES_HEADER + "".join(blocks) if blocks else ""
+
+    def _select_tables(self, rendered: dict) -> list:
+        """
+        Picks the tables to show: everything if it fits, otherwise the top
+        ranked tables and their FK neighbours, trimmed to the token budget.
+        """
+        tables = list(rendered["table_ddl"])
+        table_tokens = rendered["table_tokens"]
+        if not self.question or (len(tables) <= self.max_tables and rendered["full_tokens"] <= self.token_budget):
+            return tables
+
+        index = get_schema_index(self.schema, self.fingerprint)
+        scored = index.rank(self.question)
+        ranked = [table for table, _ in scored]
+        # Only tables that matched something, unless nothing matched at all
+        seeds = [table for table, score in scored[:self.max_tables] if score > 0] or ranked[:self.max_tables]
+
+        # Joins need both sides, so pull in FK neighbours ranked by relevance
+        rank_position = {table: i for i, table in enumerate(ranked)}
+        neighbours = set()
+        for table in seeds:
+            neighbours.update(index.neighbours(table))
+        neighbours.difference_update(seeds)
+        candidates = seeds + sorted(neighbours, key=rank_position.get)
+
+        selected = []
+        used_tokens = 0
+        for table in candidates:
+            cost = table_tokens[table]
+            if selected and used_tokens + cost > self.token_budget:
+                continue
+            selected.append(table)
+            used_tokens += cost
+
+        # Keep the schema's own order so identical selections render identically
+        chosen = set(selected)
+        return [table for table in tables if table in chosen]
@@ -0,0 +1,211 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .schema_index import tokenize
+from src.models import telemetry
+from src.models.llm_cache import normalize_question
+from src.models.utils import env_bool, env_float, env_int
+
+_INDEX_CACHE_SIZE = 16
+
+
+def _terms(question: str) -> Counter:
+    """Stemmed words plus adjacent word pairs, so word order counts a little."""
+    words = tokenize(question)
+    terms = Counter(words)
+    terms.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return terms
+
+
+class _ExampleIndex:
+    """
+    TF-IDF vectors for one schema's stored questions, with an inverted index
+    so a lookup only touches examples that share a term with the question.
+    """
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        doc_terms = [_terms(question) for question, _, _ in rows]
+        doc_freq = Counter()
+        for terms in doc_terms:
+            doc_freq.update(terms.keys())
+        n_docs = len(rows)
+        # Terms no stored question has still count against similarity
+        self.unseen_idf = math.log(1 + n_docs) + 1
+        self.idf = {term: math.log((1 + n_docs) / (1 + df)) + 1 for term, df in doc_freq.items()}
+
+        self.postings = {}
+        for doc, terms in enumerate(doc_terms):
+            weights = {term: tf * self.idf[term] for term, tf in terms.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, weight in weights.items():
+                self.postings.setdefault(term, []).append((doc, weight / norm))
+
+    def search(self, question: str, k: int, min_score: float, exclude_key: str = None) -> list:
+        terms = _terms(question)
+        weights = {term: tf * self.idf.get(term, self.unseen_idf) for term, tf in terms.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        scores = Counter()
+        for term, weight in weights.items():
+            for doc, doc_weight in self.postings.get(term, ()):
+                scores[doc] += weight / norm * doc_weight
+        if exclude_key is not None:
+            for doc in [doc for doc in scores if self.rows[doc][2] == exclude_key]:
+                del scores[doc]
+        return [
+            (self.rows[doc][0], self.rows[doc][1], round(score, 4))
+            for doc, score in scores.most_common(k)
+            if score >= min_score
+        ]
+
+
+class FewShotStore:
+    """
+    Question -> SQL pairs that ran successfully, kept per schema fingerprint
+    in SQLite and searched with an in-memory TF-IDF index, so similar past
+    questions can be shown to the model as examples. Also counts attempts
+    per question to measure how often the first answer is already right.
+    """
+
+    def __init__(self, path: str = None, max_per_schema: int = None, enabled: bool = None):
+        cache_dir = os.getenv("ASKDB_CACHE_DIR", ".askdb_cache")
+        self.path = path or os.path.join(cache_dir, "few_shot.sqlite3")
+        self.max_per_schema = max_per_schema or env_int("ASKDB_FEW_SHOT_MAX_PER_SCHEMA", 500)
+        self.enabled = enabled if enabled is not None else env_bool("ASKDB_FEW_SHOT", True)
+
+        self.questions = 0
+        self.first_attempt = 0
+        self.answered = 0
+        self.attempts = 0
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def add(self, fingerprint: str, question: str, sql: str, source: str = "generated"):
+        """
+        Stores a pair that executed successfully; re-adding a question
+        replaces its SQL (e.g. with a hand-corrected version).
+        """
+        if not self.enabled or not question or not sql or sql.startswith("INVALID_QUERY"):
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT INTO few_shot (fingerprint, question_key, question, sql, source, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (fingerprint, question_key) DO UPDATE SET "
+                    "question = excluded.question, sql = excluded.sql, source = excluded.source, last_used = excluded.last_used",
+                    (fingerprint, normalize_question(question), question.strip(), sql.strip(), source, now, now),
+                )
+                conn.execute(
+                    "DELETE FROM few_shot WHERE fingerprint = ? AND question_key NOT IN ("
+                    "SELECT question_key FROM few_shot WHERE fingerprint = ? ORDER BY last_used DESC LIMIT ?)",
+                    (fingerprint, fingerprint, self.max_per_schema),
+                )
+                conn.commit()
+            except sqlite3.Error:
+                return
+            self._indexes.pop(fingerprint, None)
+        telemetry.metrics.inc("askdb_few_shot_stored_total", help="Verified question/SQL pairs stored", source=source)
+
+    def search(self, fingerprint: str, question: str, k: int = None, min_score: float = None) -> list:
+        """
+        Returns up to k (question, sql, score) pairs for this schema, most
+        similar first, scoring at least min_score (cosine, 0..1). A stored
+        pair for the same question is skipped; repeats are served by the
+        LLM cache.
+        """
+        if not self.enabled or not question:
+            return []
+        k = k or env_int("ASKDB_FEW_SHOT_K", 3)
+        min_score = min_score if min_score is not None else env_float("ASKDB_FEW_SHOT_MIN_SCORE", 0.2)
+        with telemetry.span("few_shot.search") as span:
+            index = self._index(fingerprint)
+            matches = index.search(question, k, min_score, normalize_question(question)) if index is not None else []
+            span.set(candidates=len(index.rows) if index is not None else 0, matches=len(matches))
+        return matches
+
+    def record_question(self):
+        """Counts a newly asked question."""
+        with self._lock:
+            self.questions += 1
+
+    def record_success(self, attempts: int):
+        """
+        Counts a question whose query finally ran, after `attempts` SQL
+        attempts (generation, repair, hand corrections).
+        """
+        with self._lock:
+            self.answered += 1
+            self.attempts += attempts
+            if attempts == 1:
+                self.first_attempt += 1
+        telemetry.metrics.observe("askdb_generation_attempts", attempts,
+                                  help="SQL attempts until a question's query ran successfully")
+        if attempts == 1:
+            telemetry.metrics.inc("askdb_first_attempt_success_total", help="Questions whose first SQL ran successfully")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "questions": self.questions,
+                "answered": self.answered,
+                "first_attempt_rate": self.first_attempt / self.questions if self.questions else 0.0,
+                "avg_attempts": self.attempts / self.answered if self.answered else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM few_shot")
+                conn.commit()
+
+    def _index(self, fingerprint: str):
+        with self._lock:
+            index = self._indexes.get(fingerprint)
+            if index is not None:
+                self._indexes.move_to_end(fingerprint)
+                return index
+            conn = self._connection()
+            if conn is None:
+                return None
+            try:
+                rows = conn.execute(
+                    "SELECT question, sql, question_key FROM few_shot WHERE fingerprint = ? ORDER BY last_used DESC",
+                    (fingerprint,),
+                ).fetchall()
+            except sqlite3.Error:
+                return None
+            index = self._indexes[fingerprint] = _ExampleIndex(rows)
+            while len(self._indexes) > _INDEX_CACHE_SIZE:
+                self._indexes.popitem(last=False)
+            return index
+
+    def _connection(self):
+        if self._conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._conn = sqlite3.connect(self.path, check_same_thread=False)
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS few_shot ("
+                    "fingerprint TEXT NOT NULL, question_key TEXT NOT NULL, question TEXT NOT NULL, "
+                    "sql TEXT NOT NULL, source TEXT, created_at REAL NOT NULL, last_used REAL NOT NULL, "
+                    "PRIMARY KEY (fingerprint, question_key))"
+                )
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn = None
+        return self._conn
+
+
+few_shot_store = FewShotStore()
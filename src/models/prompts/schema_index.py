@@ -0,0 +1,154 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from src.models.utils import parse_column, schema_fingerprint
+
+_CAMEL_RE = re.compile(r"([a-z0-9])([A-Z])")
+_WORD_RE = re.compile(r"[A-Za-z0-9]+")
+
+# Small domain thesaurus so "clients" finds `customers`, "pay" finds `salary`, ...
+_SYNONYM_GROUPS = [
+    {"customer", "client", "buyer", "user", "account"},
+    {"order", "purchase", "sale", "transaction", "buy", "bought", "sold"},
+    {"product", "item", "sku", "article", "good"},
+    {"employee", "staff", "worker", "personnel"},
+    {"salary", "pay", "wage", "compensation", "income"},
+    {"revenue", "sale", "amount", "total", "price", "spend", "spent"},
+    {"student", "pupil", "learner"},
+    {"course", "class", "subject"},
+    {"department", "dept", "division", "team"},
+    {"date", "time", "day", "created", "timestamp"},
+    {"city", "location", "address", "region", "country"},
+    {"invoice", "bill", "payment"},
+    {"category", "type", "group", "kind"},
+    {"grade", "score", "mark", "gpa"},
+]
+
+_SYNONYMS = {}
+for _group in _SYNONYM_GROUPS:
+    for _word in _group:
+        _SYNONYMS.setdefault(_word, set()).update(_group - {_word})
+
+_STOPWORDS = {
+    "a", "an", "the", "of", "for", "in", "on", "by", "to", "and", "or", "with",
+    "me", "show", "list", "give", "get", "find", "all", "what", "which", "who",
+    "how", "many", "much", "is", "are", "was", "were", "per", "each", "top",
+    "from", "that", "this", "their", "there", "than", "more", "less", "most",
+}
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ses", "xes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    """
+    Splits identifiers and prose into lowercase, lightly stemmed tokens,
+    breaking snake_case and camelCase apart.
+    """
+    text = _CAMEL_RE.sub(r"\1 \2", text)
+    return [_stem(word) for word in _WORD_RE.findall(text.lower()) if word not in _STOPWORDS]
+
+
+class SchemaIndex:
+    """
+    Local BM25 index over table and column names.
+    Each table is one document; table-name tokens are weighted above column tokens.
+    """
+
+    TABLE_NAME_WEIGHT = 3
+
+    def __init__(self, schema: dict, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.tables = list(schema)
+        self.references = {table: set() for table in self.tables}
+        self.doc_terms = {}
+
+        for table, columns in schema.items():
+            terms = Counter()
+            for token in tokenize(table):
+                terms[token] += self.TABLE_NAME_WEIGHT
+            for col in columns:
+                parsed = parse_column(col)
+                terms.update(tokenize(parsed["name"]))
+                ref_table = parsed["ref_table"]
+                if ref_table in self.references and ref_table != table:
+                    self.references[table].add(ref_table)
+                    self.references[ref_table].add(table)
+            self.doc_terms[table] = terms
+
+        doc_lengths = [sum(terms.values()) for terms in self.doc_terms.values()]
+        self.avg_doc_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+
+        doc_freq = Counter()
+        for terms in self.doc_terms.values():
+            doc_freq.update(terms.keys())
+        n_docs = len(self.tables)
+        self.idf = {
+            term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def rank(self, question: str) -> list:
+        """
+        Returns [(table, score)] for every table, best match first.
+        Ties keep the schema's original table order.
+        """
+        query_terms = set(tokenize(question))
+        for term in list(query_terms):
+            query_terms.update(_SYNONYMS.get(term, ()))
+
+        scored = []
+        for position, table in enumerate(self.tables):
+            terms = self.doc_terms[table]
+            doc_length = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                norm = 1 - self.b + self.b * doc_length / (self.avg_doc_length or 1)
+                score += self.idf[term] * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+            scored.append((table, score, position))
+
+        scored.sort(key=lambda item: (-item[1], item[2]))
+        return [(table, score) for table, score, _ in scored]
+
+    def neighbours(self, table: str) -> set:
+        """
+        Tables linked to `table` by a foreign key in either direction.
+        """
+        return self.references.get(table, set())
+
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+_INDEX_CACHE_SIZE = 16
+
+
+def get_schema_index(schema: dict, fingerprint: str = None) -> SchemaIndex:
+    """
+    Returns a SchemaIndex for schema, reusing one built for identical content.
+    """
+    key = fingerprint or schema_fingerprint(schema)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+
+    index = SchemaIndex(schema)
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > _INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
@@ -0,0 +1,69 @@
+class QueryStatus:
+    ERROR = "error"
+    TIMEOUT = "timeout"
+    CANCELLED = "cancelled"
+    BLOCKED = "blocked"
+
+
+# Driver messages that identify server-side timeouts and cancellations
+_TIMEOUT_MARKERS = (
+    "maximum statement execution time exceeded",  # MySQL 3024
+    "max_statement_time",                         # MariaDB 1969
+    "statement timeout",                          # PostgreSQL 57014
+)
+_CANCEL_MARKERS = (
+    "query execution was interrupted",            # MySQL 1317 (KILL QUERY)
+    "canceling statement due to user request",    # PostgreSQL pg_cancel_backend
+    "interrupted",                                # SQLite interrupt()
+)
+
+
+class QueryFailure:
+    """
+    Structured result for a query that failed, timed out, or was cancelled.
+    str() gives the user-facing message.
+    """
+
+    def __init__(self, status: str, message: str, elapsed: float = None):
+        self.status = status
+        self.message = message
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"QueryFailure(status={self.status!r}, message={self.message!r})"
+
+
+class StatementTimeout(Exception):
+    """
+    Raised when the executor itself stopped a statement at its timeout, on
+    backends without a server-side statement timeout (SQLite).
+    """
+
+
+def classify_failure(exc: Exception, reason: str = None, elapsed: float = None) -> QueryFailure:
+    """
+    Maps a driver exception to a QueryFailure. `reason` (timeout/cancelled)
+    overrides message sniffing when the caller already knows why it stopped.
+    """
+    text = str(exc).lower()
+    status = reason
+    if status is None:
+        if isinstance(exc, StatementTimeout):
+            status = QueryStatus.TIMEOUT
+        elif any(marker in text for marker in _TIMEOUT_MARKERS):
+            status = QueryStatus.TIMEOUT
+        elif any(marker in text for marker in _CANCEL_MARKERS):
+            status = QueryStatus.CANCELLED
+        else:
+            status = QueryStatus.ERROR
+
+    if status == QueryStatus.TIMEOUT:
+        message = "Query exceeded the statement timeout and was stopped."
+    elif status == QueryStatus.CANCELLED:
+        message = "Query was cancelled."
+    else:
+        message = f"SQL Error: {exc}"
+    return QueryFailure(status, message, elapsed)
@@ -0,0 +1,149 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from src.models import telemetry
+from src.models.db_executor import is_read_query
+from src.models.query_errors import QueryFailure, QueryStatus, classify_failure
+from src.models.utils import env_float, env_int
+
+# Shared by every session: queries run here, never on the Streamlit script thread
+_query_pool = ThreadPoolExecutor(
+    max_workers=env_int("ASKDB_QUERY_WORKERS", 8),
+    thread_name_prefix="askdb-query",
+)
+
+
+class QueryJob:
+    """
+    Runs one query on a worker thread so the UI can poll it and cancel it.
+
+    Read queries are answered from the result cache when possible, otherwise
+    opened as a QueryStream and their first chunk fetched; everything else
+    goes through execute_query. The database enforces the
+    statement timeout where it can, and a watchdog cancels the backend query
+    once the timeout (plus a small grace period) has passed regardless.
+    """
+
+    WATCHDOG_GRACE = 1.0
+
+    def __init__(self, db, sql: str, timeout: float = None, use_cache: bool = True):
+        self.db = db
+        self.sql = sql
+        self.use_cache = use_cache
+        self.timeout = timeout if timeout is not None else env_float("ASKDB_STATEMENT_TIMEOUT", 60.0)
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+        self._handle = None
+        self._handle_ready = threading.Event()
+        self._stop_reason = None
+        self._lock = threading.Lock()
+
+        self._watchdog = None
+        if self.timeout and self.timeout > 0:
+            self._watchdog = threading.Timer(self.timeout + self.WATCHDOG_GRACE, self._on_timeout)
+            self._watchdog.daemon = True
+            self._watchdog.start()
+
+        # Copy the context so the worker's spans join the caller's trace
+        self._future = _query_pool.submit(contextvars.copy_context().run, self._run)
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at or time.monotonic()
+        return end - self.started_at
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Blocks until the query finishes or timeout passes; returns done().
+        """
+        wait([self._future], timeout)
+        return self.done()
+
+    def result(self, timeout: float = None):
+        """
+        Waits for and returns the result: a QueryStream, a cached DataFrame,
+        a status string, or a QueryFailure.
+        """
+        return self._future.result(timeout)
+
+    def cancel(self) -> bool:
+        """
+        Asks the database to stop the running statement.
+        """
+        return self._stop(QueryStatus.CANCELLED)
+
+    def _on_timeout(self):
+        self._stop(QueryStatus.TIMEOUT)
+
+    def _stop(self, reason: str) -> bool:
+        """
+        Records why the query should stop and cancels it if it is running.
+        Never waits: when the worker has no connection yet, _set_handle
+        cancels once it gets one.
+        """
+        if self.done():
+            return False
+        with self._lock:
+            if self._stop_reason is None:
+                self._stop_reason = reason
+            if not self._handle_ready.is_set():
+                return True
+            handle = self._handle
+        return self._cancel(handle)
+
+    def _cancel(self, handle) -> bool:
+        try:
+            return self.db.cancel(handle)
+        except Exception:
+            return False
+
+    def _set_handle(self, handle):
+        with self._lock:
+            self._handle = handle
+            self._handle_ready.set()
+            stopped = self._stop_reason is not None
+        if stopped:
+            # Asked to stop while waiting for a connection: the statement has
+            # not started, so cancel it and fail before it does
+            self._cancel(handle)
+            raise Exception(f"Query stopped ({self._stop_reason}) before it started.")
+
+    def _run(self):
+        with telemetry.span("db.query") as span:
+            try:
+                if is_read_query(self.sql):
+                    cached = self.db.cached_result(self.sql) if self.use_cache else None
+                    if cached is not None:
+                        span.set(rows=len(cached), cache_hit=True)
+                        return self._finish(cached, span)
+                    stream = self.db.stream_query(self.sql, timeout=self.timeout, on_connect=self._set_handle,
+                                                  cache_result=self.use_cache)
+                    stream.fetch_next()
+                    span.set(rows=stream.rows_fetched, bytes=stream.bytes_fetched, truncated=stream.truncated)
+                    if stream.error is not None:
+                        return self._finish(stream.error, span)
+                    # Kept for "Load more"; released while idle, reopened on the next fetch
+                    stream.park()
+                    return self._finish(stream, span)
+                return self._finish(self.db.execute_query(self.sql, timeout=self.timeout, on_connect=self._set_handle), span)
+            except Exception as e:
+                return self._finish(classify_failure(e), span)
+
+    def _finish(self, result, span=None):
+        self.finished_at = time.monotonic()
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+        if isinstance(result, QueryFailure):
+            # We know better than the driver message why the statement stopped
+            if self._stop_reason is not None:
+                result = classify_failure(Exception(result.message), reason=self._stop_reason)
+            result.elapsed = self.elapsed
+            if span is not None:
+                span.set(status=result.status)
+        return result
@@ -0,0 +1,178 @@
+import asyncio
+import time
+
+from src.models.cost_guard import CostGuard, GuardDecision
+from src.models.db_executor import DatabaseExecutor
+from src.models.prompts.builder import SystemPromptBuilder
+from src.models.prompts.few_shot import few_shot_store
+from src.models.query_errors import QueryFailure, QueryStatus
+from src.models.sql_generator import SQLQueryGenerator
+from src.models.sql_validator import SQLValidator, repair_enabled, validation_enabled
+from src.models.utils import env_int, schema_fingerprint
+
+
+class ServiceError(Exception):
+    """
+    A request the service could not complete; `status` is a short code
+    ("invalid_query", "invalid_sql", "blocked", "timeout", ...) callers map
+    to their own error reporting.
+    """
+
+    def __init__(self, status: str, message: str, **details):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details
+
+
+class QueryService:
+    """
+    The question -> SQL -> results pipeline without the Streamlit script
+    model, for the HTTP API and CLI. One instance serves many concurrent
+    requests: the executor's pool, the schema, LLM and result caches and the
+    OpenAI client are shared, while each call gets its own generator.
+    Database work runs in threads, bounded by `db_concurrency`; model calls
+    are bounded by `llm_concurrency`.
+    """
+
+    def __init__(self, db: DatabaseExecutor, model_name: str = "gpt-4o", persona: str = "elite_analyst",
+                 client=None, llm_concurrency: int = None, db_concurrency: int = None,
+                 validate: bool = None, repair: bool = None):
+        self.db = db
+        self.model_name = model_name
+        self.persona = persona
+        self.client = client
+        self.validate = validate if validate is not None else validation_enabled()
+        self.repair = repair if repair is not None else repair_enabled()
+        self.llm_slots = asyncio.Semaphore(llm_concurrency or env_int("ASKDB_API_LLM_CONCURRENCY", 32))
+        self.db_slots = asyncio.Semaphore(db_concurrency or env_int("ASKDB_API_DB_CONCURRENCY", 8))
+
+    @property
+    def dialect(self) -> str:
+        return self.db.engine.dialect.name
+
+    async def schema(self, refresh: bool = False) -> dict:
+        async with self.db_slots:
+            return await asyncio.to_thread(self.db.get_schema, refresh)
+
+    async def generate(self, question: str, model_name: str = None, persona: str = None,
+                       use_cache: bool = True) -> dict:
+        """
+        Generates SQL for question, validating it against the schema and
+        asking the model for one repair when it does not bind. Raises
+        ServiceError when the model declines or the SQL stays invalid.
+        """
+        model_name = model_name or self.model_name
+        schema = await self.schema()
+        fingerprint = schema_fingerprint(schema)
+        builder = SystemPromptBuilder(
+            schema=schema,
+            prompt_type=persona or self.persona,
+            model_name=model_name,
+            question=question,
+            fingerprint=fingerprint,
+        )
+        system_prompt = builder.build()
+
+        generator = SQLQueryGenerator(client=self.client, dialect=self.dialect)
+        started = time.perf_counter()
+        async with self.llm_slots:
+            sql = await generator.agenerate_sql(question, system_prompt, model_name, use_cache)
+        result = {
+            "sql": sql,
+            "model": generator.last_model or model_name,
+            "cache_hit": generator.last_cache_hit,
+            "ttft_ms": _ms(generator.last_ttft),
+            "repaired": False,
+            "prompt": builder.stats,
+            "schema_fingerprint": fingerprint,
+        }
+
+        if sql and not sql.startswith("INVALID_QUERY") and self.validate:
+            validator = SQLValidator(schema, self.dialect, fingerprint=fingerprint)
+            validation = validator.validate(sql)
+            if not validation.ok and self.repair:
+                async with self.llm_slots:
+                    repaired = await generator.arepair_sql(question, system_prompt, sql, validation.errors, model_name)
+                if repaired:
+                    sql = result["sql"] = repaired
+                    result["repaired"] = True
+                    if not sql.startswith("INVALID_QUERY"):
+                        validation = validator.validate(sql)
+                        if validation.ok:
+                            generator.remember(question, system_prompt, model_name, sql)
+            if not validation.ok and not sql.startswith("INVALID_QUERY"):
+                generator.forget(question, system_prompt, model_name)
+                raise ServiceError("invalid_sql", validation.message, sql=sql, errors=validation.errors)
+
+        result["generation_ms"] = _ms(time.perf_counter() - started)
+        if not sql or sql.startswith("INVALID_QUERY"):
+            raise ServiceError("invalid_query", sql or "The model returned no SQL.", sql=sql)
+        return result
+
+    async def explain(self, sql: str) -> dict:
+        """
+        The plan for sql and what the cost guard would do with it. EXPLAIN
+        runs even with the guard off, since that is what was asked for.
+        sql is always validated first: EXPLAIN does not stop a second,
+        write statement pasted after the first from running.
+        """
+        await self._check(sql)
+        async with self.db_slots:
+            try:
+                plan = await asyncio.to_thread(self.db.explain, sql)
+            except Exception as e:
+                raise ServiceError(QueryStatus.ERROR, f"SQL Error: {e}", sql=sql)
+        guard = CostGuard()
+        decision = guard.decide(sql, plan, self.dialect) if guard.enabled else GuardDecision("allow", sql, plan)
+        return {
+            "sql": decision.sql,
+            "action": decision.action,
+            "reasons": decision.reasons,
+            "plan": plan.to_dict(),
+        }
+
+    async def execute(self, sql: str, use_cache: bool = True, timeout: float = None, validate: bool = True):
+        """
+        Runs sql behind the validator (read-only policy and schema binding)
+        and the cost guard. Returns (sql actually run, DataFrame or status
+        string); raises ServiceError for rejected, blocked or failed queries.
+        """
+        if validate and self.validate:
+            await self._check(sql)
+
+        async with self.db_slots:
+            decision = await asyncio.to_thread(self.db.guard_query, sql, None, use_cache)
+            if decision.blocked:
+                raise ServiceError(QueryStatus.BLOCKED, "Query blocked by the cost guard:\n" + decision.message,
+                                   sql=sql, reasons=decision.reasons)
+            outcome = await asyncio.to_thread(self.db.execute_query, decision.sql, timeout, None, use_cache)
+        if isinstance(outcome, QueryFailure):
+            raise ServiceError(outcome.status, outcome.message, sql=decision.sql)
+        if isinstance(outcome, str) and not outcome.startswith("Query executed successfully"):
+            raise ServiceError(QueryStatus.ERROR, outcome, sql=decision.sql)
+        return decision.sql, outcome
+
+    async def _check(self, sql: str):
+        """Raises ServiceError unless sql is one statement the read-only policy and schema allow."""
+        validation = SQLValidator(await self.schema(), self.dialect).validate(sql)
+        if not validation.ok:
+            raise ServiceError("invalid_sql", validation.message, sql=sql, errors=validation.errors)
+
+    async def ask(self, question: str, model_name: str = None, persona: str = None,
+                  use_cache: bool = True, timeout: float = None):
+        """
+        generate() then execute(). Returns (generation dict, DataFrame or status string).
+        SQL that runs is stored as a few-shot example for similar questions.
+        """
+        few_shot_store.record_question()
+        generated = await self.generate(question, model_name, persona, use_cache)
+        generated["sql"], outcome = await self.execute(generated["sql"], use_cache, timeout, validate=False)
+        if not isinstance(outcome, str):
+            few_shot_store.add(generated["schema_fingerprint"], question, generated["sql"])
+            few_shot_store.record_success(2 if generated["repaired"] else 1)
+        return generated, outcome
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3) if seconds is not None else None
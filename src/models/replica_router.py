@@ -0,0 +1,282 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, text
+
+from src.models import telemetry
+from src.models.engine_registry import engine_registry
+from src.models.utils import env_bool, env_float, env_int
+
+ROUND_ROBIN = "round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+
+# Weight of the newest sample in the per-endpoint latency average
+_EWMA_ALPHA = 0.2
+
+
+class Endpoint:
+    """
+    One database server behind the router, with its health and live counters.
+    Counters are fed by pool events, so every checkout is seen, including
+    streamed reads that hold their connection across reruns.
+    """
+
+    def __init__(self, name: str, role: str, engine):
+        self.name = name
+        self.role = role
+        self.engine = engine
+        self.url = engine.url.render_as_string(hide_password=True)
+
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.last_error = None
+        self.last_check = None
+        self.lag_seconds = None
+
+        self.requests = 0
+        self.errors = 0
+        self.outstanding = 0
+        self.latency_ewma = None
+        self._checkout_times = {}
+        self._lock = threading.Lock()
+        self._listen()
+
+    def _listen(self):
+        def on_checkout(dbapi_conn, record, proxy):
+            with self._lock:
+                self.requests += 1
+                self.outstanding += 1
+                self._checkout_times[id(record)] = time.perf_counter()
+            telemetry.metrics.inc("askdb_endpoint_requests_total", help="Connections checked out per endpoint",
+                                  endpoint=self.name, role=self.role)
+
+        def on_checkin(dbapi_conn, record):
+            with self._lock:
+                started = self._checkout_times.pop(id(record), None)
+                if started is None:
+                    return
+                self.outstanding = max(0, self.outstanding - 1)
+                held = time.perf_counter() - started
+                self.latency_ewma = held if self.latency_ewma is None else (
+                    _EWMA_ALPHA * held + (1 - _EWMA_ALPHA) * self.latency_ewma)
+            telemetry.metrics.observe("askdb_endpoint_latency_seconds", held,
+                                      help="Connection hold time (query latency) per endpoint",
+                                      endpoint=self.name, role=self.role)
+
+        def on_error(context):
+            self.record_error(context.original_exception, disconnect=context.is_disconnect)
+
+        self._listeners = [("checkout", on_checkout), ("checkin", on_checkin), ("handle_error", on_error)]
+        for name, fn in self._listeners:
+            event.listen(self.engine, name, fn)
+
+    def close(self):
+        """
+        Detaches the pool listeners; the engine itself stays with the registry.
+        """
+        for name, fn in self._listeners:
+            if event.contains(self.engine, name, fn):
+                event.remove(self.engine, name, fn)
+        self._listeners = []
+
+    def record_error(self, error, disconnect: bool = False):
+        with self._lock:
+            self.errors += 1
+            self.last_error = str(error).splitlines()[0] if str(error) else type(error).__name__
+            if disconnect:
+                self.consecutive_failures += 1
+        telemetry.metrics.inc("askdb_endpoint_errors_total", help="Database errors per endpoint",
+                              endpoint=self.name, role=self.role)
+
+    def mark_down(self, error):
+        with self._lock:
+            self.healthy = False
+            self.consecutive_failures += 1
+            self.last_error = str(error).splitlines()[0] if str(error) else type(error).__name__
+
+    def mark_up(self, lag_seconds: float = None):
+        with self._lock:
+            self.healthy = True
+            self.consecutive_failures = 0
+            self.lag_seconds = lag_seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "endpoint": self.name,
+                "role": self.role,
+                "url": self.url,
+                "healthy": self.healthy,
+                "requests": self.requests,
+                "errors": self.errors,
+                "outstanding": self.outstanding,
+                "latency_ms": round(self.latency_ewma * 1000, 3) if self.latency_ewma is not None else None,
+                "lag_seconds": self.lag_seconds,
+                "last_error": self.last_error,
+            }
+
+
+class ReplicaRouter:
+    """
+    Sends writes to the primary and spreads reads over healthy replicas.
+
+    Replicas are picked round-robin or by fewest outstanding connections
+    (ties broken by latency). A replica that cannot be reached, or that
+    fails `failure_threshold` times in a row, is taken out of rotation
+    until a background health check (SELECT 1, plus replication lag where
+    the server reports it) succeeds again. Reads fall back to the next
+    replica and finally to the primary.
+    """
+
+    def __init__(self, primary_engine, replica_engines: list, strategy: str = None,
+                 health_interval: float = None, failure_threshold: int = None,
+                 max_lag: float = None, fallback_to_primary: bool = None):
+        self.primary = Endpoint("primary", "primary", primary_engine)
+        self.replicas = [Endpoint(f"replica-{i}", "replica", engine) for i, engine in enumerate(replica_engines, 1)]
+        self.strategy = strategy or os.getenv("ASKDB_REPLICA_STRATEGY", ROUND_ROBIN)
+        self.health_interval = health_interval if health_interval is not None else env_float("ASKDB_REPLICA_HEALTH_INTERVAL", 10.0)
+        self.failure_threshold = failure_threshold or env_int("ASKDB_REPLICA_FAILURE_THRESHOLD", 3)
+        self.max_lag = max_lag if max_lag is not None else env_float("ASKDB_REPLICA_MAX_LAG", 30.0)
+        self.fallback_to_primary = (fallback_to_primary if fallback_to_primary is not None
+                                    else env_bool("ASKDB_REPLICA_FALLBACK_PRIMARY", True))
+
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._thread = None
+        if self.replicas and self.health_interval > 0:
+            self._thread = threading.Thread(target=self._health_loop, name="askdb-replica-health", daemon=True)
+            self._thread.start()
+
+    @property
+    def endpoints(self) -> list:
+        return [self.primary] + self.replicas
+
+    def candidates(self, read: bool) -> list:
+        """
+        Endpoints to try in order: the balanced pick first, then the other
+        healthy replicas, then the primary.
+        """
+        if not read or not self.replicas:
+            return [self.primary]
+        healthy = [r for r in self.replicas if r.healthy and r.consecutive_failures < self.failure_threshold]
+        if healthy:
+            if self.strategy == LEAST_OUTSTANDING:
+                healthy.sort(key=lambda r: (r.outstanding, r.latency_ewma or 0.0))
+            else:
+                start = next(self._counter) % len(healthy)
+                healthy = healthy[start:] + healthy[:start]
+        if self.fallback_to_primary or not healthy:
+            healthy.append(self.primary)
+        return healthy
+
+    def connect(self, read: bool = False):
+        """
+        Returns (connection, endpoint), failing over past endpoints that
+        cannot be reached. Raises the last error when none can.
+        """
+        last_error = None
+        for endpoint in self.candidates(read):
+            try:
+                return endpoint.engine.connect(), endpoint
+            except Exception as e:
+                last_error = e
+                if endpoint.role == "replica":
+                    endpoint.mark_down(e)
+                    telemetry.metrics.inc("askdb_endpoint_failovers_total", help="Reads moved off an unreachable replica",
+                                          endpoint=endpoint.name)
+        raise last_error
+
+    def check_health(self):
+        for endpoint in self.replicas:
+            try:
+                with endpoint.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                    lag = _replication_lag(conn)
+            except Exception as e:
+                endpoint.mark_down(e)
+                continue
+            finally:
+                endpoint.last_check = time.time()
+            if lag is not None and self.max_lag and lag > self.max_lag:
+                endpoint.mark_down(f"Replication lag {lag:.0f}s exceeds {self.max_lag:.0f}s")
+                endpoint.lag_seconds = lag
+            else:
+                endpoint.mark_up(lag)
+
+    def stats(self) -> list:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    def close(self):
+        """
+        Stops the health thread and detaches every endpoint's listeners.
+        """
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        for endpoint in self.endpoints:
+            endpoint.close()
+
+    def _health_loop(self):
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception:
+                continue
+
+
+def _replication_lag(conn):
+    """
+    Seconds the replica is behind, or None when the server does not say.
+    """
+    dialect = conn.engine.dialect.name
+    try:
+        if dialect == "postgresql":
+            return conn.execute(text(
+                "SELECT CASE WHEN pg_is_in_recovery() "
+                "THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+            )).scalar()
+        if dialect in ("mysql", "mariadb"):
+            for statement, column in (("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+                                      ("SHOW SLAVE STATUS", "Seconds_Behind_Master")):
+                try:
+                    row = conn.execute(text(statement)).mappings().first()
+                except Exception:
+                    continue
+                return row.get(column) if row else None
+    except Exception:
+        return None
+    return None
+
+
+_routers = OrderedDict()
+_routers_lock = threading.Lock()
+
+
+def get_router(primary_engine, replicas: list) -> ReplicaRouter:
+    """
+    Returns the shared router for a primary engine and its replicas,
+    given as (url, connect_args) pairs, so health and counters survive reruns.
+    At most ASKDB_MAX_ROUTERS routers are kept; the least recently used one
+    is closed when that bound is exceeded.
+    """
+    key = (primary_engine.url.render_as_string(hide_password=False), tuple(url for url, _ in replicas))
+    evicted = []
+    with _routers_lock:
+        router = _routers.get(key)
+        if router is not None:
+            _routers.move_to_end(key)
+        else:
+            engines = [engine_registry.get_engine(url, connect_args) for url, connect_args in replicas]
+            router = _routers[key] = ReplicaRouter(primary_engine, engines)
+            while len(_routers) > env_int("ASKDB_MAX_ROUTERS", engine_registry.max_engines):
+                evicted.append(_routers.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+    return router
+
+
+def replica_urls_from_env() -> list:
+    return [url.strip() for url in os.getenv("ASKDB_REPLICA_URLS", "").split(",") if url.strip()]
@@ -0,0 +1,325 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from src.models.utils import env_int
+
+_TOKEN = re.compile(r"""
+    (?P<ws>\s+)
+  | (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.|'')*')
+  | (?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<op><>|!=|<=|>=|\|\||::|.)
+""", re.X | re.S)
+
+# Lowercased in the key; other identifiers keep their case, since table
+# names are case-sensitive on some servers
+_KEYWORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "is", "null", "like", "ilike", "between",
+    "group", "by", "order", "having", "limit", "offset", "join", "inner", "left", "right", "full",
+    "outer", "cross", "natural", "on", "using", "as", "distinct", "union", "all", "intersect",
+    "except", "case", "when", "then", "else", "end", "asc", "desc", "with", "recursive", "exists",
+    "true", "false", "count", "sum", "avg", "min", "max", "cast", "over", "partition", "any",
+    "some", "interval", "fetch", "first", "next", "rows", "only", "nulls", "last", "show",
+    "describe", "tables", "coalesce", "lower", "upper", "round", "date",
+}
+
+# Anything that can change data or lock rows is never cached
+_WRITE_WORDS = {"insert", "update", "delete", "merge", "create", "drop", "alter",
+                "truncate", "grant", "revoke", "call", "lock", "into"}
+
+# Results depending on these change between runs even when the data doesn't
+_VOLATILE_WORDS = {"now", "rand", "random", "uuid", "uuid_generate_v4", "gen_random_uuid", "newid",
+                   "current_timestamp", "current_date", "current_time", "localtime", "localtimestamp",
+                   "sysdate", "curdate", "curtime", "utc_timestamp", "utc_date", "getdate", "sleep",
+                   "pg_sleep", "nextval", "last_insert_id", "connection_id", "pg_backend_pid"}
+
+_TABLE_INTRODUCERS = {"from", "join", "update", "into", "table"}
+
+
+def _tokens(sql: str) -> list:
+    """
+    Splits sql into (kind, text) tokens, dropping whitespace and comments.
+    """
+    tokens = []
+    for match in _TOKEN.finditer(sql):
+        kind = match.lastgroup
+        if kind not in ("ws", "comment"):
+            tokens.append((kind, match.group()))
+    return tokens
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical form of sql for cache keys: comments dropped, whitespace
+    collapsed, keywords lowercased, integer literals and `!=` canonicalized,
+    trailing semicolons removed. Literal values themselves are kept, since
+    they change the result.
+    """
+    parts = []
+    for kind, text in _tokens(sql):
+        if kind == "word" and text.lower() in _KEYWORDS:
+            text = text.lower()
+        elif kind == "number" and text.isdigit():
+            text = str(int(text))
+        elif kind == "number":
+            text = text.lower()
+        elif text == "!=":
+            text = "<>"
+        parts.append(text)
+    while parts and parts[-1] == ";":
+        parts.pop()
+    return " ".join(parts)
+
+
+def referenced_tables(sql: str) -> set:
+    """
+    Lowercased, unqualified names of the tables sql reads or writes
+    (best effort: FROM/JOIN targets and comma-separated FROM lists).
+    """
+    tables = set()
+    tokens = _tokens(sql)
+    i = 0
+    while i < len(tokens):
+        kind, text = tokens[i]
+        i += 1
+        if kind != "word" or text.lower() not in _TABLE_INTRODUCERS:
+            continue
+        while i < len(tokens):
+            name, i = _read_name(tokens, i)
+            if name is None:
+                break
+            tables.add(name)
+            # Skip an alias, then continue through "a, b, c" lists
+            if i < len(tokens) and tokens[i][0] == "word" and tokens[i][1].lower() == "as":
+                i += 1
+            if i < len(tokens) and tokens[i][0] in ("word", "quoted") and tokens[i][1].lower() not in _KEYWORDS:
+                i += 1
+            if i < len(tokens) and tokens[i][1] == ",":
+                i += 1
+                continue
+            break
+    return tables
+
+
+def _read_name(tokens: list, i: int):
+    """
+    Reads a possibly qualified identifier (schema.table) starting at i.
+    """
+    name = None
+    while i < len(tokens) and tokens[i][0] in ("word", "quoted"):
+        text = tokens[i][1]
+        if tokens[i][0] == "word" and text.lower() in _KEYWORDS:
+            break
+        name = text.strip('"`[]').lower()
+        i += 1
+        if i < len(tokens) and tokens[i][1] == ".":
+            i += 1
+            continue
+        break
+    return name, i
+
+
+def is_cacheable(sql: str) -> bool:
+    """
+    True for single read-only statements whose results only depend on the data.
+    """
+    tokens = _tokens(sql)
+    if not tokens or tokens[0][0] != "word" or tokens[0][1].lower() not in ("select", "with", "show", "describe"):
+        return False
+    if any(text == ";" for _, text in tokens[:-1]):
+        return False
+    words = [text.lower() for kind, text in tokens if kind == "word"]
+    if _WRITE_WORDS.intersection(words) or _VOLATILE_WORDS.intersection(words):
+        return False
+    # SELECT ... FOR UPDATE / FOR SHARE takes row locks
+    return not any(a == "for" and b in ("update", "share") for a, b in zip(words, words[1:]))
+
+
+def _parse_table_ttls(value: str) -> dict:
+    """
+    Parses "orders=30,events=0" into {"orders": 30, "events": 0}.
+    """
+    ttls = {}
+    for item in (value or "").split(","):
+        name, _, seconds = item.partition("=")
+        if name.strip() and seconds.strip():
+            try:
+                ttls[name.strip().lower()] = int(seconds)
+            except ValueError:
+                continue
+    return ttls
+
+
+class ResultCache:
+    """
+    In-memory LRU cache of read-only query results, keyed by connection
+    identity plus normalized SQL.
+
+    Results are stored as Arrow tables (columnar, far smaller than object
+    DataFrames) and the budget is enforced on their real buffer sizes.
+    Entries expire after `ttl` seconds, or sooner for tables listed in
+    `table_ttls` (0 disables caching for that table), and are dropped when
+    a write touches one of their tables.
+    """
+
+    def __init__(self, max_bytes: int = None, ttl: int = None, max_entry_bytes: int = None,
+                 table_ttls: dict = None):
+        self.max_bytes = max_bytes if max_bytes is not None else env_int("ASKDB_RESULT_CACHE_BYTES", 256 * 1024 * 1024)
+        self.ttl = ttl if ttl is not None else env_int("ASKDB_RESULT_CACHE_TTL", 300)
+        self.max_entry_bytes = max_entry_bytes or env_int("ASKDB_RESULT_CACHE_MAX_ENTRY_BYTES", self.max_bytes // 4)
+        self.table_ttls = table_ttls if table_ttls is not None else _parse_table_ttls(os.getenv("ASKDB_RESULT_CACHE_TABLE_TTLS"))
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_used = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 and self.ttl > 0
+
+    @staticmethod
+    def make_key(identity: str, sql: str) -> str:
+        raw = f"{identity}\x00{normalize_sql(sql)}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, identity: str, sql: str):
+        """
+        Returns a fresh DataFrame copy of the cached result, or None.
+        Hits carry attrs["cache_hit"] and attrs["cache_age"] (seconds).
+        """
+        if not self.enabled or not is_cacheable(sql):
+            return None
+        key = self.make_key(identity, sql)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now >= entry["expires_at"]:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        df = entry["table"].to_pandas()
+        df.attrs.update(entry["attrs"])
+        df.attrs["cache_hit"] = True
+        df.attrs["cache_age"] = now - entry["created_at"]
+        return df
+
+    def contains(self, identity: str, sql: str) -> bool:
+        """
+        True when a fresh entry exists, without counting a lookup.
+        """
+        if not self.enabled or not is_cacheable(sql):
+            return False
+        with self._lock:
+            entry = self._entries.get(self.make_key(identity, sql))
+            return entry is not None and time.time() < entry["expires_at"]
+
+    def put(self, identity: str, sql: str, df) -> bool:
+        """
+        Stores a result; returns False when it is not cacheable or too large.
+        """
+        if not self.enabled or not is_cacheable(sql):
+            return False
+        tables = referenced_tables(sql)
+        ttl = min([self.ttl] + [self.table_ttls[t] for t in tables if t in self.table_ttls])
+        if ttl <= 0:
+            return False
+
+        import pyarrow as pa
+
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowException, TypeError, ValueError):
+            # Mixed-type object columns have no Arrow type; skip rather than guess
+            return False
+        size = table.nbytes
+        if size > self.max_entry_bytes:
+            return False
+
+        now = time.time()
+        key = self.make_key(identity, sql)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = {
+                "identity": identity,
+                "tables": tables,
+                "table": table,
+                "attrs": {k: v for k, v in df.attrs.items() if k not in ("cache_hit", "cache_age")},
+                "size": size,
+                "frame_bytes": int(df.memory_usage(deep=True).sum()),
+                "created_at": now,
+                "expires_at": now + ttl,
+            }
+            self.bytes_used += size
+            while self.bytes_used > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return True
+
+    def invalidate_tables(self, identity: str, tables) -> int:
+        """
+        Drops entries for identity that read any of tables (or whose tables
+        could not be determined). Returns the number of entries dropped.
+        """
+        tables = {t.lower() for t in tables}
+        with self._lock:
+            stale = [
+                key for key, entry in self._entries.items()
+                if entry["identity"] == identity and (not entry["tables"] or entry["tables"] & tables)
+            ]
+            for key in stale:
+                self._drop(key)
+        return len(stale)
+
+    def invalidate_for_write(self, identity: str, sql: str) -> int:
+        """
+        Invalidation hint for a statement that changed data: drops entries on
+        the tables it touched, or every entry for identity if those are unknown.
+        """
+        tables = referenced_tables(sql)
+        if tables:
+            return self.invalidate_tables(identity, tables)
+        return self.clear(identity)
+
+    def clear(self, identity: str = None) -> int:
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if identity is None or entry["identity"] == identity]
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            frame_bytes = sum(entry["frame_bytes"] for entry in self._entries.values())
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes_used,
+                "frame_bytes": frame_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        self.bytes_used -= entry["size"]
+
+
+result_cache = ResultCache()
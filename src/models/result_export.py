@@ -0,0 +1,165 @@
+import csv
+import os
+import tempfile
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.models import telemetry
+from src.models.utils import env_int
+
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+
+class CsvBatchWriter:
+    """
+    Appends row batches to a CSV file; only the current batch is in memory.
+    """
+
+    def __init__(self, path: str, columns: list):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write(self, rows: list):
+        self._writer.writerows(rows)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetBatchWriter:
+    """
+    Appends row batches to a Parquet file, one row group per batch. The
+    schema comes from the first batch; columns that are all NULL or mix
+    types there are written as strings.
+    """
+
+    def __init__(self, path: str, columns: list):
+        self.path = path
+        self.columns = columns
+        self.schema = None
+        self._writer = None
+
+    def write(self, rows: list):
+        if self.schema is None:
+            self.schema = pa.schema([
+                pa.field(name, _infer_type([row[i] for row in rows])) for i, name in enumerate(self.columns)
+            ])
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        arrays = [_to_array([row[i] for row in rows], field.type) for i, field in enumerate(self.schema)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def tell(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def close(self):
+        if self._writer is None:
+            # Empty results still produce a valid file with the column names
+            self.schema = pa.schema([pa.field(name, pa.string()) for name in self.columns])
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        self._writer.close()
+
+
+def _infer_type(values: list):
+    try:
+        inferred = pa.array(values).type
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        return pa.string()
+    return pa.string() if pa.types.is_null(inferred) else inferred
+
+
+def _to_array(values: list, type_):
+    try:
+        return pa.array(values, type=type_)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        if pa.types.is_string(type_):
+            return pa.array([None if v is None else str(v) for v in values], type=pa.string())
+        raise
+
+
+_WRITERS = {"csv": CsvBatchWriter, "parquet": ParquetBatchWriter}
+
+
+class ExportProgress:
+    """
+    Running totals for one export; `bytes` is the size written to disk so far.
+    """
+
+    def __init__(self, fmt: str, path: str):
+        self.format = fmt
+        self.path = path
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.done = False
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "format": self.format,
+            "path": self.path,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "bytes_per_second": round(self.bytes_per_second, 1),
+        }
+
+
+def export_batches(columns: list, batches, fmt: str, path: str):
+    """
+    Writes row batches to path as fmt, yielding an ExportProgress after each
+    batch (the last one has done=True). Memory use is bounded by one batch.
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    progress = ExportProgress(fmt, path)
+    writer = _WRITERS[fmt](path, columns)
+    with telemetry.span("export", format=fmt) as span:
+        try:
+            for rows in batches:
+                writer.write(rows)
+                progress.rows += len(rows)
+                progress.bytes = writer.tell()
+                progress.seconds = time.perf_counter() - progress.started
+                yield progress
+        finally:
+            writer.close()
+            progress.bytes = os.path.getsize(path)
+            progress.seconds = time.perf_counter() - progress.started
+            span.set(rows=progress.rows, bytes=progress.bytes)
+        telemetry.metrics.inc("askdb_export_rows_total", progress.rows, help="Rows written by exports", format=fmt)
+        telemetry.metrics.inc("askdb_export_bytes_total", progress.bytes, help="Bytes written by exports", format=fmt)
+    progress.done = True
+    yield progress
+
+
+def export_path(fmt: str) -> str:
+    """
+    A fresh file under ASKDB_EXPORT_DIR (the system temp dir by default).
+    """
+    directory = os.getenv("ASKDB_EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "askdb_exports")
+    os.makedirs(directory, exist_ok=True)
+    handle, path = tempfile.mkstemp(prefix="export-", suffix=FORMATS[fmt][1], dir=directory)
+    os.close(handle)
+    return path
+
+
+def batch_rows() -> int:
+    return env_int("ASKDB_EXPORT_BATCH_ROWS", 10000)
@@ -0,0 +1,314 @@
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+from sqlalchemy import text
+
+from src.models import telemetry
+from src.models.frame_compaction import compact_frame, compaction_enabled
+from src.models.query_errors import QueryStatus, classify_failure
+from src.models.utils import env_float, env_int
+
+
+class QueryStream:
+    """
+    Fetches a read-only query incrementally through a server-side cursor
+    (SSCursor on PyMySQL, a named cursor on psycopg2), one bounded chunk at a
+    time. Fetching stops early once `max_rows` or `max_bytes` is reached, in
+    which case `truncated` is set. The connection is released as soon as the
+    result is exhausted, truncated, or close() is called. `on_complete`
+    receives the full frame once every row has been fetched. With `compact`
+    (ASKDB_COMPACT_RESULTS), the combined frame uses compact dtypes.
+    `deadline` is the executor's SQLite statement deadline, restarted before
+    each fetch.
+
+    A parked stream (see park()) may be suspended between fetches, giving
+    its connection back; `reopen` then returns a fresh connection, the
+    query runs again and the rows already fetched are skipped.
+    """
+
+    def __init__(self, conn, sql: str, chunk_size: int, max_rows: int, max_bytes: int,
+                 discard_unread: bool = False, on_complete=None, compact: bool = None, deadline=None,
+                 reopen=None):
+        self.sql = sql
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        # Unbuffered MySQL cursors drain every remaining row on close, so
+        # abandoned results drop the connection instead
+        self.discard_unread = discard_unread
+        self.on_complete = on_complete
+        self.compact = compact if compact is not None else compaction_enabled()
+        self.deadline = deadline
+        self.reopen = reopen
+
+        self.rows_fetched = 0
+        self.bytes_fetched = 0
+        self.truncated = False
+        self.exhausted = False
+        self.error = None
+
+        self._chunks = []
+        self._frame = None
+        self._peeked = None
+        self._conn = None
+        self._result = None
+        self._parked = False
+        self._lock = threading.RLock()
+        self.last_used = time.monotonic()
+        try:
+            self._open(conn)
+            self.columns = list(self._result.keys())
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def done(self) -> bool:
+        return self.exhausted or self.truncated or self.error is not None
+
+    @property
+    def suspended(self) -> bool:
+        return self._conn is None and not self.done
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        All rows fetched so far as one DataFrame.
+        """
+        if self._frame is None:
+            if self._chunks:
+                frame = pd.concat(self._chunks, ignore_index=True) if len(self._chunks) > 1 else self._chunks[0]
+            else:
+                frame = pd.DataFrame(columns=self.columns)
+            if self.compact and len(frame):
+                frame = compact_frame(frame)
+                # Measured per chunk as fetched, before any compaction
+                frame.attrs["memory_before"] = self.bytes_fetched
+            # Keep a single copy; later chunks are appended to the combined frame
+            self._chunks = [frame] if self._chunks else []
+            self._frame = frame
+            self._frame.attrs.update(self.summary())
+        return self._frame
+
+    def fetch_next(self):
+        """
+        Fetches the next chunk and returns it as a DataFrame, or None when done.
+        """
+        with self._lock:
+            chunk = self._fetch_chunk()
+            self.last_used = time.monotonic()
+            still_parked = self._parked and not self.done
+        # Outside the lock: adding may suspend other streams, which takes theirs
+        if still_parked:
+            parked_streams.add(self)
+        return chunk
+
+    def _fetch_chunk(self):
+        if self.done:
+            return None
+
+        size = min(self.chunk_size, self.max_rows - self.rows_fetched)
+        if self.deadline is not None:
+            self.deadline.start()
+        try:
+            if self._conn is None:
+                self._resume()
+            rows = self._fetch(size)
+            full = len(rows) == size and self.rows_fetched + size < self.max_rows
+            # Peek one row past a full chunk, so a result that ends exactly on a
+            # chunk boundary is done now rather than after one more, empty fetch
+            self._peeked = self._result.fetchone() if full else None
+        except Exception as e:
+            timed_out = self.deadline is not None and self.deadline.expired
+            self.error = classify_failure(e, QueryStatus.TIMEOUT if timed_out else None)
+            self.close()
+            return None
+
+        if not rows:
+            self._complete()
+            return None
+
+        chunk = pd.DataFrame.from_records(rows, columns=self.columns, coerce_float=True)
+        self._chunks.append(chunk)
+        self._frame = None
+        chunk_bytes = int(chunk.memory_usage(deep=True).sum())
+        self.rows_fetched += len(chunk)
+        self.bytes_fetched += chunk_bytes
+        telemetry.count_fetched(len(chunk), chunk_bytes)
+
+        if len(rows) < size or (full and self._peeked is None):
+            self._complete()
+        elif self.rows_fetched >= self.max_rows or self.bytes_fetched >= self.max_bytes:
+            # Only flag truncation if there really is more data behind the cap
+            self.truncated = self._peeked is not None or self._has_more_rows()
+            self.exhausted = not self.truncated
+            self.close()
+
+        return chunk
+
+    def iter_chunks(self):
+        """
+        Yields chunks until the result is exhausted or a cap is hit.
+        """
+        while True:
+            chunk = self.fetch_next()
+            if chunk is None:
+                return
+            yield chunk
+
+    def fetch_all(self) -> pd.DataFrame:
+        for _ in self.iter_chunks():
+            pass
+        return self.frame
+
+    def summary(self) -> dict:
+        return {
+            "rows": self.rows_fetched,
+            "bytes": self.bytes_fetched,
+            "truncated": self.truncated,
+            "exhausted": self.exhausted,
+        }
+
+    def park(self):
+        """
+        Marks the stream as left open between reruns, so an idle one can be
+        suspended (see parked_streams). Streams that cannot reopen stay open.
+        """
+        if self.reopen is not None and not self.done:
+            self._parked = True
+            parked_streams.add(self)
+
+    def suspend(self):
+        """
+        Gives the connection back to the pool; the next fetch reopens the query.
+        """
+        with self._lock:
+            if self.done or self._conn is None:
+                return
+            # A peeked row is fetched again after the skip
+            self._peeked = None
+            self.close()
+
+    def close(self):
+        parked_streams.discard(self)
+        if self._conn is None:
+            return
+        if self.discard_unread and not self.exhausted:
+            self._conn.invalidate()
+        elif self._result is not None:
+            try:
+                self._result.close()
+            except Exception:
+                pass
+        self._conn.close()
+        self._conn = None
+
+    def _open(self, conn):
+        # SHOW/DESCRIBE cannot run inside a server-side (DECLARE) cursor on every backend
+        server_side = self.sql.lstrip().lower().startswith(("select", "with"))
+        self._conn = conn.execution_options(stream_results=server_side, yield_per=self.chunk_size)
+        self._result = self._conn.execute(text(self.sql))
+
+    def _resume(self):
+        """
+        Runs the query again on a fresh connection and skips the rows already
+        fetched. Without an ORDER BY the server may return them in another order.
+        """
+        with telemetry.span("db.resume", skip_rows=self.rows_fetched):
+            conn = self.reopen()
+            self.deadline = conn.info.get("askdb_deadline")
+            if self.deadline is not None:
+                self.deadline.start()
+            self._open(conn)
+            remaining = self.rows_fetched
+            while remaining > 0:
+                skipped = len(self._result.fetchmany(min(remaining, self.chunk_size)))
+                if not skipped:
+                    break
+                remaining -= skipped
+
+    def _fetch(self, size: int) -> list:
+        if self._peeked is None:
+            return self._result.fetchmany(size)
+        rows = [self._peeked] + (self._result.fetchmany(size - 1) if size > 1 else [])
+        self._peeked = None
+        return rows
+
+    def _complete(self):
+        self.exhausted = True
+        self.close()
+        if self.on_complete is not None:
+            self.on_complete(self.frame)
+
+    def _has_more_rows(self) -> bool:
+        try:
+            return self._result.fetchone() is not None
+        except Exception:
+            return False
+
+
+class ParkedStreams:
+    """
+    Streams the app keeps open between reruns so results can page in. Each
+    holds a pooled connection, its transaction and a server-side cursor, so
+    streams idle for `idle_ttl` seconds, and the least recently used beyond
+    `max_open`, are suspended until their next fetch.
+    """
+
+    def __init__(self, idle_ttl: float = None, max_open: int = None):
+        self.idle_ttl = idle_ttl if idle_ttl is not None else env_float("ASKDB_STREAM_IDLE_TTL", 120.0)
+        self.max_open = max_open or env_int("ASKDB_MAX_OPEN_STREAMS", 4)
+        self.suspensions = 0
+
+        self._streams = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, stream: QueryStream):
+        with self._lock:
+            self._streams[id(stream)] = stream
+            self._streams.move_to_end(id(stream))
+            overflow = [self._streams.popitem(last=False)[1] for _ in range(len(self._streams) - self.max_open)]
+            if self._thread is None and self.idle_ttl > 0:
+                self._thread = threading.Thread(target=self._reap_loop, name="askdb-stream-reaper", daemon=True)
+                self._thread.start()
+        self._suspend(overflow)
+
+    def discard(self, stream: QueryStream):
+        with self._lock:
+            self._streams.pop(id(stream), None)
+
+    def reap(self):
+        """
+        Suspends the streams that have not fetched for `idle_ttl` seconds.
+        """
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [key for key, stream in self._streams.items() if stream.last_used <= cutoff]
+            idle = [self._streams.pop(key) for key in idle]
+        self._suspend(idle)
+
+    def __len__(self):
+        return len(self._streams)
+
+    def _suspend(self, streams: list):
+        for stream in streams:
+            try:
+                stream.suspend()
+            except Exception:
+                continue
+            self.suspensions += 1
+
+    def _reap_loop(self):
+        interval = min(max(self.idle_ttl / 4, 1.0), 30.0)
+        while True:
+            time.sleep(interval)
+            try:
+                self.reap()
+            except Exception:
+                continue
+
+
+parked_streams = ParkedStreams()
@@ -0,0 +1,161 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+from src.models.utils import parse_column, schema_fingerprint
+
+_INDEX_CACHE_SIZE = 8
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+_SEARCH_CACHE_SIZE = 32
+
+
+class _NameIndex:
+    """
+    Sorted lowercase names for prefix lookups (bisect) plus one joined string
+    for substring lookups, so a search is a handful of C-level str.find calls
+    instead of a Python loop over every name.
+    """
+
+    def __init__(self, names):
+        self.names = sorted({name.lower() for name in names})
+        self.text = "\n".join(self.names)
+        self.starts = []
+        offset = 0
+        for name in self.names:
+            self.starts.append(offset)
+            offset += len(name) + 1
+
+    def prefixed(self, prefix: str) -> list:
+        i = bisect.bisect_left(self.names, prefix)
+        matches = []
+        while i < len(self.names) and self.names[i].startswith(prefix):
+            matches.append(self.names[i])
+            i += 1
+        return matches
+
+    def containing(self, part: str) -> list:
+        matches = []
+        position = self.text.find(part)
+        while position != -1:
+            i = bisect.bisect_right(self.starts, position) - 1
+            matches.append(self.names[i])
+            # Continue after this name so each name is reported once
+            position = self.text.find(part, self.starts[i] + len(self.names[i]) + 1)
+        return matches
+
+
+class SchemaBrowserIndex:
+    """
+    Name search over a schema's tables and columns for the sidebar browser.
+    Built once per schema; searches are cached, so paging through results
+    and reruns with the same query cost nothing.
+    """
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+        self.tables = list(schema)
+        self._tables_by_name = {}
+        self._tables_by_column = {}
+        for table, columns in schema.items():
+            self._tables_by_name.setdefault(table.lower(), []).append(table)
+            for entry in columns:
+                name = parse_column(entry)["name"]
+                self._tables_by_column.setdefault(name.lower(), []).append((table, name))
+        self._table_names = _NameIndex(self._tables_by_name)
+        self._column_names = _NameIndex(self._tables_by_column)
+        self._searches = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def table_count(self) -> int:
+        return len(self.tables)
+
+    def search(self, query: str):
+        """
+        Returns (tables, matched columns by table) for query. Table-name
+        matches come first (exact, then prefix, then substring), followed by
+        tables that only match through a column. "orders.amount" searches
+        columns of matching tables. An empty query lists every table.
+        """
+        query = (query or "").strip().lower()
+        if not query:
+            return self.tables, {}
+        with self._lock:
+            cached = self._searches.get(query)
+            if cached is not None:
+                self._searches.move_to_end(query)
+                return cached
+
+        if "." in query:
+            result = self._qualified(*query.split(".", 1))
+        else:
+            result = self._search(query)
+
+        with self._lock:
+            self._searches[query] = result
+            while len(self._searches) > _SEARCH_CACHE_SIZE:
+                self._searches.popitem(last=False)
+        return result
+
+    def _search(self, query: str):
+        ordered = OrderedDict()
+        for names in (self._table_names.prefixed(query), self._table_names.containing(query)):
+            for name in sorted(names, key=lambda n: (n != query, n)):
+                for table in self._tables_by_name[name]:
+                    ordered.setdefault(table, [])
+
+        matched = {}
+        for names in (self._column_names.prefixed(query), self._column_names.containing(query)):
+            for name in sorted(names, key=lambda n: (n != query, n)):
+                for table, column in self._tables_by_column[name]:
+                    ordered.setdefault(table, [])
+                    if column not in matched.setdefault(table, []):
+                        matched[table].append(column)
+        return list(ordered), matched
+
+    def _qualified(self, table_part: str, column_part: str):
+        tables = set()
+        for name in self._table_names.containing(table_part):
+            tables.update(self._tables_by_name[name])
+        if not column_part:
+            return [t for t in self.tables if t in tables], {}
+
+        matched = {}
+        for name in self._column_names.containing(column_part):
+            for table, column in self._tables_by_column[name]:
+                if table in tables:
+                    matched.setdefault(table, []).append(column)
+        return [t for t in self.tables if t in matched], matched
+
+    def columns(self, table: str) -> list:
+        return self.schema.get(table, [])
+
+
+def get_browser_index(schema: dict) -> SchemaBrowserIndex:
+    """
+    Returns the browser index for schema. The schema cache hands back the
+    same dict on every rerun, so that is checked before hashing the content.
+    """
+    with _indexes_lock:
+        for index in _indexes.values():
+            if index.schema is schema:
+                return index
+
+    key = schema_fingerprint(schema)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = SchemaBrowserIndex(schema)
+            while len(_indexes) > _INDEX_CACHE_SIZE:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(key)
+        return index
+
+
+def page_of(items: list, page: int, page_size: int) -> list:
+    """The 1-based page of items."""
+    start = (max(1, page) - 1) * page_size
+    return items[start:start + page_size]
@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+
+from src.models.utils import env_int
+
+
+class SchemaCache:
+    """
+    Two-tier (memory + JSON on disk) cache for reflected schemas.
+
+    Entries are keyed by connection identity and stay valid while the
+    database's catalog fingerprint is unchanged and the entry is younger than
+    `ttl` seconds. Memory hits skip even the fingerprint query for
+    `recheck_interval` seconds, so Streamlit reruns cost nothing.
+    """
+
+    def __init__(self, cache_dir: str = None, ttl: int = None, recheck_interval: int = None):
+        self.cache_dir = cache_dir or os.getenv("ASKDB_CACHE_DIR", ".askdb_cache")
+        self.ttl = ttl or env_int("ASKDB_SCHEMA_TTL", 24 * 3600)
+        self.recheck_interval = recheck_interval if recheck_interval is not None else env_int("ASKDB_SCHEMA_RECHECK", 60)
+
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, fingerprint_fn, loader, refresh: bool = False) -> dict:
+        """
+        Returns the cached schema for key, calling loader() only when the
+        cached copy is missing, stale, or refresh is requested.
+        """
+        now = time.time()
+
+        if not refresh:
+            with self._lock:
+                entry = self._entries.get(key)
+
+            if entry and now - entry["checked_at"] < self.recheck_interval and now - entry["created_at"] < self.ttl:
+                return entry["schema"]
+
+            if entry is None:
+                entry = self._read_disk(key)
+
+            if entry and now - entry["created_at"] < self.ttl:
+                fingerprint = self._safe_fingerprint(fingerprint_fn)
+                # Without a fingerprint the TTL alone decides validity
+                if fingerprint is None or fingerprint == entry["fingerprint"]:
+                    entry["checked_at"] = now
+                    with self._lock:
+                        self._entries[key] = entry
+                    return entry["schema"]
+
+        fingerprint = self._safe_fingerprint(fingerprint_fn)
+        schema = loader()
+        entry = {
+            "schema": schema,
+            "fingerprint": fingerprint,
+            "created_at": now,
+            "checked_at": now,
+        }
+        with self._lock:
+            self._entries[key] = entry
+        self._write_disk(key, entry)
+        return schema
+
+    def invalidate(self, key: str):
+        """
+        Drops the entry from both tiers.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _safe_fingerprint(self, fingerprint_fn):
+        try:
+            return fingerprint_fn()
+        except Exception:
+            return None
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"schema_{key}.json")
+
+    def _read_disk(self, key: str):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, entry: dict):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            pass  # the disk tier is best-effort
+
+
+schema_cache = SchemaCache()
@@ -0,0 +1,169 @@
+import hashlib
+
+from sqlalchemy import inspect, text
+
+from src.models.utils import format_column
+
+# One set-based catalog query per dialect instead of one round trip per table.
+_MYSQL_SCHEMA_SQL = """
+SELECT c.TABLE_NAME, c.COLUMN_NAME, c.COLUMN_TYPE, c.IS_NULLABLE, c.COLUMN_KEY,
+       k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME
+FROM information_schema.COLUMNS c
+JOIN information_schema.TABLES t
+  ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+LEFT JOIN information_schema.KEY_COLUMN_USAGE k
+  ON k.TABLE_SCHEMA = c.TABLE_SCHEMA AND k.TABLE_NAME = c.TABLE_NAME
+ AND k.COLUMN_NAME = c.COLUMN_NAME AND k.REFERENCED_TABLE_NAME IS NOT NULL
+WHERE c.TABLE_SCHEMA = DATABASE() AND t.TABLE_TYPE = 'BASE TABLE'
+ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+"""
+
+_POSTGRES_SCHEMA_SQL = """
+SELECT c.relname, a.attname,
+       pg_catalog.format_type(a.atttypid, a.atttypmod),
+       CASE WHEN a.attnotnull THEN 'NO' ELSE 'YES' END,
+       CASE WHEN pk.conrelid IS NOT NULL THEN 'PRI' ELSE '' END,
+       fk.ref_table, fk.ref_column
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+JOIN pg_catalog.pg_attribute a
+  ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+LEFT JOIN pg_catalog.pg_constraint pk
+  ON pk.conrelid = c.oid AND pk.contype = 'p' AND a.attnum = ANY (pk.conkey)
+LEFT JOIN LATERAL (
+    SELECT rc.relname AS ref_table, ra.attname AS ref_column
+    FROM pg_catalog.pg_constraint fc
+    JOIN pg_catalog.pg_class rc ON rc.oid = fc.confrelid
+    JOIN pg_catalog.pg_attribute ra
+      ON ra.attrelid = fc.confrelid
+     AND ra.attnum = fc.confkey[array_position(fc.conkey, a.attnum)]
+    WHERE fc.conrelid = c.oid AND fc.contype = 'f' AND a.attnum = ANY (fc.conkey)
+    LIMIT 1
+) fk ON true
+WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p')
+ORDER BY c.relname, a.attnum
+"""
+
+_CATALOG_QUERIES = {
+    "mysql": _MYSQL_SCHEMA_SQL,
+    "mariadb": _MYSQL_SCHEMA_SQL,
+    "postgresql": _POSTGRES_SCHEMA_SQL,
+}
+
+
+def reflect_schema(engine) -> dict:
+    """
+    Fetches {table: [column entries]} for the engine's default schema.
+    MySQL and PostgreSQL use a single catalog query; other dialects fall
+    back to SQLAlchemy's Inspector.
+    """
+    catalog_sql = _CATALOG_QUERIES.get(engine.dialect.name)
+    if catalog_sql is None:
+        return _reflect_with_inspector(engine)
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(catalog_sql)).fetchall()
+    return _assemble_schema(rows)
+
+
+def _assemble_schema(rows) -> dict:
+    """
+    Builds the schema dict from catalog rows of
+    (table, column, type, is_nullable, column_key, ref_table, ref_column).
+    """
+    schema = {}
+    seen = set()
+    for table, column, col_type, is_nullable, column_key, ref_table, ref_column in rows:
+        # A column referenced by several foreign keys yields one row per key
+        if (table, column) in seen:
+            continue
+        seen.add((table, column))
+        schema.setdefault(table, []).append(format_column(
+            column,
+            str(col_type).upper(),
+            nullable=str(is_nullable).upper() == "YES",
+            primary_key=column_key == "PRI",
+            ref_table=ref_table,
+            ref_column=ref_column,
+        ))
+    return schema
+
+
+def _reflect_with_inspector(engine) -> dict:
+    """
+    Generic fallback using the Inspector's batched get_multi_* calls.
+    """
+    inspector = inspect(engine)
+    columns_by_table = inspector.get_multi_columns()
+    pks_by_table = inspector.get_multi_pk_constraint()
+    fks_by_table = inspector.get_multi_foreign_keys()
+
+    schema = {}
+    for key in sorted(columns_by_table, key=lambda k: k[1]):
+        table_name = key[1]
+        pk_columns = set((pks_by_table.get(key) or {}).get("constrained_columns") or [])
+
+        references = {}
+        for fk in fks_by_table.get(key) or []:
+            for local, remote in zip(fk["constrained_columns"], fk["referred_columns"]):
+                references.setdefault(local, (fk["referred_table"], remote))
+
+        entries = []
+        for col in columns_by_table[key]:
+            ref_table, ref_column = references.get(col["name"], (None, None))
+            entries.append(format_column(
+                col["name"],
+                col["type"],
+                nullable=col.get("nullable", True),
+                primary_key=col["name"] in pk_columns,
+                ref_table=ref_table,
+                ref_column=ref_column,
+            ))
+        schema[table_name] = entries
+
+    return schema
+
+
+# Cheap queries whose result changes whenever tables or columns change.
+_MYSQL_FINGERPRINT_SQL = """
+SELECT COUNT(*),
+       SUM(CRC32(CONCAT_WS(':', TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY))),
+       (SELECT MAX(CREATE_TIME) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE())
+FROM information_schema.COLUMNS
+WHERE TABLE_SCHEMA = DATABASE()
+"""
+
+_POSTGRES_FINGERPRINT_SQL = """
+SELECT COUNT(*),
+       COALESCE(SUM(c.relfilenode::bigint), 0),
+       COALESCE(SUM(c.xmin::text::bigint), 0),
+       (SELECT COUNT(*) FROM pg_catalog.pg_constraint con
+        JOIN pg_catalog.pg_namespace cn ON cn.oid = con.connamespace
+        WHERE cn.nspname = current_schema())
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p')
+"""
+
+_SQLITE_FINGERPRINT_SQL = "SELECT name, sql FROM sqlite_master WHERE type = 'table' ORDER BY name"
+
+_FINGERPRINT_QUERIES = {
+    "mysql": _MYSQL_FINGERPRINT_SQL,
+    "mariadb": _MYSQL_FINGERPRINT_SQL,
+    "postgresql": _POSTGRES_FINGERPRINT_SQL,
+    "sqlite": _SQLITE_FINGERPRINT_SQL,
+}
+
+
+def catalog_fingerprint(engine):
+    """
+    Returns a short hash that changes when the schema changes, or None when
+    the dialect has no cheap way to tell.
+    """
+    fingerprint_sql = _FINGERPRINT_QUERIES.get(engine.dialect.name)
+    if fingerprint_sql is None:
+        return None
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(fingerprint_sql)).fetchall()
+    return hashlib.sha256(repr([tuple(row) for row in rows]).encode()).hexdigest()[:16]
@@ -1,25 +1,305 @@
-from openai import OpenAI
-from dotenv import load_dotenv
+import asyncio
 import os
+import threading
+import time
+from src.models import telemetry
+from src.models.async_runtime import iterate_sync, run_sync
+from src.models.llm_cache import LLMResponseCache, llm_cache
+from src.models.model_race import (CANCELLED, FAILED, HEDGE, LOST, RACE, REJECTED, SINGLE, WON,
+                                   generation_strategy, hedge_delay, quick_check, race_models, race_stats)
+from src.models.prompts.builder import cache_prompt
+from src.models.utils import estimate_tokens, load_env
 
-load_dotenv()
+# Created by get_async_client() on first use: importing openai is slow, and a
+# missing key should only matter once a model is actually called
+async_client = None
+_client_lock = threading.Lock()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+def get_async_client():
+    """Returns the shared AsyncOpenAI client, creating it on first use."""
+    global async_client
+    with _client_lock:
+        if async_client is None:
+            from openai import AsyncOpenAI
+
+            load_env()
+            async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return async_client
+
+REPAIR_PROMPT = """That query was rejected before execution:
+{errors}
+
+Return only the corrected SQL, using only tables and columns from the schema.
+If the question cannot be answered from the schema, return INVALID_QUERY: <reason>."""
+
+def clean_sql(text: str) -> str:
+    """Strips whitespace and Markdown code fences from a model response."""
+    sql = text.strip()
+    if "```" in sql:
+        sql = sql.replace("```sql", "").replace("```", "").strip()
+    return sql
 
 class SQLQueryGenerator:
-    def generate_sql(self, question: str, system_prompt: str, model_name: str = "gpt-4o") -> str:
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[
+    """
+    Generates SQL with the chat model, streaming and caching responses.
+
+    `strategy` (ASKDB_GENERATION_STRATEGY) is "single" (one request),
+    "race" (the same request to several models at once, see race_models) or
+    "hedge" (a duplicate request once the first has taken longer than the
+    model's p95). In race and hedge mode the first response that passes
+    quick_check in `dialect` wins, the others are cancelled, and the SQL is
+    yielded in one piece once the winner is known.
+    """
+
+    def __init__(self, cache: LLMResponseCache = None, client=None,
+                 strategy: str = None, dialect: str = None):
+        self.cache = cache if cache is not None else llm_cache
+        self._client = client
+        self.strategy = strategy or generation_strategy()
+        self.dialect = dialect
+        self.last_model = None
+        self.last_cache_hit = False
+        self.last_sql = None
+        self.last_ttft = None
+        self.last_latency = None
+        self.last_usage = None
+        self.last_cached_tokens = None
+
+    @property
+    def client(self):
+        """The client given to the constructor, else the shared one (created on first call)."""
+        return self._client if self._client is not None else get_async_client()
+
+    async def agenerate_sql_stream(self, question: str, system_prompt: str, model_name: str = "gpt-4o",
+                                   use_cache: bool = True):
+        """
+        Async generator yielding response text as the model streams it.
+        The cleaned SQL is left in `last_sql`; `last_ttft` holds the
+        time-to-first-token in seconds.
+        """
+        with telemetry.span("llm.generate", model=model_name) as span:
+            started = time.perf_counter()
+            self._reset_last()
+
+            cache_key = self.cache_key(question, model_name, system_prompt)
+            self.last_cache_hit = False
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    self.last_cache_hit = True
+                    self.last_sql = cached
+                    self.last_ttft = self.last_latency = time.perf_counter() - started
+                    span.set(cache_hit=True)
+                    yield cached
+                    return
+
+            messages = [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": question}
-            ],
-            temperature=0
+            ]
+            if self.strategy in (RACE, HEDGE):
+                await self._arace(messages, model_name, started, span)
+                if self.last_sql:
+                    yield self.last_sql
+            else:
+                self.last_model = model_name
+                async for delta in self._astream_completion(messages, model_name, started, span):
+                    yield delta
+            # Cached under the requested model, whichever model answered. Refusals are
+            # not cached: a retry may succeed, and repaired SQL is stored via remember()
+            if self.last_sql and not self.last_sql.startswith("INVALID_QUERY"):
+                self.cache.set(cache_key, self.last_sql, model_name)
+
+    async def arepair_sql_stream(self, question: str, system_prompt: str, failed_sql: str, errors: list,
+                                 model_name: str = "gpt-4o"):
+        """
+        Async generator for one repair round trip: the model sees its rejected
+        query and the exact validation errors and answers with a corrected one.
+        The repaired SQL is left in `last_sql`; it is not cached here.
+        """
+        with telemetry.span("llm.repair", model=model_name, errors=len(errors)) as span:
+            started = time.perf_counter()
+            self._reset_last()
+            self.last_cache_hit = False
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": question},
+                {"role": "assistant", "content": failed_sql},
+                {"role": "user", "content": REPAIR_PROMPT.format(errors="\n".join(f"- {e}" for e in errors))},
+            ]
+            async for delta in self._astream_completion(messages, model_name, started, span):
+                yield delta
+
+    async def _astream_completion(self, messages: list, model_name: str, started: float, span):
+        stream = await self.client.chat.completions.create(
+            model=model_name,
+            messages=messages,
+            temperature=0,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+        parts = []
+        async for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                self.last_usage = chunk.usage
+                # Prompt tokens served from the provider's prefix cache
+                details = getattr(chunk.usage, "prompt_tokens_details", None)
+                self.last_cached_tokens = getattr(details, "cached_tokens", None) or 0
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if self.last_ttft is None:
+                    self.last_ttft = time.perf_counter() - started
+                parts.append(delta)
+                yield delta
+
+        self.last_latency = time.perf_counter() - started
+        self.last_sql = clean_sql("".join(parts))
+        span.set(
+            cache_hit=False,
+            ttft_ms=round(self.last_ttft * 1000, 3) if self.last_ttft is not None else None,
+            prompt_tokens=getattr(self.last_usage, "prompt_tokens", None),
+            completion_tokens=getattr(self.last_usage, "completion_tokens", None),
+            cached_tokens=self.last_cached_tokens,
         )
 
-        sql = response.choices[0].message.content.strip()
+    async def _arace(self, messages: list, model_name: str, started: float, span):
+        """
+        Runs the race or hedge for one request and leaves the winner in
+        last_sql/last_model. When no response passes the check, the requested
+        model's (else the first) answer is kept so the caller can report it;
+        when every attempt failed, the last error is raised.
+        """
+        if self.strategy == RACE:
+            schedule = [(model, 0.0) for model in race_models(model_name)]
+        else:
+            schedule = [(model_name, 0.0), (model_name, hedge_delay(model_name))]
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+
+        running = {}
+        answers = []
+        winner = None
+        last_error = None
+
+        def launch(model):
+            # Each attempt streams into its own generator so they don't share last_* state
+            child = SQLQueryGenerator(cache=self.cache, client=self._client, strategy=SINGLE)
+            attempt = telemetry.Span("llm.attempt", model=model, strategy=self.strategy)
+            parts = []
+
+            async def run():
+                async for delta in child._astream_completion(messages, model, attempt.started, attempt):
+                    parts.append(delta)
+
+            running[asyncio.ensure_future(run())] = (model, attempt, parts, child)
+
+        def finish(model, attempt, outcome, wasted=0):
+            elapsed = time.perf_counter() - attempt.started
+            race_stats.record(model, outcome, elapsed, wasted, self.strategy)
+            telemetry.record("llm.attempt", elapsed, **attempt.attrs, outcome=outcome)
+
+        try:
+            while winner is None and (schedule or running):
+                now = time.perf_counter() - started
+                while schedule and (schedule[0][1] <= now or not running):
+                    launch(schedule.pop(0)[0])
+                timeout = schedule[0][1] - now if schedule else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    model, attempt, parts, child = running.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        finish(model, attempt, FAILED, prompt_tokens)
+                        continue
+                    spent = getattr(child.last_usage, "total_tokens", None) or prompt_tokens + estimate_tokens(child.last_sql or "")
+                    if winner is not None:
+                        finish(model, attempt, LOST, spent)
+                    elif quick_check(child.last_sql, self.dialect) is None:
+                        winner = (model, child)
+                        finish(model, attempt, WON)
+                    else:
+                        answers.append((model, child))
+                        finish(model, attempt, REJECTED, spent)
+        finally:
+            for task, (model, attempt, parts, child) in running.items():
+                task.cancel()
+                finish(model, attempt, CANCELLED, prompt_tokens + estimate_tokens("".join(parts)))
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        if winner is None:
+            if not answers:
+                raise last_error or RuntimeError("No generation attempt completed.")
+            winner = next((answer for answer in answers if answer[0] == model_name), answers[0])
+
+        model, child = winner
+        self.last_model = model
+        self.last_sql = child.last_sql
+        self.last_usage = child.last_usage
+        self.last_cached_tokens = child.last_cached_tokens
+        # Nothing is shown until the winner is known, so that is the first token
+        self.last_ttft = self.last_latency = time.perf_counter() - started
+        span.set(cache_hit=False, strategy=self.strategy, winner=model,
+                 ttft_ms=round(self.last_ttft * 1000, 3))
+
+    def _reset_last(self):
+        self.last_model = None
+        self.last_sql = None
+        self.last_ttft = None
+        self.last_usage = None
+        self.last_cached_tokens = None
+
+    @staticmethod
+    def cache_key(question: str, model_name: str, system_prompt: str) -> str:
+        """LLM cache key for a request; few-shot examples in the prompt are not part of it."""
+        return LLMResponseCache.make_key(question, model_name, cache_prompt(system_prompt))
+
+    def remember(self, question: str, system_prompt: str, model_name: str, sql: str):
+        """
+        Stores sql as the cached answer, e.g. after a successful repair.
+        """
+        self.cache.set(self.cache_key(question, model_name, system_prompt), sql, model_name)
+
+    def forget(self, question: str, system_prompt: str, model_name: str):
+        """
+        Drops the cached answer, so a rejected query is not served again.
+        """
+        self.cache.delete(self.cache_key(question, model_name, system_prompt))
+
+    async def agenerate_sql(self, question: str, system_prompt: str, model_name: str = "gpt-4o",
+                            use_cache: bool = True) -> str:
+        async for _ in self.agenerate_sql_stream(question, system_prompt, model_name, use_cache):
+            pass
+        return self.last_sql
+
+    def generate_sql_stream(self, question: str, system_prompt: str, model_name: str = "gpt-4o",
+                            use_cache: bool = True):
+        """
+        Synchronous iterator over streamed tokens, for rendering from the
+        Streamlit script thread. `last_sql` is set once it is exhausted.
+        """
+        return iterate_sync(self.agenerate_sql_stream(question, system_prompt, model_name, use_cache))
+
+    def repair_sql_stream(self, question: str, system_prompt: str, failed_sql: str, errors: list,
+                          model_name: str = "gpt-4o"):
+        """
+        Synchronous iterator over a repair round trip's streamed tokens.
+        """
+        return iterate_sync(self.arepair_sql_stream(question, system_prompt, failed_sql, errors, model_name))
 
-        if "```" in sql:
-            sql = sql.replace("```sql", "").replace("```", "").strip()
+    async def arepair_sql(self, question: str, system_prompt: str, failed_sql: str, errors: list,
+                          model_name: str = "gpt-4o") -> str:
+        async for _ in self.arepair_sql_stream(question, system_prompt, failed_sql, errors, model_name):
+            pass
+        return self.last_sql
 
-        return sql
+    def generate_sql(self, question: str, system_prompt: str, model_name: str = "gpt-4o",
+                     use_cache: bool = True) -> str:
+        """
+        Returns SQL for the question. Identical (question, model, prompt)
+        requests are answered from the response cache unless use_cache is False.
+        """
+        return run_sync(self.agenerate_sql(question, system_prompt, model_name, use_cache))
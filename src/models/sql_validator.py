@@ -0,0 +1,268 @@
+import difflib
+import threading
+from collections import OrderedDict
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+from sqlglot.optimizer.scope import Scope, traverse_scope
+
+from src.models.utils import env_bool, parse_column, schema_fingerprint
+
+# SQLAlchemy dialect name -> sqlglot dialect
+_DIALECTS = {
+    "mysql": "mysql",
+    "mariadb": "mysql",
+    "postgresql": "postgres",
+    "sqlite": "sqlite",
+    "mssql": "tsql",
+    "oracle": "oracle",
+}
+
+_READ_ONLY_ROOTS = (exp.Select, exp.SetOperation, exp.Subquery, exp.Show, exp.Describe)
+_WRITE_NODES = (exp.Insert, exp.Update, exp.Delete, exp.Merge, exp.Create, exp.Drop, exp.Alter,
+                exp.TruncateTable, exp.Command, exp.Into, exp.Lock)
+
+# Catalog schemas are valid to query but never part of the reflected schema
+_SYSTEM_SCHEMAS = {"information_schema", "pg_catalog", "mysql", "sys", "performance_schema", "sqlite_master"}
+# Implicit columns that never appear in the reflected schema
+_PSEUDO_COLUMNS = {"rowid", "oid", "ctid", "_rowid_"}
+
+_LOOKUP_CACHE_SIZE = 8
+_lookups = OrderedDict()
+_lookup_lock = threading.Lock()
+
+
+def sqlglot_dialect(dialect_name: str):
+    """Maps a SQLAlchemy dialect name to the sqlglot dialect (None = generic)."""
+    return _DIALECTS.get((dialect_name or "").lower())
+
+
+def _schema_lookup(schema: dict, fingerprint: str) -> dict:
+    """
+    {lowercased table: (table, {lowercased column: column})}, memoized per schema fingerprint.
+    """
+    with _lookup_lock:
+        lookup = _lookups.get(fingerprint)
+        if lookup is not None:
+            _lookups.move_to_end(fingerprint)
+            return lookup
+
+    lookup = {}
+    for table, columns in schema.items():
+        names = (parse_column(entry)["name"] for entry in columns)
+        lookup[table.lower()] = (table, {name.lower(): name for name in names})
+    with _lookup_lock:
+        _lookups[fingerprint] = lookup
+        while len(_lookups) > _LOOKUP_CACHE_SIZE:
+            _lookups.popitem(last=False)
+    return lookup
+
+
+class ValidationResult:
+    """
+    Outcome of validating one statement. `errors` lists precise,
+    model-readable problems; an empty list means the query may run.
+    """
+
+    def __init__(self, errors: list = None, tables: set = None, statement: str = None):
+        self.errors = errors or []
+        self.tables = tables or set()
+        self.statement = statement
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @property
+    def message(self) -> str:
+        return "\n".join(f"- {error}" for error in self.errors)
+
+    def __repr__(self):
+        return f"ValidationResult(ok={self.ok}, errors={self.errors!r})"
+
+
+class SQLValidator:
+    """
+    Parses generated SQL locally and binds every table and column reference
+    against the schema dict, so bad queries are rejected with no database
+    round trip. Also enforces the single-statement and read-only policies.
+    """
+
+    def __init__(self, schema: dict, dialect: str = None, allow_writes: bool = None, fingerprint: str = None):
+        self.schema = schema if isinstance(schema, dict) else {}
+        self.dialect = sqlglot_dialect(dialect) if dialect in _DIALECTS else dialect
+        self.allow_writes = allow_writes if allow_writes is not None else env_bool("ASKDB_ALLOW_WRITES", False)
+        self.lookup = _schema_lookup(self.schema, fingerprint or schema_fingerprint(self.schema))
+
+    def validate(self, sql: str) -> ValidationResult:
+        try:
+            statements = [s for s in sqlglot.parse(sql, read=self.dialect) if s is not None]
+        except ParseError as e:
+            first = e.errors[0] if e.errors else {}
+            detail = first.get("description") or str(e).splitlines()[0]
+            where = f" near `{first['highlight']}`" if first.get("highlight") else ""
+            return ValidationResult([f"Syntax error{where}: {detail}"])
+
+        if not statements:
+            return ValidationResult(["No SQL statement found."])
+        if len(statements) > 1:
+            return ValidationResult([f"Only one statement is allowed, found {len(statements)}."])
+
+        tree = statements[0]
+        result = ValidationResult(statement=tree.key.upper())
+        if not self.allow_writes:
+            writes = [tree] if not isinstance(tree, _READ_ONLY_ROOTS) else list(tree.find_all(*_WRITE_NODES))
+            if writes:
+                result.errors.append(f"Only read-only queries are allowed, found {writes[0].key.upper()}.")
+                return result
+
+        if isinstance(tree, (exp.Show, exp.Describe)):
+            return result
+        self._bind(tree, result)
+        return result
+
+    def _bind(self, tree, result: ValidationResult):
+        try:
+            scopes = traverse_scope(tree)
+        except Exception:
+            # Constructs the scope builder cannot follow are left to the database
+            return
+
+        reported = set()
+        for scope in scopes:
+            for alias, source in scope.sources.items():
+                if isinstance(source, exp.Table):
+                    self._check_table(source, result, reported)
+            if isinstance(scope.expression, exp.SetOperation):
+                # ORDER BY on a UNION refers to its output columns
+                continue
+            for column in scope.columns:
+                # Columns of nested subqueries are checked in their own scope
+                if column.find_ancestor(exp.Select, exp.SetOperation) is scope.expression:
+                    self._check_column(scope, column, result, reported)
+
+    def _resolve_table(self, table: exp.Table):
+        """
+        Returns (entry, skip): the lookup entry for the table, or skip=True
+        for sources that are not plain schema tables (catalogs, functions).
+        """
+        if not isinstance(table.this, exp.Identifier):
+            return None, True
+        if table.db and table.db.lower() in _SYSTEM_SCHEMAS:
+            return None, True
+        if table.name.lower() in _SYSTEM_SCHEMAS:
+            return None, True
+        return self.lookup.get(table.name.lower()), False
+
+    def _check_table(self, table: exp.Table, result: ValidationResult, reported: set):
+        entry, skip = self._resolve_table(table)
+        if skip:
+            return
+        if entry is not None:
+            result.tables.add(entry[0])
+            return
+        if ("table", table.name.lower()) in reported:
+            return
+        reported.add(("table", table.name.lower()))
+        hint = _suggest(table.name, [name for name, _ in self.lookup.values()])
+        result.errors.append(f"Unknown table `{table.name}`.{hint}")
+
+    def _check_column(self, scope: Scope, column: exp.Column, result: ValidationResult, reported: set):
+        name = column.name
+        if not name or name.lower() in _PSEUDO_COLUMNS:
+            return
+
+        if column.table:
+            source = _find_source(scope, column.table)
+            if source is None:
+                key = ("alias", column.table.lower())
+                if key not in reported:
+                    reported.add(key)
+                    result.errors.append(f"Unknown table or alias `{column.table}` in `{column.sql()}`.")
+                return
+            known = self._source_columns(source)
+            if known is None or name.lower() in known:
+                return
+            key = ("column", column.table.lower(), name.lower())
+            if key not in reported:
+                reported.add(key)
+                label = source.name if isinstance(source, exp.Table) else column.table
+                hint = _suggest(name, list(known.values()))
+                result.errors.append(f"Unknown column `{column.table}.{name}`: `{label}` has no column `{name}`.{hint}")
+            return
+
+        # Unqualified: any source in this or an enclosing scope may provide it
+        candidates = {}
+        current = scope
+        while current is not None:
+            for alias, source in current.sources.items():
+                known = self._source_columns(source)
+                if known is None:
+                    return
+                if name.lower() in known:
+                    return
+                candidates[alias] = known
+            if _select_aliases(current) & {name.lower()}:
+                return
+            current = current.parent
+
+        key = ("column", None, name.lower())
+        if key in reported:
+            return
+        reported.add(key)
+        if not candidates:
+            result.errors.append(f"Unknown column `{name}`: the query selects from no table.")
+            return
+        all_columns = sorted({col for known in candidates.values() for col in known.values()})
+        hint = _suggest(name, all_columns)
+        result.errors.append(f"Unknown column `{name}`: not found in {', '.join(f'`{a}`' for a in candidates)}.{hint}")
+
+    def _source_columns(self, source):
+        """
+        {lowercased column: column} a source provides, or None when unknown
+        (catalog tables, table functions, SELECT * subqueries).
+        """
+        if isinstance(source, exp.Table):
+            entry, skip = self._resolve_table(source)
+            return None if skip or entry is None else entry[1]
+        if isinstance(source, Scope):
+            expression = source.expression
+            # WITH c(x) AS (...) and (...) AS t(a, b) rename the columns
+            renamed = expression.parent.alias_column_names if isinstance(expression.parent, (exp.CTE, exp.Subquery)) else None
+            if renamed:
+                return {n.lower(): n for n in renamed}
+            names = getattr(expression, "named_selects", None)
+            if not names or "*" in names or any(isinstance(s, exp.Star) for s in getattr(expression, "selects", [])):
+                return None
+            return {n.lower(): n for n in names}
+        return None
+
+
+def _find_source(scope: Scope, name: str):
+    current = scope
+    while current is not None:
+        for alias, source in current.sources.items():
+            if alias.lower() == name.lower():
+                return source
+        current = current.parent
+    return None
+
+
+def _select_aliases(scope: Scope) -> set:
+    selects = getattr(scope.expression, "selects", None) or []
+    return {s.alias.lower() for s in selects if isinstance(s, exp.Alias)}
+
+
+def _suggest(name: str, options: list) -> str:
+    lowered = {option.lower(): option for option in options}
+    matches = difflib.get_close_matches(name.lower(), list(lowered), n=1, cutoff=0.6)
+    return f" Did you mean `{lowered[matches[0]]}`?" if matches else ""
+
+
+def validation_enabled() -> bool:
+    return env_bool("ASKDB_SQL_VALIDATION", True)
+
+
+def repair_enabled() -> bool:
+    return env_bool("ASKDB_SQL_REPAIR", True)
@@ -0,0 +1,330 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.models.utils import env_int
+
+_current_trace = contextvars.ContextVar("askdb_trace", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Span attributes that also feed process-wide token counters
+_TOKEN_ATTRS = {
+    "prompt_tokens": "prompt",
+    "completion_tokens": "completion",
+    "cached_tokens": "cached",
+}
+
+
+class Metrics:
+    """
+    Thread-safe counters and fixed-bucket histograms, rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def inc(self, metric: str, value: float = 1, help: str = None, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help:
+                self._help.setdefault(metric, help)
+
+    def observe(self, metric: str, value: float, help: str = None, **labels):
+        key = (metric, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+            if help:
+                self._help.setdefault(metric, help)
+
+    def snapshot(self) -> dict:
+        """
+        Plain-dict copy: {"counters": {name: {labels: value}}, "histograms": {name: {labels: {count, sum}}}}.
+        """
+        with self._lock:
+            counters, histograms = {}, {}
+            for (name, labels), value in self._counters.items():
+                counters.setdefault(name, {})[_label_text(labels)] = value
+            for (name, labels), histogram in self._histograms.items():
+                histograms.setdefault(name, {})[_label_text(labels)] = {
+                    "count": histogram["count"],
+                    "sum": histogram["sum"],
+                }
+        return {"counters": counters, "histograms": histograms}
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(h, buckets=list(h["buckets"]))) for key, h in self._histograms.items())
+            help_text = dict(self._help)
+
+        lines = []
+        declared = set()
+
+        def declare(name, kind):
+            if name not in declared:
+                declared.add(name)
+                if name in help_text:
+                    lines.append(f"# HELP {name} {help_text[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_label_text(labels, braces=True)} {_number(value)}")
+
+        for (name, labels), histogram in histograms:
+            declare(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                cumulative += count
+                bucket_labels = labels + (("le", _number(bound)),)
+                lines.append(f"{name}_bucket{_label_text(bucket_labels, braces=True)} {cumulative}")
+            lines.append(f"{name}_bucket{_label_text(labels + (('le', '+Inf'),), braces=True)} {histogram['count']}")
+            lines.append(f"{name}_sum{_label_text(labels, braces=True)} {_number(histogram['sum'])}")
+            lines.append(f"{name}_count{_label_text(labels, braces=True)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+def _label_text(labels: tuple, braces: bool = False) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + body + "}" if braces else body
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+metrics = Metrics()
+
+
+class Span:
+    """
+    One timed stage. Attributes set while it runs end up in the trace and logs.
+    """
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Trace:
+    """
+    Collects the spans of one user request (question -> SQL -> results).
+
+    Entering the trace makes it current for this context, so spans opened by
+    models called from here, including on the background loop and in query
+    workers, attach to it. finish() logs it as JSONL and updates metrics.
+    """
+
+    def __init__(self, name: str, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.created_at = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self._lock = threading.Lock()
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_current_trace.set(self))
+        return self
+
+    def __exit__(self, *exc):
+        _current_trace.reset(self._tokens.pop())
+        return False
+
+    def add(self, span: Span):
+        with self._lock:
+            self.spans.append({
+                "name": span.name,
+                "start_ms": round((span.started - self.started) * 1000, 3),
+                "duration_ms": round(span.duration * 1000, 3),
+                **span.attrs,
+            })
+
+    def finish(self):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self.started
+        metrics.inc("askdb_requests_total", help="Completed traced requests", name=self.name)
+        metrics.observe("askdb_request_duration_seconds", self.duration,
+                        help="End-to-end request wall time", name=self.name)
+        _write_trace_log(self.to_dict())
+        _write_metrics_file()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "timestamp": self.created_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            **self.attrs,
+            "spans": spans,
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    Times the enclosed block as stage `name`, recording it in the stage
+    histogram and, when a trace is active, in that trace.
+    """
+    current = Span(name, **attrs)
+    try:
+        yield current
+    except BaseException as e:
+        current.set(error=type(e).__name__)
+        metrics.inc("askdb_stage_errors_total", help="Stages that raised", stage=name)
+        raise
+    finally:
+        current.duration = time.perf_counter() - current.started
+        _finish_span(current)
+
+
+def record(name: str, seconds: float, **attrs):
+    """
+    Records a stage that was timed elsewhere.
+    """
+    current = Span(name, **attrs)
+    current.started = time.perf_counter() - seconds
+    current.duration = seconds
+    _finish_span(current)
+
+
+def observe_pool_wait(seconds: float):
+    metrics.observe("askdb_pool_wait_seconds", seconds, help="Time spent acquiring a pooled connection")
+
+
+def count_fetched(rows: int, nbytes: int):
+    metrics.inc("askdb_rows_fetched_total", rows, help="Result rows fetched from the database")
+    metrics.inc("askdb_bytes_fetched_total", nbytes, help="Result bytes fetched (DataFrame memory)")
+
+
+def _finish_span(current: Span):
+    metrics.observe("askdb_stage_duration_seconds", current.duration, help="Wall time per pipeline stage",
+                    stage=current.name)
+    for attr, kind in _TOKEN_ATTRS.items():
+        value = current.attrs.get(attr)
+        if value:
+            metrics.inc("askdb_llm_tokens_total", value, help="LLM tokens by kind", kind=kind)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(current)
+
+
+_log_lock = threading.Lock()
+
+
+def _write_trace_log(entry: dict):
+    default = os.path.join(os.getenv("ASKDB_CACHE_DIR", ".askdb_cache"), "traces.jsonl")
+    path = os.getenv("ASKDB_TRACE_LOG", default)
+    if not path:
+        return
+    max_bytes = env_int("ASKDB_TRACE_LOG_MAX_BYTES", 10 * 1024 * 1024)
+    line = json.dumps(entry, default=str) + "\n"
+    with _log_lock:
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            if os.path.exists(path) and os.path.getsize(path) > max_bytes:
+                os.replace(path, path + ".1")
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass
+
+
+def _write_metrics_file():
+    """
+    Writes the Prometheus text to ASKDB_METRICS_FILE, if set (for node_exporter's textfile collector).
+    """
+    path = os.getenv("ASKDB_METRICS_FILE")
+    if not path:
+        return
+    try:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(metrics.render_prometheus())
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = None):
+    """
+    Serves /metrics on ASKDB_METRICS_PORT (once per process). Port 0/unset disables it.
+    """
+    global _server
+    port = port if port is not None else env_int("ASKDB_METRICS_PORT", 0)
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError:
+                return None
+            threading.Thread(target=_server.serve_forever, name="askdb-metrics", daemon=True).start()
+        return _server
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
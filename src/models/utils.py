@@ -1,5 +1,49 @@
+import hashlib
+import json
+import os
+import re
 import socket
 import ipaddress
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+_dns_cache = {}
+_dns_lock = threading.Lock()
+_dns_pool = None
+
+
+def resolve_host(host, timeout=None):
+    """
+    Resolves host to an IP address string, or None when it cannot be resolved
+    within timeout (ASKDB_DNS_TIMEOUT). Answers are cached for
+    ASKDB_DNS_CACHE_TTL seconds and failures for ASKDB_DNS_NEGATIVE_TTL.
+    A lookup that only ran out of time is not cached.
+    """
+    global _dns_pool
+    now = time.time()
+    with _dns_lock:
+        entry = _dns_cache.get(host)
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        if _dns_pool is None:
+            # gethostbyname cannot time out by itself, so it runs where it can be abandoned
+            _dns_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="askdb-dns")
+
+    timeout = timeout if timeout is not None else env_float("ASKDB_DNS_TIMEOUT", 2.0)
+    try:
+        ip = _dns_pool.submit(socket.gethostbyname, host).result(timeout)
+        ttl = env_float("ASKDB_DNS_CACHE_TTL", 300.0)
+    except FutureTimeout:
+        return None
+    except OSError:
+        ip = None
+        ttl = env_float("ASKDB_DNS_NEGATIVE_TTL", 30.0)
+    with _dns_lock:
+        _dns_cache[host] = (ip, time.time() + ttl)
+    return ip
+
 
 def is_local_or_private(host_addr):
     """
@@ -7,7 +51,9 @@ def is_local_or_private(host_addr):
     Returns (True/False, "Reason")
     """
     try:
-        ip_str = socket.gethostbyname(host_addr)
+        ip_str = resolve_host(host_addr)
+        if ip_str is None:
+            return False, None
         ip = ipaddress.ip_address(ip_str)
 
         if ip.is_loopback:
@@ -18,3 +64,129 @@ def is_local_or_private(host_addr):
         return False, None
     except Exception:
         return False, None
+
+
+def env_int(name, default):
+    """
+    Reads an integer setting from the environment, falling back to default.
+    """
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def env_float(name, default):
+    """
+    Reads a float setting from the environment, falling back to default.
+    """
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+_env_loaded = False
+
+
+def load_env():
+    """
+    Loads a .env file into the environment, once. Entry points call this
+    before anything reads settings; nothing does it at import time.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _env_loaded = True
+
+
+def env_bool(name, default):
+    """
+    Reads a boolean setting from the environment ("1", "true", "yes", "on").
+    """
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+_COLUMN_RE = re.compile(
+    r"^(?P<name>.+?) \((?P<type>.*?)\)"
+    r"(?P<not_null> NOT NULL)?"
+    r"(?P<pk> PRIMARY KEY)?"
+    r"(?: REFERENCES (?P<ref_table>[^\s(]+)\((?P<ref_column>[^)]+)\))?$"
+)
+
+
+def format_column(name, type_, nullable=True, primary_key=False, ref_table=None, ref_column=None):
+    """
+    Renders one schema-dict column entry, e.g.
+    "user_id (INTEGER) NOT NULL REFERENCES users(id)".
+    """
+    entry = f"{name} ({type_})"
+    if not nullable:
+        entry += " NOT NULL"
+    if primary_key:
+        entry += " PRIMARY KEY"
+    if ref_table and ref_column:
+        entry += f" REFERENCES {ref_table}({ref_column})"
+    return entry
+
+
+def parse_column(entry):
+    """
+    Splits a schema-dict column entry back into its parts.
+    Returns a dict with name, type, nullable, primary_key, ref_table, ref_column.
+    """
+    match = _COLUMN_RE.match(entry)
+    if not match:
+        return {"name": entry.split(" ")[0], "type": "", "nullable": True,
+                "primary_key": False, "ref_table": None, "ref_column": None}
+    return {
+        "name": match.group("name"),
+        "type": match.group("type"),
+        "nullable": not match.group("not_null"),
+        "primary_key": bool(match.group("pk")),
+        "ref_table": match.group("ref_table"),
+        "ref_column": match.group("ref_column"),
+    }
+
+
+_FINGERPRINT_CACHE_SIZE = 8
+_fingerprints = OrderedDict()
+_fingerprint_lock = threading.Lock()
+
+
+def schema_fingerprint(schema):
+    """
+    Returns a short, stable content hash of a schema dict (or schema text).
+    Dicts are hashed once per object: the schema cache hands out the same
+    dict on every rerun and nothing mutates it, so repeat calls skip the
+    JSON dump.
+    """
+    if isinstance(schema, str):
+        return hashlib.sha256(schema.encode()).hexdigest()[:16]
+
+    with _fingerprint_lock:
+        cached = _fingerprints.get(id(schema))
+        # The entry holds a reference, so the id cannot be reused while cached
+        if cached is not None and cached[0] is schema:
+            _fingerprints.move_to_end(id(schema))
+            return cached[1]
+
+    fingerprint = hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:16]
+    with _fingerprint_lock:
+        _fingerprints[id(schema)] = (schema, fingerprint)
+        while len(_fingerprints) > _FINGERPRINT_CACHE_SIZE:
+            _fingerprints.popitem(last=False)
+    return fingerprint
+
+
+def estimate_tokens(text):
+    """
+    Rough token estimate (~4 characters per token) used for prompt budgets.
+    """
+    return len(text) // 4 + 1 if text else 0
@@ -1,4 +1,5 @@
 import streamlit as st
+from src.models.schema_browser import page_of
 
 def render_ai_config():
     """
@@ -13,9 +14,46 @@ def render_ai_config():
         
         return model_name, persona
 
-def render_schema_viewer(schema):
+def render_cache_controls(cache_stats):
     """
-    Renders the schema viewer in the sidebar.
+    Renders the LLM cache toggle and hit/miss counters in the sidebar.
+    Returns True when the cache should be bypassed for this request.
+    """
+    with st.sidebar:
+        bypass = st.checkbox("Bypass LLM cache", value=False, help="Always call the model, even for repeated questions.")
+        st.caption(
+            f"LLM cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%} hit rate)"
+        )
+        return bypass
+
+def render_result_cache_controls(cache_stats):
+    """
+    Renders the result cache toggle and usage in the sidebar.
+    Returns True when cached results should be bypassed for this request.
+    """
+    with st.sidebar:
+        bypass = st.checkbox("Bypass result cache", value=False, help="Always run the query, even if an identical one ran recently.")
+        st.caption(
+            f"Result cache: {cache_stats['entries']} results, "
+            f"{cache_stats['bytes'] / 1024 / 1024:.1f}/{cache_stats['max_bytes'] / 1024 / 1024:.0f} MB "
+            f"({cache_stats['hit_rate']:.0%} hit rate)"
+        )
+        return bypass
+
+def render_schema_refresh():
+    """
+    Renders the manual schema refresh button in the sidebar.
+    Returns True when a reload was requested.
+    """
+    with st.sidebar:
+        return st.button("🔄 Refresh Schema", help="Bypass the schema cache and re-read the database catalog.")
+
+def render_schema_viewer(schema, index=None, page_size=50):
+    """
+    Renders the schema browser in the sidebar: a search box, one page of
+    matching tables, and the columns of the table that is opened. The
+    widget count does not grow with the schema.
     """
     with st.sidebar:
         st.header("Database Schema")
@@ -24,9 +62,156 @@ def render_schema_viewer(schema):
                 st.warning("Please seed some data. The database is empty.")
             else:
                 st.error(schema)
+            return
+
+        query = st.text_input("Search tables and columns", key="schema_search",
+                              placeholder="orders, customer_id, orders.amount")
+        tables, matched = index.search(query)
+        pages = max(1, -(-len(tables) // page_size))
+        if st.session_state.get("schema_page", 1) > pages:
+            st.session_state.schema_page = 1
+        page = st.number_input(f"Page (of {pages:,})", 1, pages, key="schema_page") if pages > 1 else 1
+        st.caption(f"{len(tables):,} of {index.table_count:,} tables")
+
+        visible = page_of(tables, page, page_size)
+        if visible:
+            table = st.radio(
+                "Tables",
+                visible,
+                index=None,
+                key="schema_table",
+                label_visibility="collapsed",
+                format_func=lambda t: f"{t}  ·  {', '.join(matched[t][:3])}" if matched.get(t) else t,
+            )
+            if table is not None:
+                # Only the opened table's columns are sent to the browser
+                st.code("\n".join(index.columns(table)), language=None)
         else:
-            for table, cols in schema.items():
-                with st.expander(table):
-                    for c in cols:
-                        st.text(c)
-            st.success("Connected successfully!")
+            st.caption("No tables or columns match.")
+        st.success("Connected successfully!")
+
+def render_endpoint_stats(stats):
+    """
+    Renders per-endpoint health, traffic and latency when read replicas are configured.
+    """
+    if not stats:
+        return
+    with st.sidebar:
+        with st.expander("🛰 Database endpoints", expanded=False):
+            st.dataframe(
+                [
+                    {
+                        "endpoint": entry["endpoint"],
+                        "status": "🟢 up" if entry["healthy"] else "🔴 down",
+                        "requests": entry["requests"],
+                        "errors": entry["errors"],
+                        "active": entry["outstanding"],
+                        "latency ms": entry["latency_ms"],
+                        "lag s": entry["lag_seconds"],
+                    }
+                    for entry in stats
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
+            for entry in stats:
+                if not entry["healthy"] and entry["last_error"]:
+                    st.caption(f"{entry['endpoint']}: {entry['last_error']}")
+
+def render_few_shot_stats(stats):
+    """
+    Renders how often a question's first SQL runs, and the average attempts
+    per answered question.
+    """
+    if not stats["questions"]:
+        return
+    with st.sidebar:
+        st.caption(
+            f"First-attempt success: {stats['first_attempt_rate']:.0%} of {stats['questions']} questions, "
+            f"{stats['avg_attempts']:.2f} attempts per answer"
+        )
+
+def render_race_stats(stats):
+    """
+    Renders per-model win rates, latencies and wasted tokens when generation
+    races or hedges requests.
+    """
+    if not stats:
+        return
+    with st.sidebar:
+        with st.expander("🏁 Model racing", expanded=False):
+            st.dataframe(
+                [
+                    {
+                        "model": entry["model"],
+                        "attempts": entry["attempts"],
+                        "win rate": f"{entry['win_rate']:.0%}",
+                        "p50 ms": entry["p50_ms"],
+                        "p95 ms": entry["p95_ms"],
+                        "rejected": entry["rejected"],
+                        "cancelled": entry["cancelled"],
+                        "wasted tokens": entry["wasted_tokens"],
+                    }
+                    for entry in stats
+                ],
+                hide_index=True,
+                use_container_width=True,
+            )
+
+def render_metrics_panel(last_trace, snapshot, prometheus_text):
+    """
+    Renders a collapsible panel with the last request's stage timings and
+    process-wide totals, plus a Prometheus-format download.
+    """
+    with st.sidebar:
+        with st.expander("⏱ Performance", expanded=False):
+            if last_trace:
+                st.caption(f"Last request: {last_trace['duration_ms']:,.0f} ms")
+                rows = []
+                for span in last_trace["spans"]:
+                    details = {k: v for k, v in span.items() if k not in ("name", "start_ms", "duration_ms") and v is not None}
+                    rows.append({
+                        "stage": span["name"],
+                        "ms": span["duration_ms"],
+                        "details": ", ".join(f"{k}={v}" for k, v in details.items()),
+                    })
+                st.dataframe(rows, hide_index=True, use_container_width=True)
+            else:
+                st.caption("Ask a question to see where the time goes.")
+
+            stages = snapshot["histograms"].get("askdb_stage_duration_seconds", {})
+            if stages:
+                st.markdown("**Since startup**")
+                st.dataframe(
+                    [
+                        {
+                            "stage": labels.split('"')[1],
+                            "calls": h["count"],
+                            "avg ms": round(h["sum"] / h["count"] * 1000, 1) if h["count"] else 0,
+                        }
+                        for labels, h in sorted(stages.items())
+                    ],
+                    hide_index=True,
+                    use_container_width=True,
+                )
+            counters = snapshot["counters"]
+            tokens = {
+                kind: counters.get("askdb_llm_tokens_total", {}).get(f'kind="{kind}"', 0)
+                for kind in ("prompt", "completion", "cached")
+            }
+            rows_fetched = sum(counters.get("askdb_rows_fetched_total", {}).values())
+            bytes_fetched = sum(counters.get("askdb_bytes_fetched_total", {}).values())
+            pool_wait = snapshot["histograms"].get("askdb_pool_wait_seconds", {}).get("", {"count": 0, "sum": 0.0})
+            st.caption(
+                f"Tokens: {tokens['prompt']:,} prompt / {tokens['completion']:,} completion "
+                f"/ {tokens['cached']:,} cached · Rows fetched: {rows_fetched:,} "
+                f"({bytes_fetched / 1e6:,.1f} MB) · Pool checkouts: {pool_wait['count']:,} "
+                f"({pool_wait['sum'] * 1000:,.0f} ms waiting)"
+            )
+            st.download_button(
+                "Download metrics (Prometheus)",
+                prometheus_text,
+                file_name="askdb_metrics.prom",
+                mime="text/plain",
+                key="download_metrics",
+            )
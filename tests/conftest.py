@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# Same as the entry points: make `src` importable from the repo root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+@pytest.fixture
+def sqlite_url(tmp_path):
+    """A small SQLite database with one `orders` table (100 rows)."""
+    path = tmp_path / "shop.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer TEXT, amount REAL)")
+    conn.executemany("INSERT INTO orders (customer, amount) VALUES (?, ?)",
+                     [(f"customer_{i % 7}", i * 1.5) for i in range(100)])
+    conn.commit()
+    conn.close()
+    return f"sqlite:///{path}"
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Keeps the on-disk caches of each test in its own directory."""
+    monkeypatch.setenv("ASKDB_CACHE_DIR", str(tmp_path / "cache"))
+    from src.models.llm_cache import llm_cache
+    from src.models.prompts.few_shot import few_shot_store
+    from src.models.result_cache import result_cache
+
+    for store, name in ((llm_cache, "llm_cache.sqlite3"), (few_shot_store, "few_shot.sqlite3")):
+        monkeypatch.setattr(store, "path", str(tmp_path / "cache" / name))
+        monkeypatch.setattr(store, "_conn", None)
+    llm_cache._memory.clear()
+    few_shot_store._indexes.clear()
+    result_cache.clear()
@@ -0,0 +1,109 @@
+import io
+
+import pyarrow as pa
+import pytest
+from starlette.testclient import TestClient
+
+from src.controllers.api_controller import ARROW_STREAM, create_app
+from src.models.db_executor import DatabaseExecutor
+from src.models.fake_llm import FakeAsyncOpenAI
+from src.models.query_service import QueryService
+
+TOTALS_SQL = "SELECT customer, SUM(amount) AS total FROM orders GROUP BY customer ORDER BY customer"
+ENDLESS_CTE = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+
+
+@pytest.fixture
+def client(sqlite_url):
+    fake = FakeAsyncOpenAI(
+        default_sql="SELECT 1",
+        responses={"per customer": TOTALS_SQL, "discount": "SELECT discount FROM orders"},
+        ttft=0.01,
+        chunk_delay=0,
+    )
+    service = QueryService(DatabaseExecutor(db_url=sqlite_url), client=fake, repair=False)
+    with TestClient(create_app(service)) as test_client:
+        yield test_client
+
+
+def test_ask_returns_sql_and_rows(client):
+    response = client.post("/ask", json={"question": "Total amount per customer"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["sql"] == TOTALS_SQL
+    assert body["columns"] == ["customer", "total"]
+    assert body["row_count"] == 7
+    assert body["rows"][0][0] == "customer_0"
+    assert response.headers["X-AskDB-Trace"]
+
+
+def test_execute_returns_arrow_when_asked(client):
+    response = client.post("/execute", json={"sql": TOTALS_SQL}, headers={"Accept": ARROW_STREAM})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == ARROW_STREAM
+    table = pa.ipc.open_stream(io.BytesIO(response.content)).read_all()
+    assert table.num_rows == 7
+    assert b"askdb" in table.schema.metadata
+
+
+def test_validator_rejects_writes(client):
+    response = client.post("/execute", json={"sql": "DELETE FROM orders"})
+
+    assert response.status_code == 422
+    assert response.json()["status"] == "invalid_sql"
+    assert client.post("/execute", json={"sql": "SELECT count(*) FROM orders"}).json()["rows"] == [[100]]
+
+
+def test_validator_rejects_unknown_columns(client):
+    response = client.post("/ask", json={"question": "Average discount"})
+
+    assert response.status_code == 422
+    body = response.json()
+    assert body["status"] == "invalid_sql"
+    assert any("discount" in error for error in body["errors"])
+
+
+def test_statement_timeout(client):
+    response = client.post("/execute", json={"sql": ENDLESS_CTE, "timeout": 0.5})
+
+    assert response.status_code == 504
+    assert response.json()["status"] == "timeout"
+
+
+def test_missing_field_is_a_bad_request(client):
+    response = client.post("/ask", json={})
+
+    assert response.status_code == 400
+    assert response.json()["status"] == "bad_request"
+
+
+@pytest.mark.parametrize("sql", ["DELETE FROM orders", "SELECT 1; DELETE FROM orders"])
+def test_explain_rejects_writes_and_extra_statements(client, sql):
+    response = client.post("/explain", json={"sql": sql})
+
+    assert response.status_code == 422
+    assert response.json()["status"] == "invalid_sql"
+    assert client.post("/execute", json={"sql": "SELECT count(*) FROM orders"}).json()["rows"] == [[100]]
+
+
+def test_explain_returns_the_plan(client):
+    response = client.post("/explain", json={"sql": "SELECT * FROM orders"})
+
+    assert response.status_code == 200
+    assert response.json()["plan"]["full_scans"] == [{"table": "orders", "rows": 100}]
+
+
+@pytest.mark.parametrize("timeout", [0, -1, "5", True, None])
+def test_timeout_must_be_a_positive_number(client, timeout):
+    response = client.post("/execute", json={"sql": "SELECT 1", "timeout": timeout})
+
+    assert response.status_code == (200 if timeout is None else 400)
+
+
+def test_timeout_is_capped_by_the_server(client, monkeypatch):
+    monkeypatch.setenv("ASKDB_STATEMENT_TIMEOUT", "0.5")
+    response = client.post("/execute", json={"sql": ENDLESS_CTE, "timeout": 3600})
+
+    assert response.status_code == 504
@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from src.models import batch_runner
+from src.models.batch_runner import BatchRunner, RateLimiter
+from src.models.db_executor import DatabaseExecutor
+from src.models.fake_llm import FakeAsyncOpenAI
+
+
+@pytest.fixture
+def virtual_time(monkeypatch):
+    """Runs the limiter on a fake clock: sleeping advances it instantly."""
+    clock = SimpleNamespace(now=0.0, sleeps=[])
+
+    async def sleep(seconds):
+        clock.sleeps.append(round(seconds, 6))
+        clock.now += seconds
+
+    monkeypatch.setattr(batch_runner, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    monkeypatch.setattr(batch_runner, "asyncio", SimpleNamespace(sleep=sleep, Lock=asyncio.Lock))
+    return clock
+
+
+def test_requests_per_minute(virtual_time):
+    async def run():
+        limiter = RateLimiter(rpm=60, tpm=0)
+        for _ in range(61):
+            await limiter.acquire(100)
+
+    asyncio.run(run())
+    # A full bucket of 60, then one request per second
+    assert virtual_time.sleeps == [1.0]
+
+
+def test_tokens_per_minute(virtual_time):
+    async def run():
+        limiter = RateLimiter(rpm=0, tpm=600)
+        for _ in range(3):
+            await limiter.acquire(300)
+
+    asyncio.run(run())
+    assert virtual_time.sleeps == [30.0]
+
+
+def test_pause_holds_back_the_next_request(virtual_time):
+    async def run():
+        limiter = RateLimiter(rpm=100, tpm=0)
+        limiter.pause(5)
+        await limiter.acquire(1)
+
+    asyncio.run(run())
+    assert virtual_time.now == pytest.approx(5.0)
+
+
+class RateLimitedOnce(FakeAsyncOpenAI):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.attempts = 0
+
+    async def _create(self, model, messages, stream=False, **kwargs):
+        self.attempts += 1
+        if self.attempts == 1:
+            response = httpx.Response(429, headers={"retry-after": "0.01"}, request=httpx.Request("POST", "http://llm"))
+            raise RateLimitError("Too many requests", response=response, body=None)
+        return await super()._create(model, messages, stream, **kwargs)
+
+
+def test_429_is_retried_after_a_pause(sqlite_url):
+    db = DatabaseExecutor(db_url=sqlite_url)
+    client = RateLimitedOnce(default_sql="SELECT count(*) FROM orders", ttft=0, chunk_delay=0)
+    runner = BatchRunner(db, db.get_schema(), client=client, use_cache=False, concurrency=1)
+
+    [result] = asyncio.run(runner.run([{"id": "1", "question": "How many orders?"}]))
+
+    assert result["status"] == "ok"
+    assert result["attempts"] == 2
+    assert result["rows"] == 1
+
+
+def test_429_gives_up_after_max_retries(sqlite_url):
+    class AlwaysLimited(RateLimitedOnce):
+        async def _create(self, model, messages, stream=False, **kwargs):
+            self.attempts = 0
+            return await super()._create(model, messages, stream, **kwargs)
+
+    db = DatabaseExecutor(db_url=sqlite_url)
+    runner = BatchRunner(db, db.get_schema(), client=AlwaysLimited(), use_cache=False, max_retries=2)
+
+    [result] = asyncio.run(runner.run([{"id": "1", "question": "How many orders?"}]))
+
+    assert result["status"] == "generation_error"
+    assert result["attempts"] == 3
@@ -0,0 +1,27 @@
+from sqlalchemy import create_engine
+
+from src.models.cost_guard import _summarize_sqlite, explain
+
+
+def test_sqlite_scan_details_name_the_table(sqlite_url):
+    rows = [
+        (2, 0, 0, "SCAN TABLE orders AS o"),
+        (3, 0, 0, "SCAN TABLE orders"),
+        (4, 0, 0, "SCAN orders USING COVERING INDEX idx_customer"),
+        (5, 0, 0, "SCAN CONSTANT ROW"),
+    ]
+    engine = create_engine(sqlite_url)
+    with engine.connect() as conn:
+        plan = _summarize_sqlite(conn, rows)
+    engine.dispose()
+
+    assert plan.full_scans == [("orders", 100), ("orders", 100)]
+
+
+def test_sqlite_scan_by_alias_is_sized(sqlite_url):
+    engine = create_engine(sqlite_url)
+    with engine.connect() as conn:
+        plan = explain(conn, "SELECT o.customer FROM orders AS o WHERE o.amount > 10", "sqlite")
+    engine.dispose()
+
+    assert plan.full_scans == [("orders", 100)]
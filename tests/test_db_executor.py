@@ -0,0 +1,29 @@
+import time
+
+from src.models.db_executor import DatabaseExecutor
+from src.models.query_errors import QueryFailure, QueryStatus
+
+# Counts forever; only the statement timeout stops it
+ENDLESS_CTE = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+
+
+def test_sqlite_statement_timeout(sqlite_url):
+    db = DatabaseExecutor(db_url=sqlite_url)
+
+    started = time.perf_counter()
+    result = db.execute_query(ENDLESS_CTE, timeout=0.5, use_cache=False)
+
+    assert isinstance(result, QueryFailure)
+    assert result.status == QueryStatus.TIMEOUT
+    assert time.perf_counter() - started < 5
+
+
+def test_sqlite_timeout_does_not_outlive_the_statement(sqlite_url):
+    db = DatabaseExecutor(db_url=sqlite_url)
+    db.execute_query(ENDLESS_CTE, timeout=0.2, use_cache=False)
+    time.sleep(0.3)
+
+    # The pooled connection comes back without the expired deadline
+    result = db.execute_query("SELECT count(*) AS n FROM orders", timeout=0.2, use_cache=False)
+    assert result["n"].tolist() == [100]
+    assert "orders" in db.get_schema(refresh=True)
@@ -0,0 +1,28 @@
+from src.models.ddl_parser import parse_ddl
+from src.models.utils import parse_column
+
+
+def _column(schema: dict, table: str, name: str) -> dict:
+    return next(c for c in map(parse_column, schema[table]) if c["name"] == name)
+
+
+def test_bare_references_resolve_to_the_primary_key():
+    schema, skipped = parse_ddl("""
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY,
+            org INTEGER REFERENCES orgs,
+            tag TEXT REFERENCES tags,
+            region_code TEXT,
+            region_year INTEGER,
+            FOREIGN KEY (region_code, region_year) REFERENCES regions
+        );
+        CREATE TABLE orgs (org_no INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE regions (code TEXT, year INTEGER, PRIMARY KEY (code, year));
+    """)
+
+    assert skipped == []
+    assert (_column(schema, "orders", "org")["ref_table"], _column(schema, "orders", "org")["ref_column"]) == ("orgs", "org_no")
+    # tags is never declared, so the usual primary key name is assumed
+    assert _column(schema, "orders", "tag")["ref_column"] == "id"
+    assert _column(schema, "orders", "region_code")["ref_column"] == "code"
+    assert _column(schema, "orders", "region_year")["ref_column"] == "year"
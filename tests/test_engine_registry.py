@@ -0,0 +1,34 @@
+from src.models.engine_registry import EngineRegistry
+
+
+def test_idle_engines_are_disposed(tmp_path, monkeypatch):
+    registry = EngineRegistry(idle_timeout=60)
+    clock = [1000.0]
+    monkeypatch.setattr("src.models.engine_registry.time.monotonic", lambda: clock[0])
+
+    idle = registry.get_engine(f"sqlite:///{tmp_path / 'idle.db'}")
+    busy = registry.get_engine(f"sqlite:///{tmp_path / 'busy.db'}")
+    held = busy.connect()
+
+    clock[0] += 120
+    registry.get_engine(f"sqlite:///{tmp_path / 'other.db'}")
+
+    # The busy engine still has a connection out, so only the idle one goes
+    assert registry.engine_stats(idle) == {}
+    assert registry.engine_stats(busy)["total_checkouts"] == 1
+    assert registry.idle_evictions == 1
+    held.close()
+    registry.dispose_all()
+
+
+def test_engine_stats_tells_same_url_engines_apart(tmp_path):
+    registry = EngineRegistry()
+    url = f"sqlite:///{tmp_path / 'shop.db'}"
+    plain = registry.get_engine(url)
+    tuned = registry.get_engine(url, {"timeout": 5})
+    with tuned.connect():
+        pass
+
+    assert registry.engine_stats(plain)["total_checkouts"] == 0
+    assert registry.engine_stats(tuned)["total_checkouts"] == 1
+    registry.dispose_all()
@@ -0,0 +1,47 @@
+import csv
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.models.db_executor import DatabaseExecutor
+
+
+def _export(sqlite_url, sql, fmt, path):
+    # Progress is one running total, so read it as it is yielded
+    rows = []
+    for progress in DatabaseExecutor(db_url=sqlite_url).export_query(sql, fmt, str(path), batch_size=30):
+        rows.append(progress.rows)
+    assert progress.done
+    return rows
+
+
+def test_csv_export_writes_every_row_in_batches(sqlite_url, tmp_path):
+    path = tmp_path / "orders.csv"
+    rows = _export(sqlite_url, "SELECT * FROM orders ORDER BY id", "csv", path)
+
+    assert rows == [30, 60, 90, 100, 100]
+    with open(path, newline="") as f:
+        lines = list(csv.reader(f))
+    assert lines[0] == ["id", "customer", "amount"]
+    assert len(lines) == 101 and lines[-1] == ["100", "customer_1", "148.5"]
+
+
+def test_parquet_export_has_one_row_group_per_batch(sqlite_url, tmp_path):
+    path = tmp_path / "orders.parquet"
+    _export(sqlite_url, "SELECT id, amount FROM orders", "parquet", path)
+
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_rows == 100
+    assert parquet.metadata.num_row_groups == 4
+    assert parquet.schema_arrow.names == ["id", "amount"]
+
+
+def test_empty_export_keeps_the_header(sqlite_url, tmp_path):
+    path = tmp_path / "none.parquet"
+    assert _export(sqlite_url, "SELECT id FROM orders WHERE id < 0", "parquet", path) == [0]
+    assert pq.ParquetFile(path).schema_arrow.names == ["id"]
+
+
+def test_writes_cannot_be_exported(sqlite_url, tmp_path):
+    with pytest.raises(ValueError):
+        _export(sqlite_url, "DELETE FROM orders", "csv", tmp_path / "x.csv")
@@ -0,0 +1,36 @@
+from src.models.prompts.few_shot import FewShotStore, few_shot_store
+
+
+def test_similar_questions_are_retrieved_for_the_same_schema():
+    few_shot_store.add("shop", "How many orders did each customer place?",
+                       "SELECT customer, COUNT(*) FROM orders GROUP BY customer")
+    few_shot_store.add("shop", "What is the total order amount?", "SELECT SUM(amount) FROM orders")
+    few_shot_store.add("shop", "List all products", "SELECT * FROM products")
+    few_shot_store.add("hr", "How many orders did each employee approve?", "SELECT 1")
+    few_shot_store.add("shop", "Broken", "INVALID_QUERY: no such data")
+
+    matches = few_shot_store.search("shop", "how many orders per customer", k=2, min_score=0.1)
+
+    assert [sql for _, sql, _ in matches][0] == "SELECT customer, COUNT(*) FROM orders GROUP BY customer"
+    assert all(sql != "SELECT 1" for _, sql, _ in matches)
+    assert matches == sorted(matches, key=lambda match: -match[2])
+    assert few_shot_store.search("shop", "employee headcount by department", min_score=0.3) == []
+
+
+def test_the_same_question_is_not_its_own_example():
+    few_shot_store.add("shop", "Total order amount?", "SELECT SUM(amount) FROM orders")
+    few_shot_store.add("shop", "Total order amount by customer", "SELECT customer, SUM(amount) FROM orders GROUP BY 1")
+
+    matches = few_shot_store.search("shop", "  total ORDER amount ", min_score=0.0)
+
+    assert [question for question, _, _ in matches] == ["Total order amount by customer"]
+
+
+def test_examples_persist_and_corrections_replace_the_sql(tmp_path):
+    path = str(tmp_path / "few_shot.sqlite3")
+    FewShotStore(path=path).add("shop", "Top customers", "SELECT customer FROM orders")
+    FewShotStore(path=path).add("shop", "top customers", "SELECT customer FROM orders ORDER BY amount DESC",
+                                source="corrected")
+
+    matches = FewShotStore(path=path).search("shop", "top customers by spend", min_score=0.0)
+    assert [sql for _, sql, _ in matches] == ["SELECT customer FROM orders ORDER BY amount DESC"]
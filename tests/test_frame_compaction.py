@@ -0,0 +1,37 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.models.frame_compaction import compact_frame
+
+
+def test_compaction_keeps_every_value():
+    df = pd.DataFrame({
+        "id": np.arange(1000, dtype=np.int64),
+        "big": np.full(1000, 2**40, dtype=np.int64),
+        "price": np.tile([0.5, 1.25, np.nan, 3.0], 250),
+        "ratio": np.full(1000, 0.1),
+        "customer": [f"customer_{i % 5}" for i in range(1000)],
+        "note": [f"note {i}" for i in range(1000)],
+        "day": [datetime.date(2024, 1, 1 + i % 28) for i in range(1000)],
+        "stamp": [datetime.datetime(2024, 1, 1, 12, 30)] + [datetime.date(2024, 1, 2)] * 999,
+    })
+    df.attrs["sql"] = "SELECT 1"
+    compact = compact_frame(df, category_ratio=0.5)
+
+    assert compact["id"].dtype == np.int16
+    assert compact["big"].dtype == np.int64
+    assert compact["price"].dtype == np.float32
+    # 0.1 has no exact float32, so narrowing it would change the value
+    assert compact["ratio"].dtype == np.float64
+    assert isinstance(compact["customer"].dtype, pd.CategoricalDtype)
+    assert not isinstance(compact["note"].dtype, pd.CategoricalDtype)
+    assert str(compact["day"].dtype) == "date32[day][pyarrow]"
+    # A datetime among the dates would lose its time as a date column
+    assert compact["stamp"].dtype == object
+
+    for name in df.columns:
+        assert compact[name].astype(object).equals(df[name].astype(object)), name
+    assert compact.attrs["sql"] == "SELECT 1"
+    assert compact.attrs["memory_after"] < compact.attrs["memory_before"]
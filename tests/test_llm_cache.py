@@ -0,0 +1,70 @@
+import pytest
+
+from src.models import llm_cache as llm_cache_module
+from src.models.llm_cache import LLMResponseCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(llm_cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def _cache(tmp_path, **kwargs) -> LLMResponseCache:
+    return LLMResponseCache(path=str(tmp_path / "llm.sqlite3"), enabled=True, **kwargs)
+
+
+def test_key_ignores_case_spacing_and_trailing_punctuation():
+    key = LLMResponseCache.make_key("How many  orders?", "gpt-4o", "schema")
+
+    assert LLMResponseCache.make_key("how many orders", "gpt-4o", "schema") == key
+    assert LLMResponseCache.make_key("how many orders", "gpt-4o-mini", "schema") != key
+    assert LLMResponseCache.make_key("how many orders", "gpt-4o", "other schema") != key
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = _cache(tmp_path, ttl=60)
+    cache.set("k", "SELECT 1")
+
+    clock[0] += 59
+    assert cache.get("k") == "SELECT 1"
+    clock[0] += 2
+    assert cache.get("k") is None
+    # Expired rows are dropped from disk too, not just skipped
+    assert _cache(tmp_path, ttl=3600).get("k") is None
+
+
+def test_memory_tier_keeps_the_most_recently_used(tmp_path, clock):
+    cache = _cache(tmp_path, max_entries=2)
+    cache.set("a", "SELECT 'a'")
+    cache.set("b", "SELECT 'b'")
+    cache.get("a")
+    cache.set("c", "SELECT 'c'")
+
+    assert list(cache._memory) == ["a", "c"]
+    # "b" is still on disk, so it is a hit that comes back into memory
+    assert cache.get("b") == "SELECT 'b'"
+    assert cache.stats()["hits"] == 2
+
+
+def test_disk_tier_evicts_the_least_recently_used(tmp_path, clock):
+    cache = _cache(tmp_path, max_disk_entries=2)
+    for key in ("a", "b"):
+        cache.set(key, f"SELECT '{key}'")
+        clock[0] += 1
+    # A disk read (as after a restart) marks "a" as used
+    cache = _cache(tmp_path, max_disk_entries=2)
+    cache.get("a")
+    clock[0] += 1
+    cache.set("c", "SELECT 'c'")
+
+    restarted = _cache(tmp_path)
+    assert [restarted.get(key) is not None for key in ("a", "b", "c")] == [True, False, True]
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = LLMResponseCache(path=str(tmp_path / "llm.sqlite3"), enabled=False)
+    cache.set("k", "SELECT 1")
+
+    assert cache.get("k") is None
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from src.models.fake_llm import FakeAsyncOpenAI
+from src.models.model_race import race_stats
+from src.models.sql_generator import SQLQueryGenerator
+
+FAST, STRONG = "gpt-4o-mini", "gpt-4o"
+
+
+class RecordingFake(FakeAsyncOpenAI):
+    """Records when each model was called; models in `failing` raise instead of answering."""
+
+    def __init__(self, failing: tuple = (), **kwargs):
+        super().__init__(**kwargs)
+        self.failing = failing
+        self.started = []
+
+    async def _create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        self.started.append((model, time.perf_counter()))
+        if model in self.failing:
+            raise RuntimeError(f"{model} is down")
+        return await super()._create(model, messages, stream, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def race_env(monkeypatch):
+    monkeypatch.setenv("ASKDB_RACE_MODELS", f"{FAST},{STRONG}")
+    race_stats.reset()
+    yield
+    race_stats.reset()
+
+
+def outcomes(model: str) -> dict:
+    return next(entry for entry in race_stats.stats() if entry["model"] == model)
+
+
+def test_race_takes_first_valid_answer_and_cancels_the_rest():
+    client = RecordingFake(sql_by_model={FAST: "SELECT 1", STRONG: "SELECT 2"},
+                           latency_by_model={FAST: 0.05, STRONG: 2.0})
+    generator = SQLQueryGenerator(client=client, strategy="race")
+
+    started = time.perf_counter()
+    sql = generator.generate_sql("How many orders?", "schema", STRONG, use_cache=False)
+
+    assert sql == "SELECT 1"
+    assert generator.last_model == FAST
+    # Did not wait for the slow model
+    assert time.perf_counter() - started < 1.0
+    assert outcomes(FAST)["wins"] == 1
+    assert outcomes(STRONG)["cancelled"] == 1
+
+
+def test_race_skips_answers_that_fail_the_quick_check():
+    client = RecordingFake(sql_by_model={FAST: "SELEC broken ((", STRONG: "SELECT 2"},
+                           latency_by_model={FAST: 0.01, STRONG: 0.1})
+    generator = SQLQueryGenerator(client=client, strategy="race")
+
+    assert generator.generate_sql("How many orders?", "schema", STRONG, use_cache=False) == "SELECT 2"
+    assert generator.last_model == STRONG
+    assert outcomes(FAST)["rejected"] == 1
+
+
+def test_failing_model_falls_through_to_the_other():
+    client = RecordingFake(failing=(FAST,), default_sql="SELECT 2", ttft=0.05)
+    generator = SQLQueryGenerator(client=client, strategy="race")
+
+    assert generator.generate_sql("How many orders?", "schema", STRONG, use_cache=False) == "SELECT 2"
+    assert generator.last_model == STRONG
+    assert outcomes(FAST)["errors"] == 1
+    assert outcomes(STRONG)["wins"] == 1
+
+
+def test_hedge_waits_for_the_delay_before_a_duplicate(monkeypatch):
+    monkeypatch.setenv("ASKDB_HEDGE_DELAY", "0.2")
+
+    quick = RecordingFake(default_sql="SELECT 1", ttft=0.02)
+    SQLQueryGenerator(client=quick, strategy="hedge").generate_sql("q", "schema", STRONG, use_cache=False)
+    assert [model for model, _ in quick.started] == [STRONG]
+    race_stats.reset()
+
+    slow = RecordingFake(default_sql="SELECT 1", ttft=0.5)
+    generator = SQLQueryGenerator(client=slow, strategy="hedge")
+    assert generator.generate_sql("q", "schema", STRONG, use_cache=False) == "SELECT 1"
+    assert [model for model, _ in slow.started] == [STRONG, STRONG]
+    (_, first), (_, second) = slow.started
+    assert second - first >= 0.2
+    # The original won; the duplicate was cancelled
+    assert outcomes(STRONG)["wins"] == 1
+    assert outcomes(STRONG)["cancelled"] == 1
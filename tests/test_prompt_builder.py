@@ -0,0 +1,58 @@
+from src.models.prompts import builder as builder_module
+from src.models.prompts.builder import EXAMPLES_HEADER, SCHEMA_HEADER, SystemPromptBuilder, cache_prompt
+from src.models.utils import schema_fingerprint
+
+SCHEMA = {
+    "customers": ["id (INTEGER) PRIMARY KEY", "name (TEXT)"],
+    "orders": ["id (INTEGER) PRIMARY KEY", "customer_id (INTEGER) REFERENCES customers(id)", "amount (REAL)"],
+}
+EXAMPLES = [("How many customers?", "SELECT COUNT(*) FROM customers")]
+
+
+def _build(question: str, examples=None) -> str:
+    return SystemPromptBuilder(SCHEMA, question=question, examples=examples or []).build()
+
+
+def test_static_sections_then_schema_then_examples():
+    prompt = _build("How many orders?", EXAMPLES)
+
+    schema_at = prompt.index(SCHEMA_HEADER.strip())
+    examples_at = prompt.index(EXAMPLES_HEADER.strip())
+    assert 0 < schema_at < prompt.index("CREATE TABLE orders") < examples_at
+    assert prompt.endswith("SQL: SELECT COUNT(*) FROM customers")
+
+
+def test_different_questions_share_the_prefix_up_to_the_examples():
+    first = _build("How many orders?", EXAMPLES)
+    second = _build("Total amount per customer", [("Average amount?", "SELECT AVG(amount) FROM orders")])
+
+    assert cache_prompt(first) == cache_prompt(second) == _build("anything else")
+    assert EXAMPLES_HEADER.strip() not in cache_prompt(first)
+
+
+def test_sections_are_rendered_once_and_reused():
+    builder_module._static_sections.cache_clear()
+    builder_module._rendered_schemas.clear()
+
+    _build("How many orders?")
+    rendered = builder_module._rendered_schemas[schema_fingerprint(SCHEMA)]
+    _build("Total amount per customer")
+
+    assert builder_module._static_sections.cache_info().hits >= 1
+    assert builder_module._rendered_schemas[schema_fingerprint(SCHEMA)] is rendered
+
+
+def test_schema_fingerprint_is_memoized_per_dict_but_follows_content():
+    schema = {"t": ["id (INTEGER)"]}
+
+    assert schema_fingerprint(schema) == schema_fingerprint(schema)
+    assert schema_fingerprint(dict(schema)) == schema_fingerprint(schema)
+    assert schema_fingerprint({"t": ["id (TEXT)"]}) != schema_fingerprint(schema)
+
+
+def test_example_budget_drops_examples_that_do_not_fit():
+    builder = SystemPromptBuilder(SCHEMA, question="How many orders?", examples=EXAMPLES * 50, example_budget=100)
+    builder.build()
+
+    assert 0 < builder.stats["examples"] < 50
+    assert builder.stats["example_tokens"] <= 100
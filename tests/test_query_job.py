@@ -0,0 +1,42 @@
+import threading
+import time
+
+from src.models.query_errors import QueryFailure, QueryStatus
+from src.models.query_job import QueryJob
+
+
+class WaitingDb:
+    """Hands out its connection only when `release` is set, like an exhausted pool."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.cancelled = []
+        self.executed = False
+
+    def cached_result(self, sql):
+        return None
+
+    def stream_query(self, sql, timeout=None, on_connect=None, cache_result=False):
+        self.release.wait(5)
+        on_connect("backend-1")
+        self.executed = True
+
+    def cancel(self, handle):
+        self.cancelled.append(handle)
+        return True
+
+
+def test_cancel_while_waiting_for_a_connection_returns_at_once():
+    db = WaitingDb()
+    job = QueryJob(db, "SELECT 1", timeout=0)
+
+    started = time.perf_counter()
+    assert job.cancel()
+    assert time.perf_counter() - started < 0.5
+
+    db.release.set()
+    result = job.result(5)
+    assert isinstance(result, QueryFailure) and result.status == QueryStatus.CANCELLED
+    # The cancel was issued when the handle arrived, and the statement never ran
+    assert db.cancelled == ["backend-1"]
+    assert not db.executed
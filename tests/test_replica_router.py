@@ -0,0 +1,28 @@
+from sqlalchemy import event
+
+from src.models import replica_router
+from src.models.engine_registry import engine_registry
+
+
+def test_least_recently_used_router_is_closed(tmp_path, monkeypatch):
+    monkeypatch.setenv("ASKDB_MAX_ROUTERS", "1")
+    monkeypatch.setenv("ASKDB_REPLICA_HEALTH_INTERVAL", "60")
+    monkeypatch.setattr(replica_router, "_routers", type(replica_router._routers)())
+
+    first_primary = engine_registry.get_engine(f"sqlite:///{tmp_path / 'a.db'}")
+    first = replica_router.get_router(first_primary, [(f"sqlite:///{tmp_path / 'a_replica.db'}", {})])
+    listeners = list(first.primary._listeners)
+    assert first._thread.is_alive()
+    assert replica_router.get_router(first_primary, [(f"sqlite:///{tmp_path / 'a_replica.db'}", {})]) is first
+
+    second_primary = engine_registry.get_engine(f"sqlite:///{tmp_path / 'b.db'}")
+    second = replica_router.get_router(second_primary, [(f"sqlite:///{tmp_path / 'b_replica.db'}", {})])
+
+    assert list(replica_router._routers.values()) == [second]
+    assert not first._thread.is_alive()
+    assert not any(event.contains(first_primary, name, fn) for name, fn in listeners)
+    # The evicted router no longer counts checkouts on the shared engine
+    with first_primary.connect():
+        pass
+    assert first.primary.requests == 0
+    second.close()
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from src.models.db_executor import DatabaseExecutor
+from src.models.result_cache import ResultCache, is_cacheable, result_cache
+
+
+@pytest.mark.parametrize("sql, cacheable", [
+    ("SELECT * FROM orders", True),
+    ("  with t AS (SELECT 1) SELECT * FROM t;", True),
+    ("SELECT * FROM orders; DELETE FROM orders", False),
+    ("SELECT * FROM orders FOR UPDATE", False),
+    ("SELECT id, now() FROM orders", False),
+    ("SELECT * INTO backup FROM orders", False),
+    ("DELETE FROM orders", False),
+    # Keywords inside strings and comments don't count
+    ("SELECT * FROM orders WHERE customer = 'delete' -- random", True),
+])
+def test_is_cacheable(sql, cacheable):
+    assert is_cacheable(sql) is cacheable
+
+
+def test_writes_invalidate_only_the_tables_they_touch(sqlite_url):
+    db = DatabaseExecutor(db_url=sqlite_url)
+    db.execute_query("CREATE TABLE customers (id INTEGER)")
+    db.execute_query("SELECT COUNT(*) AS n FROM orders")
+    db.execute_query("SELECT * FROM customers")
+    db.execute_query("SELECT 1 AS one")
+    assert result_cache.contains(db.identity, "select count(*) as n from orders")
+
+    db.execute_query("DELETE FROM orders WHERE id > 90")
+
+    assert not result_cache.contains(db.identity, "SELECT COUNT(*) AS n FROM orders")
+    assert result_cache.contains(db.identity, "SELECT * FROM customers")
+    # Entries whose tables are unknown can't be ruled out, so they go too
+    assert not result_cache.contains(db.identity, "SELECT 1 AS one")
+    assert db.execute_query("SELECT COUNT(*) AS n FROM orders")["n"][0] == 90
+
+
+def test_least_recently_used_results_are_evicted_over_budget():
+    frame = pd.DataFrame({"x": range(1000)})
+    cache = ResultCache(max_bytes=20000, ttl=60, max_entry_bytes=10000)
+    for name in ("a", "b"):
+        assert cache.put("db", f"SELECT * FROM {name}", frame)
+    cache.get("db", "SELECT * FROM a")
+    assert cache.put("db", "SELECT * FROM c", frame)
+
+    assert cache.contains("db", "SELECT * FROM a") and cache.contains("db", "SELECT * FROM c")
+    assert not cache.contains("db", "SELECT * FROM b")
+    assert cache.evictions == 1 and cache.bytes_used <= cache.max_bytes
+    # A single result bigger than the per-entry limit is never stored
+    assert not cache.put("db", "SELECT * FROM d", pd.DataFrame({"x": range(2000)}))
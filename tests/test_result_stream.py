@@ -0,0 +1,80 @@
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from src.models import result_stream
+from src.models.result_stream import ParkedStreams, QueryStream
+
+
+def _stream(engine, **kwargs):
+    options = dict(chunk_size=50, max_rows=1000, max_bytes=10**9, compact=False)
+    options.update(kwargs)
+    return QueryStream(engine.connect(), "SELECT * FROM orders ORDER BY id", **options)
+
+
+def test_stream_is_done_when_the_last_chunk_is_exactly_full(sqlite_url):
+    engine = create_engine(sqlite_url)
+    stream = _stream(engine)
+
+    assert len(stream.fetch_next()) == 50
+    assert not stream.done
+    assert len(stream.fetch_next()) == 50
+    # No "load more" round trip that comes back empty
+    assert stream.done and stream.exhausted and not stream.truncated
+    assert stream.frame["id"].tolist() == list(range(1, 101))
+    engine.dispose()
+
+
+def test_peeked_row_is_not_lost(sqlite_url):
+    engine = create_engine(sqlite_url)
+    stream = _stream(engine, chunk_size=30)
+
+    frame = stream.fetch_all()
+    assert frame["id"].tolist() == list(range(1, 101))
+    assert stream.exhausted
+    engine.dispose()
+
+
+def test_row_cap_still_flags_truncation(sqlite_url):
+    engine = create_engine(sqlite_url)
+    stream = _stream(engine, max_rows=60)
+
+    assert len(stream.fetch_all()) == 60
+    assert stream.truncated
+    engine.dispose()
+
+
+def _parked_stream(engine, **kwargs):
+    options = dict(chunk_size=30, max_rows=1000, max_bytes=10**9, compact=False, reopen=engine.connect)
+    options.update(kwargs)
+    stream = QueryStream(engine.connect(), "SELECT * FROM orders ORDER BY id", **options)
+    stream.fetch_next()
+    stream.park()
+    return stream
+
+
+def test_suspended_stream_resumes_where_it_stopped(sqlite_url, monkeypatch):
+    monkeypatch.setattr(result_stream, "parked_streams", ParkedStreams(idle_ttl=0, max_open=4))
+    engine = create_engine(sqlite_url)
+    stream = _parked_stream(engine)
+
+    result_stream.parked_streams.reap()
+    assert stream.suspended
+    assert engine.pool.checkedout() == 0
+
+    assert stream.fetch_next()["id"].tolist() == list(range(31, 61))
+    assert stream.fetch_all()["id"].tolist() == list(range(1, 101))
+    assert stream.exhausted and len(result_stream.parked_streams) == 0
+    engine.dispose()
+
+
+def test_open_streams_are_capped(sqlite_url, monkeypatch):
+    monkeypatch.setattr(result_stream, "parked_streams", ParkedStreams(idle_ttl=0, max_open=2))
+    engine = create_engine(sqlite_url, poolclass=QueuePool)
+    streams = [_parked_stream(engine) for _ in range(3)]
+
+    # The least recently used one gave its connection back
+    assert [s.suspended for s in streams] == [True, False, False]
+    assert engine.pool.checkedout() == 2
+    for stream in streams:
+        stream.close()
+    engine.dispose()
@@ -0,0 +1,32 @@
+from src.models.schema_browser import SchemaBrowserIndex, get_browser_index
+from src.models.utils import format_column
+
+SCHEMA = {
+    "customer_orders": [format_column("id", "INTEGER"), format_column("total", "REAL")],
+    "orders": [format_column("id", "INTEGER"), format_column("amount", "REAL")],
+    "order_items": [format_column("order_id", "INTEGER"), format_column("amount", "REAL")],
+    "refunds": [format_column("order_ref", "INTEGER"), format_column("reason", "TEXT")],
+    "users": [format_column("id", "INTEGER"), format_column("email", "TEXT")],
+}
+
+
+def test_table_matches_rank_exact_then_prefix_then_substring_then_columns():
+    index = SchemaBrowserIndex(SCHEMA)
+
+    assert index.search("Orders") == (["orders", "customer_orders"], {})
+    tables, columns = index.search("order")
+    assert tables == ["order_items", "orders", "customer_orders", "refunds"]
+    assert columns == {"order_items": ["order_id"], "refunds": ["order_ref"]}
+
+
+def test_qualified_search_filters_columns_by_table():
+    index = SchemaBrowserIndex(SCHEMA)
+
+    assert index.search("order.amount") == (["orders", "order_items"], {"orders": ["amount"], "order_items": ["amount"]})
+    assert index.search("items.") == (["order_items"], {})
+    assert index.search("users.amount") == ([], {})
+    assert index.search("  ") == (list(SCHEMA), {})
+
+
+def test_index_is_shared_per_schema():
+    assert get_browser_index(SCHEMA) is get_browser_index(dict(SCHEMA))
@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.models import schema_cache as schema_cache_module
+from src.models.schema_cache import SchemaCache
+from src.models.schema_reflection import catalog_fingerprint, reflect_schema
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(schema_cache_module.time, "time", clock)
+    return clock
+
+
+class Loader:
+    def __init__(self, schema=None):
+        self.calls = 0
+        self.schema = schema or {"orders": ["id INTEGER"]}
+
+    def __call__(self):
+        self.calls += 1
+        return self.schema
+
+
+def test_memory_hits_skip_the_fingerprint_until_the_recheck(tmp_path, clock):
+    cache = SchemaCache(cache_dir=str(tmp_path), ttl=3600, recheck_interval=60)
+    loader, checks = Loader(), []
+
+    def fingerprint():
+        checks.append(clock.now)
+        return "v1"
+
+    cache.get("db", fingerprint, loader)
+    cache.get("db", fingerprint, loader)
+    assert (loader.calls, len(checks)) == (1, 1)
+
+    clock.now += 61
+    cache.get("db", fingerprint, loader)
+    # Rechecked, unchanged, so not reloaded
+    assert (loader.calls, len(checks)) == (1, 2)
+
+
+def test_changed_fingerprint_reloads(tmp_path, clock):
+    cache = SchemaCache(cache_dir=str(tmp_path), ttl=3600, recheck_interval=0)
+    loader, version = Loader(), ["v1"]
+
+    cache.get("db", lambda: version[0], loader)
+    cache.get("db", lambda: version[0], loader)
+    version[0] = "v2"
+    cache.get("db", lambda: version[0], loader)
+
+    assert loader.calls == 2
+
+
+def test_ttl_expiry_reloads_even_with_the_same_fingerprint(tmp_path, clock):
+    cache = SchemaCache(cache_dir=str(tmp_path), ttl=100, recheck_interval=60)
+    loader = Loader()
+
+    cache.get("db", lambda: "v1", loader)
+    clock.now += 101
+    cache.get("db", lambda: "v1", loader)
+
+    assert loader.calls == 2
+
+
+def test_disk_tier_survives_a_restart(tmp_path, clock):
+    SchemaCache(cache_dir=str(tmp_path), ttl=3600).get("db", lambda: "v1", Loader())
+    loader = Loader()
+
+    schema = SchemaCache(cache_dir=str(tmp_path), ttl=3600).get("db", lambda: "v1", loader)
+
+    assert schema == {"orders": ["id INTEGER"]}
+    assert loader.calls == 0
+
+
+def test_refresh_and_invalidate_reload(tmp_path, clock):
+    cache = SchemaCache(cache_dir=str(tmp_path), ttl=3600, recheck_interval=60)
+    loader = Loader()
+
+    cache.get("db", lambda: "v1", loader)
+    cache.get("db", lambda: "v1", loader, refresh=True)
+    cache.invalidate("db")
+    cache.get("db", lambda: "v1", loader)
+
+    assert loader.calls == 3
+
+
+def test_new_table_changes_the_sqlite_catalog_fingerprint(sqlite_url, tmp_path):
+    engine = create_engine(sqlite_url)
+    cache = SchemaCache(cache_dir=str(tmp_path), ttl=3600, recheck_interval=0)
+
+    def load():
+        return cache.get("shop", lambda: catalog_fingerprint(engine), lambda: reflect_schema(engine))
+
+    assert set(load()) == {"orders"}
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE customers (id INTEGER PRIMARY KEY, name TEXT)"))
+    assert set(load()) == {"orders", "customers"}
+    engine.dispose()
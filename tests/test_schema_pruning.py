@@ -0,0 +1,73 @@
+from src.models.prompts.builder import SystemPromptBuilder
+from src.models.prompts.schema_index import SchemaIndex, tokenize
+from src.models.utils import format_column
+
+
+def _schema(fillers: int = 30) -> dict:
+    schema = {f"zz_metric_{i}": [format_column(f"val_{i}", "REAL"), format_column("note", "TEXT")]
+              for i in range(fillers)}
+    schema["customers"] = [format_column("id", "INTEGER", primary_key=True), format_column("name", "TEXT")]
+    schema["orders"] = [
+        format_column("id", "INTEGER", primary_key=True),
+        format_column("customer_id", "INTEGER", ref_table="customers", ref_column="id"),
+        format_column("shipped_at", "DATE"),
+    ]
+    schema["products"] = [format_column("id", "INTEGER", primary_key=True), format_column("title", "TEXT")]
+    return schema
+
+
+def _builder(question: str, **kwargs) -> SystemPromptBuilder:
+    return SystemPromptBuilder(_schema(), question=question, examples=[], **kwargs)
+
+
+def test_tokenize_splits_identifiers_and_stems():
+    assert tokenize("customerOrders ship_dates") == ["customer", "order", "ship", "date"]
+
+
+def test_rank_puts_table_name_matches_first_and_uses_synonyms():
+    index = SchemaIndex(_schema())
+
+    assert index.rank("which orders shipped?")[0][0] == "orders"
+    # "clients" is a synonym of customer
+    assert index.rank("list clients")[0][0] == "customers"
+    assert index.neighbours("orders") == {"customers"}
+    assert index.neighbours("customers") == {"orders"}
+
+
+def test_small_schemas_are_not_pruned():
+    builder = SystemPromptBuilder({"orders": ["id (INTEGER)"]}, question="orders", examples=[])
+    builder.build()
+
+    assert builder.stats["pruned_tables"] == 0
+
+
+def test_large_schema_keeps_matches_and_their_fk_neighbours():
+    builder = _builder("Which orders shipped last week?", max_tables=5)
+    prompt = builder.build()
+
+    assert "CREATE TABLE orders" in prompt
+    # Not mentioned, but orders joins to it
+    assert "CREATE TABLE customers" in prompt
+    assert "CREATE TABLE products" not in prompt
+    assert "zz_metric_" not in prompt
+    assert builder.stats["selected_tables"] == 2
+    assert builder.stats["estimated_tokens_saved"] > 0
+
+
+def test_token_budget_drops_lower_ranked_tables():
+    full = _builder("Which orders shipped last week?", max_tables=5)
+    full.build()
+    orders_only = _builder("Which orders shipped last week?", max_tables=5,
+                           token_budget=full.stats["schema_tokens"] - 1)
+    prompt = orders_only.build()
+
+    assert "CREATE TABLE orders" in prompt
+    assert "CREATE TABLE customers" not in prompt
+    assert orders_only.stats["schema_tokens"] < full.stats["schema_tokens"]
+
+
+def test_unmatched_question_still_gets_tables():
+    builder = _builder("xyzzy", max_tables=3)
+    builder.build()
+
+    assert builder.stats["selected_tables"] == 3
@@ -0,0 +1,27 @@
+import asyncio
+
+from src.models.fake_llm import FakeAsyncOpenAI
+from src.models.llm_cache import llm_cache
+from src.models.sql_generator import SQLQueryGenerator
+
+PROMPT = "CREATE TABLE orders (id INTEGER);"
+
+
+def test_refusals_are_not_cached():
+    client = FakeAsyncOpenAI(default_sql="INVALID_QUERY: no such data", ttft=0.0, chunk_delay=0.0)
+    generator = SQLQueryGenerator(cache=llm_cache, client=client)
+
+    assert asyncio.run(generator.agenerate_sql("Who is the CEO?", PROMPT)).startswith("INVALID_QUERY")
+    assert asyncio.run(generator.agenerate_sql("Who is the CEO?", PROMPT)).startswith("INVALID_QUERY")
+    assert client.calls == 2
+    assert not generator.last_cache_hit
+
+
+def test_answers_are_cached():
+    client = FakeAsyncOpenAI(default_sql="SELECT COUNT(*) FROM orders", ttft=0.0, chunk_delay=0.0)
+    generator = SQLQueryGenerator(cache=llm_cache, client=client)
+
+    asyncio.run(generator.agenerate_sql("How many orders?", PROMPT))
+    assert asyncio.run(generator.agenerate_sql("How many orders?", PROMPT)) == "SELECT COUNT(*) FROM orders"
+    assert client.calls == 1
+    assert generator.last_cache_hit
@@ -0,0 +1,13 @@
+from src.models.sql_validator import SQLValidator
+
+SCHEMA = {"orders": ["id (INTEGER)", "amount (REAL)"]}
+
+
+def test_cte_column_list_names_the_columns():
+    validator = SQLValidator(SCHEMA, "sqlite")
+
+    assert validator.validate("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) "
+                              "SELECT count(*) FROM c").ok
+    assert validator.validate("SELECT t.a FROM (SELECT id, amount FROM orders) AS t(a, b)").ok
+    result = validator.validate("WITH c(x) AS (SELECT id FROM orders) SELECT id FROM c")
+    assert result.errors == ["Unknown column `id`: not found in `c`."]
@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_PACKAGES = ("openai", "pandas", "sqlalchemy", "sqlglot", "pyarrow")
+
+
+def test_app_starts_without_heavy_packages_or_an_api_key():
+    code = (
+        "import json, sys\n"
+        "import streamlit\n"
+        "from src.controllers import home_controller\n"
+        "from src.models import sql_generator\n"
+        f"print(json.dumps([name for name in {HEAVY_PACKAGES!r} if name in sys.modules]))\n"
+    )
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    done = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+    assert done.returncode == 0, done.stderr
+    assert json.loads(done.stdout.splitlines()[-1]) == []
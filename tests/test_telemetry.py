@@ -0,0 +1,73 @@
+import contextvars
+import json
+import threading
+
+import pytest
+
+from src.models import telemetry
+from src.models.db_executor import DatabaseExecutor
+from src.models.telemetry import Metrics
+
+
+def test_prometheus_counters_and_histograms():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.inc("askdb_things_total", help="Things", kind='say "hi"')
+    metrics.inc("askdb_things_total", 2, kind='say "hi"')
+    for value in (0.05, 0.5, 5.0):
+        metrics.observe("askdb_wait_seconds", value, stage="db")
+
+    lines = metrics.render_prometheus().splitlines()
+    assert lines[:3] == [
+        "# HELP askdb_things_total Things",
+        "# TYPE askdb_things_total counter",
+        'askdb_things_total{kind="say \\"hi\\""} 3',
+    ]
+    assert "# TYPE askdb_wait_seconds histogram" in lines
+    # Buckets are cumulative and +Inf counts everything
+    assert 'askdb_wait_seconds_bucket{stage="db",le="0.1"} 1' in lines
+    assert 'askdb_wait_seconds_bucket{stage="db",le="1.0"} 2' in lines
+    assert 'askdb_wait_seconds_bucket{stage="db",le="+Inf"} 3' in lines
+    assert 'askdb_wait_seconds_count{stage="db"} 3' in lines
+    assert 'askdb_wait_seconds_sum{stage="db"} 5.55' in lines
+
+
+@pytest.fixture
+def trace_log(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("ASKDB_TRACE_LOG", str(path))
+    return path
+
+
+def test_spans_attach_to_the_current_trace_across_threads(trace_log):
+    trace = telemetry.Trace("question", model="gpt-4o")
+    with trace:
+        with telemetry.span("prompt.build") as span:
+            span.set(selected_tables=3)
+        context = contextvars.copy_context()
+        worker = threading.Thread(target=context.run, args=(lambda: telemetry.record("llm.generate", 0.25),))
+        worker.start()
+        worker.join()
+        with pytest.raises(ValueError):
+            with telemetry.span("db.execute"):
+                raise ValueError("boom")
+    trace.finish()
+
+    spans = {span["name"]: span for span in trace.to_dict()["spans"]}
+    assert spans["prompt.build"]["selected_tables"] == 3
+    assert spans["llm.generate"]["duration_ms"] == 250.0
+    assert spans["db.execute"]["error"] == "ValueError"
+    logged = json.loads(trace_log.read_text().splitlines()[-1])
+    assert logged["trace_id"] == trace.trace_id and logged["model"] == "gpt-4o"
+    assert 'askdb_stage_errors_total{stage="db.execute"}' in telemetry.metrics.render_prometheus()
+
+
+def test_query_execution_is_traced(sqlite_url, trace_log):
+    db = DatabaseExecutor(db_url=sqlite_url)
+    trace = telemetry.Trace("question")
+    with trace:
+        db.execute_query("SELECT * FROM orders", use_cache=False)
+    trace.finish()
+
+    spans = {span["name"]: span for span in trace.to_dict()["spans"]}
+    assert spans["db.execute"]["rows"] == 100
+    assert "pool_wait_ms" in spans["db.open"]